@@ -2,10 +2,19 @@
 
 from flask import Flask as FlaskApp, render_template as flask_render_template, request as flask_request, jsonify as flask_jsonify
 from quart import Quart as QuartApp, request as quart_request, render_template as quart_render_template, jsonify as quart_jsonify
-import os, random, time, aiohttp, logging, asyncio, requests, html
+import os, json, random, logging, asyncio, requests, html, threading, concurrent.futures
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
-from nsfw_filter import is_safe_content, is_safe_image
+from nsfw_filter import is_safe_content, is_safe_image, OPENAI_TEXT_BATCHER, VISION_SAFE_SEARCH, MODERATION_VERDICTS, IMAGE_IDENTITY
+from met_client import MetClient, artwork_identity
+from met_pools import MetCandidatePools
+from met_index import load_index
+from met_random import RandomArtworkReservoir
+from met_artwork import parse_fields, project_artworks
+from deadline import Deadline
+from spotify_client import SpotifyTokenManager, SpotifySearchCache, SpotifyRateLimiter, SPOTIFY_DEFAULT_RETRY_AFTER, paginate_search, select_moderated, TopKRanker, rank_top_k, SPOTIFY_RANK_CANDIDATES, SPOTIFY_SEARCH_MAX_RESULTS
+from http_clients import HTTP_CLIENTS
+from spotify_pools import SpotifyResultPools, SPOTIFY_REC_TYPES
 
 # Load environment variables
 load_dotenv()
@@ -13,6 +22,11 @@ load_dotenv()
 # ✅ Flask (Met Museum)
 flask_app = FlaskApp(__name__)
 BASE_URL = "https://collectionapi.metmuseum.org/public/collection/v1"
+MET_BUDGET_SHARE = 0.9  # Share of the request budget for the Met fetchers (they run concurrently)
+SPOTIFY_BUDGET_SHARE = 0.9  # Share of the request budget for the Spotify leg (runs alongside the Met fetchers)
+QUART_PUBLIC_URL = os.getenv("QUART_PUBLIC_URL", "http://127.0.0.1:3001")  # Where results.html opens the result stream
+MET_BACKGROUND_WORK = os.getenv("MET_BACKGROUND_WORK", "1") != "0"  # Set to 0 to skip the Met warm-up when serving starts
+met_client = MetClient(BASE_URL, search_index=load_index())  # Shared, pooled Met client (offline index if MET_INDEX_DIR is set)
 
 # Moods dictionary - focusing on emotional or psychological states
 mood_keywords = {
@@ -61,14 +75,64 @@ art_style_keywords = {
     "Open": ["cubism", "abstract", "impressionism", "baroque", "romanticism", "pre-raphaelite", "op art", "futurism", "tonalism"]
 }
 
+# ✅ Background-harvested pools of validated artworks per mood, art style and subject
+met_pools = MetCandidatePools(met_client, {
+    "moods": mood_keywords,
+    "art_styles": art_style_keywords,
+    "subjects": subject_keywords,
+})
+
+# ✅ Pre-validated random artworks used to top results up to 9
+random_reservoir = RandomArtworkReservoir(met_client)
+
+# ✅ Met background work starts once per process when serving starts (never at import)
+met_background_lock = threading.Lock()
+met_background_started = False
+
+def start_met_background_work():
+    """Warms the Met search cache (the keyword lists above never change), harvests the Met pools and fills the random reservoir in the background."""
+    global met_background_started
+    with met_background_lock:
+        if met_background_started or not MET_BACKGROUND_WORK:
+            return
+        met_background_started = True
+
+    met_client.warm_searches(
+        keyword
+        for keyword_map in (mood_keywords, subject_keywords, art_style_keywords)
+        for keywords in keyword_map.values()
+        for keyword in keywords
+    )
+    met_pools.start()
+    random_reservoir.start()
+
+@flask_app.before_request
+def flask_start_background_work():
+    start_met_background_work()
+
 # ✅ Quart (Spotify)
 quart_app = QuartApp(__name__)
 SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
 SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 SPOTIFY_API_URL = "https://api.spotify.com/v1/search"
 
-TOKEN_CACHE = {"access_token": None, "expires_at": 0}
-RETRY_ATTEMPTS = 3  # Retries if rate-limited
+spotify_tokens = SpotifyTokenManager(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)  # Shared by the Flask and Quart routes
+spotify_search_cache = SpotifySearchCache()  # Search responses, shared by the Flask and Quart routes
+spotify_limiter = SpotifyRateLimiter()  # Every Spotify API call waits here
+RETRY_ATTEMPTS = 3  # Attempts per request (rate limits and expired tokens)
+STREAM_ALLOWED_ORIGIN = os.getenv("STREAM_ALLOWED_ORIGIN", "*")  # The Flask pages open the stream cross-origin
+
+# ✅ Long-lived HTTP clients and background work live for the whole serving lifetime (nothing starts at import)
+@quart_app.before_serving
+async def quart_start_serving():
+    await HTTP_CLIENTS.open()
+    start_met_background_work()
+    await spotify_pools.start()
+
+@quart_app.after_serving
+async def quart_stop_serving():
+    await spotify_pools.stop()  # Cancel refills before their HTTP clients close
+    await HTTP_CLIENTS.close()
 
 # ✅ Mood-to-Genre Mapping
 MOOD_GENRE_MAP = {
@@ -102,49 +166,77 @@ NICHE_GENRES = [
     "Mallsoft", "Darkwave", "Vaporwave", "Synthwave", "Hardstyle"
 ]
 
-# ✅ Async function to get Spotify access token with lock
+# ✅ Async function to get Spotify access token (single-flight, refreshed before expiry)
 async def quart_get_access_token():
-        current_time = time.time()
-        if TOKEN_CACHE["access_token"] and current_time < TOKEN_CACHE["expires_at"]:
-            return TOKEN_CACHE["access_token"]
+    return await spotify_tokens.get_token_async()
 
-        url = "https://accounts.spotify.com/api/token"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        data = {"grant_type": "client_credentials", "client_id": SPOTIFY_CLIENT_ID, "client_secret": SPOTIFY_CLIENT_SECRET}
+def spotify_retry_after(headers):
+    try:
+        return max(1, int(headers.get("Retry-After", SPOTIFY_DEFAULT_RETRY_AFTER)))
+    except (TypeError, ValueError):
+        return SPOTIFY_DEFAULT_RETRY_AFTER
+
+# ✅ Async function to fetch data from Spotify API through the shared rate limiter
+async def quart_fetch_spotify_data(session, url, headers):
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        await spotify_limiter.acquire_async()
+        try:
+            async with session.get(url, headers=headers, timeout=5) as response:
+                if response.status == 401:
+                    logging.warning("⚠️ Token expired, refreshing...")
+                    spotify_tokens.invalidate(headers.get("Authorization", "").removeprefix("Bearer "))
+                    headers["Authorization"] = f"Bearer {await quart_get_access_token()}"
+                    continue
+
+                if response.status == 429:
+                    spotify_limiter.pause(spotify_retry_after(response.headers))  # Every caller waits, then retries
+                    continue
+
+                response.raise_for_status()
+                data = await response.json()
+                return data if isinstance(data, dict) else None
+        except Exception as e:
+            logging.error(f"❌ Failed request: {e} (Attempt {attempt})")
+            return None
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(url, headers=headers, data=data, timeout=5) as response:
-                    response.raise_for_status()
-                    token_data = await response.json()
-                    TOKEN_CACHE["access_token"] = token_data["access_token"]
-                    TOKEN_CACHE["expires_at"] = current_time + token_data.get("expires_in", 3600)
-                    return TOKEN_CACHE["access_token"]
-            except Exception as e:
-                logging.error(f"❌ Token error: {e}")
-                return None
+    logging.error(f"❌ Giving up on Spotify request after {RETRY_ATTEMPTS} attempts")
+    return None
 
-# ✅ Async function to fetch data from Spotify API with improved rate limit handling
-async def quart_fetch_spotify_data(session, url, headers, attempt=1):
-    try:
-        async with session.get(url, headers=headers, timeout=5) as response:
-            if response.status == 401:
-                logging.warning("⚠️ Token expired, refreshing...")
-                headers["Authorization"] = f"Bearer {await quart_get_access_token()}"
-                return await quart_fetch_spotify_data(session, url, headers, attempt + 1)
-
-            if response.status == 429 and attempt < RETRY_ATTEMPTS:
-                retry_after = int(response.headers.get("Retry-After", 2))
-                logging.warning(f"⚠️ Rate limited! Retrying in {retry_after} sec...")
-                await asyncio.sleep(retry_after)
-                return await quart_fetch_spotify_data(session, url, headers, attempt + 1)
-
-            response.raise_for_status()
-            data = await response.json()
-            return data if isinstance(data, dict) else None
-    except Exception as e:
-        logging.error(f"❌ Failed request: {e} (Attempt {attempt})")
-        return None
+# ✅ Cached search request (stale entries are served while refreshing in the background)
+async def quart_fetch_spotify_search(session, url, headers):
+    return await spotify_search_cache.fetch_async(url, lambda: quart_fetch_spotify_data(session, url, headers))
+
+# ✅ Sync cached search request for the Flask routes (raises on HTTP errors and timeouts)
+def flask_fetch_spotify_search(url, timeout=5):
+    def load():
+        for attempt in range(2):
+            if not spotify_limiter.acquire(timeout=timeout):
+                raise requests.Timeout("Timed out waiting for the Spotify rate limiter")
+            token = spotify_tokens.get_token(timeout=timeout)
+            response = requests.get(url, headers={"Authorization": f"Bearer {token}"}, timeout=timeout)
+            if response.status_code != 401 or attempt:
+                break
+            logging.warning("⚠️ Token expired, refreshing...")
+            spotify_tokens.invalidate(token)  # Retry once with a fresh token
+        if response.status_code == 429:
+            spotify_limiter.pause(spotify_retry_after(response.headers))
+        if response.status_code != 200:
+            logging.error(f"DEBUG: Spotify search error: {response.text}")
+            raise Exception(f"Spotify search error: {response.status_code}")
+        data = response.json()
+        return data if isinstance(data, dict) else None
+
+    return spotify_search_cache.fetch(url, load)
+
+async def quart_search_items(query, search_type, headers, on_page=None, max_results=SPOTIFY_SEARCH_MAX_RESULTS):
+    """Fetches up to `max_results` items (extra pages concurrently); None if Spotify did not answer."""
+    session = HTTP_CLIENTS.get("spotify")
+
+    async def fetch_page(offset, limit):
+        url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={search_type}&limit={limit}&offset={offset}"
+        return await quart_fetch_spotify_search(session, url, headers)
+
+    return await paginate_search(fetch_page, search_type + "s", max_results=max_results, on_page=on_page)
 
 async def quart_fetch_all_results(query, search_type):
     """Fetches diverse results while ensuring unique genres in playlist titles."""
@@ -153,43 +245,16 @@ async def quart_fetch_all_results(query, search_type):
         logging.error("❌ Failed to retrieve Spotify Access Token")
         return []
 
+    # ✅ Rank pages as they land (popularity blended with randomness, one item per artist/owner)
+    ranker = TopKRanker(20, search_type)
     headers = {"Authorization": f"Bearer {access_token}"}
-    results = []
-    offset, limit = 0, 50  # Fetch more items at once
+    if await quart_search_items(query, search_type, headers, on_page=ranker.push_page) is None:
+        logging.warning("⚠️ No data received from Spotify API")
 
-    async with aiohttp.ClientSession() as session:
-        while len(results) < 50:  # Increase total fetch count
-            url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={search_type}&limit={limit}&offset={offset}"
-            data = await quart_fetch_spotify_data(session, url, headers)
-            
-            if not data:
-                logging.warning("⚠️ No data received from Spotify API")
-                break  
+    if ranker.seen < 20:
+        logging.warning(f"⚠️ Only {ranker.seen} results available from Spotify")
 
-            items = data.get(search_type + "s", {}).get("items", [])
-            if not isinstance(items, list):  
-                break  
-
-            valid_items = [item for item in items if isinstance(item, dict)]
-            results.extend(valid_items)
-
-            offset += limit  
-            if len(items) < limit:  # Stop if no more results
-                break  
-
-    if len(results) < 20:
-        logging.warning(f"⚠️ Only {len(results)} results available from Spotify")
-
-    # ✅ **Sorting by Followers (Playlists) or Popularity (Albums, Tracks, Artists)**
-    if search_type == "playlist":
-        results.sort(key=lambda x: x.get("followers", {}).get("total", 0) if isinstance(x.get("followers"), dict) else 0, reverse=True)
-    else:
-        results.sort(key=lambda x: x.get("popularity", 0) if isinstance(x, dict) else 0, reverse=True)
-
-    # ✅ Shuffle after sorting to introduce randomness
-    random.shuffle(results)
-
-    return results[:20]
+    return ranker.results()
 
 # ✅ Format search results
 def quart_format_results(items, search_type):
@@ -271,25 +336,81 @@ def flask_remove_duplicates(results):
             seen_artworks.add(artwork_id)
     return unique_results
 
-def flask_fetch_random_image():
+def flask_fetch_random_image(deadline=None):
     """
     Fetch a random image from the collection.
 
     This function is used to fetch random artwork to ensure there are at least 9 unique results.
+    Each network call only gets the time left on `deadline`, so together they never outlive it.
     """
     try:
-        response = requests.get(f"{BASE_URL}/search", params={"q": "art"}).json()
-        object_ids = response.get("objectIDs", [])
-        random.shuffle(object_ids) # Shuffle object IDs to get a random selection
-        for obj_id in object_ids[:5]:  
-            obj_response = requests.get(f"{BASE_URL}/objects/{obj_id}").json()
-            if obj_response.get("isPublicDomain") and "primaryImageSmall" in obj_response:
-                return obj_response
+        reserved = random_reservoir.take(1, set())
+        if reserved:
+            return reserved[0]
+
+        object_ids = met_client.run(met_client.search("art"), deadline.timeout() if deadline else None)
+        if deadline and deadline.expired:
+            return None
+        candidates = random.sample(object_ids, min(len(object_ids), 5))  # Random selection without shuffling every ID
+        results = met_client.run(met_client.fetch_first_artworks(candidates, limit=1), deadline.timeout() if deadline else None)
+        if results:
+            return results[0]
     except Exception as e:
         logging.error(f"Error fetching random image: {str(e)}")
     return None
 
 
+def flask_shuffled_keywords(keys, keyword_map):
+    """Collect the search keywords for the given keys, shuffling each key's keywords."""
+    keywords = []
+    for key in keys:
+        key_keywords = keyword_map.get(key, [])
+        keywords.extend(random.sample(key_keywords, len(key_keywords)))  # Shuffle the keywords
+    return keywords
+
+
+async def fetch_pooled_results(group, keys, keywords, limit=3):
+    """
+    Fetch up to `limit` unique artworks for pool keys, sampling the harvested pools first.
+
+    Only when the pools cannot supply enough artworks are the remaining ones fetched live.
+    Runs on the Met client loop.
+    """
+    results = []
+    seen = set()
+    for key in keys:
+        results.extend(met_pools.take(group, key, limit - len(results), seen))
+    if len(results) < limit:
+        results.extend(await met_client.fetch_artworks_for_keywords(keywords, limit - len(results), seen=seen))
+    return results
+
+
+async def fetch_met_results_within(deadline, moods, art_styles, subject, limit=3):
+    """
+    Run the mood, art style and subject fetchers concurrently within `deadline`.
+
+    Returns (results, partial): whatever finished in time, and whether any fetcher was cut off.
+    """
+    tasks = [
+        asyncio.ensure_future(fetch_pooled_results("moods", moods, flask_shuffled_keywords(moods, mood_keywords), limit)),
+        asyncio.ensure_future(fetch_pooled_results("art_styles", art_styles, flask_shuffled_keywords(art_styles, art_style_keywords), limit)),
+        asyncio.ensure_future(fetch_pooled_results("subjects", [subject], flask_shuffled_keywords([subject], subject_keywords), limit)),
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=deadline.remaining())
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for task in tasks:
+        if task in done and not task.exception():
+            results.extend(task.result())
+        elif task in done:
+            logging.error(f"Error fetching Met results: {task.exception()}")
+    if pending:
+        logging.warning(f"⚠️ {len(pending)} Met fetcher(s) exceeded the request budget")
+    return results, bool(pending)
+
+
 def flask_fetch_results_based_on_moods(moods, limit=3):
     """
     Fetch artworks based on a list of moods.
@@ -298,32 +419,10 @@ def flask_fetch_results_based_on_moods(moods, limit=3):
     a list of unique artworks.
     """
     results = []
-    seen_artworks = set()
 
     try:
-        for mood in moods:
-            keywords = mood_keywords.get(mood, [])
-            random.shuffle(keywords)  # Shuffle the keywords
-
-            for keyword in keywords:
-                response = requests.get(f"{BASE_URL}/search", params={"q": keyword}).json()
-                object_ids = response.get("objectIDs", [])
-
-                for obj_id in object_ids[:5]:  # Further increased limit for initial fetch
-                    obj_response = requests.get(f"{BASE_URL}/objects/{obj_id}").json()
-                    title = obj_response.get("title")
-                    artist = obj_response.get("artistDisplayName")
-                    object_date = obj_response.get("objectDate")
-                    artwork_id = (title, artist, object_date)
-
-                    if obj_response.get("isPublicDomain") and "primaryImageSmall" in obj_response and artwork_id not in seen_artworks:
-                        results.append(obj_response)
-                        seen_artworks.add(artwork_id)
-
-                    if len(results) >= limit: 
-                        break 
-            if len(results) >= limit:
-                break
+        keywords = flask_shuffled_keywords(moods, mood_keywords)
+        results = met_client.run(fetch_pooled_results("moods", moods, keywords, limit))
     except Exception as e:
         logging.error(f"Error fetching results for moods: {str(e)}")
     return results
@@ -337,31 +436,10 @@ def flask_fetch_results_based_on_art_styles(art_styles, limit=3):
     instead of moods, ensuring a variety of results based on the provided styles.
     """
     results = []
-    seen_artworks = set()
 
     try:
-        for style in art_styles:
-            keywords = art_style_keywords.get(style, [])
-            random.shuffle(keywords)  # Shuffle the keywords
-
-            for keyword in keywords:
-                response = requests.get(f"{BASE_URL}/search", params={"q": keyword}).json()
-                object_ids = response.get("objectIDs", [])
-
-                for obj_id in object_ids[:5]:  # Further increased limit for initial fetch
-                    obj_response = requests.get(f"{BASE_URL}/objects/{obj_id}").json()
-                    title = obj_response.get("title")
-                    artist = obj_response.get("artistDisplayName")
-                    object_date = obj_response.get("objectDate")
-                    artwork_id = (title, artist, object_date)
-                    
-                    if obj_response.get("isPublicDomain") and "primaryImageSmall" in obj_response and artwork_id not in seen_artworks:
-                        results.append(obj_response)
-                        seen_artworks.add(artwork_id)
-                    if len(results) >= limit:
-                        break
-            if len(results) >= limit:
-                break
+        keywords = flask_shuffled_keywords(art_styles, art_style_keywords)
+        results = met_client.run(fetch_pooled_results("art_styles", art_styles, keywords, limit))
     except Exception as e:
         logging.error(f"Error fetching results for art styles: {str(e)}")
     return results
@@ -375,38 +453,29 @@ def flask_fetch_results_based_on_subject(subject, limit=3):
     ensuring a variety of results based on the provided subject.
     """
     results = []
-    seen_artworks = set()
 
     try:
-        keywords = subject_keywords.get(subject, [])
-        random.shuffle(keywords)  # Shuffle the keywords
-
-        for keyword in keywords:
-            response = requests.get(f"{BASE_URL}/search", params={"q": keyword}).json()
-            object_ids = response.get("objectIDs", [])
-
-            for obj_id in object_ids[:5]:  # Further increased limit for initial fetch
-                obj_response = requests.get(f"{BASE_URL}/objects/{obj_id}").json()
-                title = obj_response.get("title")
-                artist = obj_response.get("artistDisplayName")
-                object_date = obj_response.get("objectDate")
-                artwork_id = (title, artist, object_date)
-
-                if obj_response.get("isPublicDomain") and "primaryImageSmall" in obj_response and artwork_id not in seen_artworks:
-                    results.append(obj_response)
-                    seen_artworks.add(artwork_id)
-                    
-                if len(results) >= limit:
-                    break
-            if len(results) >= limit:
-                break  
+        keywords = flask_shuffled_keywords([subject], subject_keywords)
+        results = met_client.run(fetch_pooled_results("subjects", [subject], keywords, limit))
     except Exception as e:
         logging.error(f"Error fetching results for subject: {str(e)}")
     return results
 
+@flask_app.route('/pool-status', methods=['GET'])
+def flask_pool_status():
+    """Report the fill level of every harvested Met candidate pool and the random reservoir."""
+    levels = met_pools.fill_levels()
+    levels["random"] = random_reservoir.fill_level()
+    return flask_jsonify(levels)
+
+@flask_app.route('/negative-cache-status', methods=['GET'])
+def flask_negative_cache_status():
+    """Report how many Met object fetches the unusable-object filter saved."""
+    return flask_jsonify(met_client.unusable.report() if met_client.unusable else {})
+
 @flask_app.route('/results', methods=['GET'])
 def flask_results():
-    return flask_render_template('results.html')
+    return flask_render_template('results.html', stream_origin=QUART_PUBLIC_URL)
 
 @flask_app.route('/process-preferences', methods=['POST'])
 def flask_process_preferences():
@@ -414,28 +483,36 @@ def flask_process_preferences():
     Process user preferences and fetch artwork results.
 
     This route receives the user's preferences and fetches artwork based on those preferences.
+    An optional `fields` parameter (query string or JSON body) selects the returned artwork fields.
+    The request runs within a latency budget (`X-Request-Budget` header, in seconds); if it ran
+    out, the response carries whatever finished in time and an `X-Partial-Results: true` header.
     """
     try:
+        deadline = Deadline.from_header(flask_request.headers.get('X-Request-Budget'))
         preferences = flask_request.json
+        fields = parse_fields(flask_request.args.get('fields') or preferences.get('fields'))
         # Extract preferences
         moods = preferences.get('moods', [])
         art_styles = preferences.get('art_styles', [])
         subject = preferences.get('subject')
 
-        # Fetch results using the updated method
-        mood_results = flask_fetch_results_based_on_moods(moods, limit=3) or []
-        art_style_results = flask_fetch_results_based_on_art_styles(art_styles, limit=3) or []
-        subject_results = flask_fetch_results_based_on_subject(subject, limit=3) or []
-
-        # Combine results
-        combined_results = mood_results + art_style_results + subject_results
+        # Fetch mood, art style and subject results concurrently within the Met share of the budget
+        combined_results, partial = met_client.run(
+            fetch_met_results_within(deadline.child(MET_BUDGET_SHARE), moods, art_styles, subject)
+        )
         # Remove duplicates
         unique_results = flask_remove_duplicates(combined_results)
         
         # Ensure there are at least 9 unique images
         if len(unique_results) < 9:
+            # Top up from the pre-validated reservoir first (no network round trips)
+            seen = {artwork_identity(result) for result in unique_results}
+            unique_results.extend(random_reservoir.take(9 - len(unique_results), seen))
             while len(unique_results) < 9:
-                random_image = flask_fetch_random_image()
+                if deadline.expired:
+                    partial = True
+                    break
+                random_image = flask_fetch_random_image(deadline)
                 if random_image and random_image not in unique_results:
                     unique_results.append(random_image)
                 else:
@@ -444,7 +521,10 @@ def flask_process_preferences():
         
         # Limit to 9 results if there are still more than 9
         unique_results = unique_results[:9]
-        return flask_jsonify(unique_results)
+        response = flask_jsonify(project_artworks(unique_results, fields))
+        if partial:
+            response.headers['X-Partial-Results'] = 'true'
+        return response
     except Exception as e:
         logging.error(f"Error processing preferences: {str(e)}")
         return flask_jsonify({"error":  str(e)}), 500
@@ -458,8 +538,11 @@ def flask_surprise_me():
     
     This function randomly selects preferences for both Met and Spotify,
     fetches results, and returns them for display on the results page.
+    An optional `fields` query parameter selects the returned artwork fields.
     """
     try:
+        fields = parse_fields(flask_request.args.get('fields'))
+
         # --- MET RANDOM SELECTIONS (existing code) ---
         # Randomly select preferences
         random_moods = random.sample(list(mood_keywords.keys()), 3)  # Select 3 random moods
@@ -508,28 +591,13 @@ def flask_surprise_me():
         # Get Spotify token synchronously (for Flask route)
         spotify_results = []
         try:
-            # Get Spotify API token
-            spotify_token_url = "https://accounts.spotify.com/api/token"
-            token_response = requests.post(
-                spotify_token_url,
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": SPOTIFY_CLIENT_ID,
-                    "client_secret": SPOTIFY_CLIENT_SECRET,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            token_data = token_response.json()
-            access_token = token_data.get("access_token")
+            # Get Spotify API token (cached and shared with the Quart routes)
+            access_token = spotify_tokens.get_token()
             
             if access_token:
                 # Make Spotify API request
                 search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={random_rec_type}&limit=20"
-                search_response = requests.get(
-                    search_url,
-                    headers={"Authorization": f"Bearer {access_token}"}
-                )
-                search_data = search_response.json()
+                search_data = flask_fetch_spotify_search(search_url)
                 
                 # Extract items
                 items = search_data.get(f"{random_rec_type}s", {}).get("items", [])
@@ -548,11 +616,7 @@ def flask_surprise_me():
                     # Try with a broader search term
                     broader_query = " OR ".join(random.sample(MAINSTREAM_GENRES, min(3, len(MAINSTREAM_GENRES))))
                     search_url = f"{SPOTIFY_API_URL}?q={quote_plus(broader_query)}&type={random_rec_type}&limit=20"
-                    search_response = requests.get(
-                        search_url,
-                        headers={"Authorization": f"Bearer {access_token}"}
-                    )
-                    search_data = search_response.json()
+                    search_data = flask_fetch_spotify_search(search_url)
                     items = search_data.get(f"{random_rec_type}s", {}).get("items", [])
                     valid_items = [item for item in items if isinstance(item, dict) and "name" in item]
                     
@@ -566,7 +630,7 @@ def flask_surprise_me():
         
         # Combine both Met and Spotify results
         combined_results = {
-            'met_results': met_results,
+            'met_results': project_artworks(met_results, fields),
             'spotify_results': spotify_results
         }
         
@@ -594,10 +658,19 @@ async def quart_results():
 
     # ✅ Handle "I'm Open to Anything" mode
     if rec_type.lower() == "i’m open to anything":
-        rec_type = random.choice(["playlist", "album", "artist", "track"])
+        rec_type = random.choice(SPOTIFY_REC_TYPES)
+        pooled_results = spotify_pools.sample(random.sample(list(MOOD_GENRE_MAP), 3), rec_type)
+        if pooled_results:
+            return await quart_render_template("results.html", results=pooled_results)
         all_genres = sum(MOOD_GENRE_MAP.values(), [])
         query = " OR ".join(random.sample(all_genres, min(len(all_genres), 5)))
 
+    # ✅ Mood-only requests are served from the pre-moderated pools when they are warm
+    if not query and moods:
+        pooled_results = spotify_pools.sample(moods, rec_type)
+        if pooled_results:
+            return await quart_render_template("results.html", results=pooled_results)
+
     # ✅ Use specific search query directly (From Old Code 1)
     if query:
         search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={rec_type}&limit=20"
@@ -608,11 +681,9 @@ async def quart_results():
 
         headers = {"Authorization": f"Bearer {access_token}"}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, headers=headers) as response:
-                if response.status != 200:
-                    return await quart_render_template("error.html", message="Failed to fetch data from Spotify"), response.status
-                data = await response.json()
+        data = await quart_fetch_spotify_search(HTTP_CLIENTS.get("spotify"), search_url, headers)
+        if not data:
+            return await quart_render_template("error.html", message="Failed to fetch data from Spotify"), 502
 
         items = data.get(rec_type + "s", {}).get("items", [])
         if not items:
@@ -637,37 +708,27 @@ async def quart_results():
     if not access_token:
         return await quart_render_template("error.html", message="Failed to fetch access token"), 500
 
-    headers = {"Authorization": f"Bearer {access_token}"}
-    results = []
-    offset, limit = 0, 50
-
-    async with aiohttp.ClientSession() as session:
-        while len(results) < 50:
-            url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={rec_type}&limit={limit}&offset={offset}"
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    return await quart_render_template("error.html", message="Failed to fetch data from Spotify"), response.status
-                data = await response.json()
-
-            items = data.get(rec_type + "s", {}).get("items", [])
-            if not isinstance(items, list):
-                break
-
-            results.extend(items)
-            offset += limit
-            if len(items) < limit:
-                break  # Stop if fewer items are returned
-
-    # ✅ Move Filtering BEFORE Randomization (Fixing Old Code 2’s Issue)
-    filtered_results = await process_results(results, rec_type)
-    if not filtered_results:
+    final_results = await quart_search_moderated(query, rec_type)
+    if final_results is None:
+        return await quart_render_template("error.html", message="Failed to fetch data from Spotify"), 502
+    if not final_results:
         return await quart_render_template("error.html", message="No safe results found"), 404
 
-    # ✅ Select 9 Random Results After Filtering
-    final_results = random.sample(filtered_results, min(len(filtered_results), 9))
-
     return await quart_render_template("results.html", results=final_results)
 
+# ✅ Rank pages as they land, then moderate only until 9 safe results are found
+async def quart_search_moderated(query, rec_type, on_select=None):
+    """Returns up to 9 moderated results for a search (None if Spotify did not answer); `on_select` sees each as it passes."""
+    access_token = await quart_get_access_token()
+    if not access_token:
+        return None
+
+    ranker = TopKRanker(SPOTIFY_RANK_CANDIDATES, rec_type)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    if await quart_search_items(query, rec_type, headers, on_page=ranker.push_page) is None:
+        return None
+    return await select_moderated(ranker.results(), lambda item: process_item(item, rec_type), on_select=on_select)
+
 # ✅ **Process Results with NSFW Filtering**
 async def process_results(results, rec_type):
     """Processes Spotify results with NSFW filtering and image safety checks."""
@@ -747,6 +808,183 @@ async def process_item(item, rec_type):
         "popularity": popularity
     }
 
+# ✅ Pre-moderated mood pools (mood-only requests sample these instead of searching live; SPOTIFY_POOLS_ENABLED=0 turns them off)
+async def spotify_pool_loader(mood, rec_type, count):
+    """Searches a random handful of one mood's genres and returns up to `count` moderated results."""
+    access_token = await quart_get_access_token()
+    if not access_token:
+        return []
+
+    genres = MOOD_GENRE_MAP[mood]
+    query = " OR ".join(random.sample(genres, min(len(genres), 5)))
+    items = await quart_search_items(query, rec_type, {"Authorization": f"Bearer {access_token}"}) or []
+    random.shuffle(items)
+    return await process_results(items[:count], rec_type)
+
+spotify_pools = SpotifyResultPools(spotify_pool_loader, MOOD_GENRE_MAP, SPOTIFY_REC_TYPES)  # Filled on demand once serving
+
+@quart_app.route('/spotify-pool-status')
+async def quart_spotify_pool_status():
+    """Report fill levels of the pre-moderated Spotify mood pools."""
+    return quart_jsonify(spotify_pools.fill_levels())
+
+# ✅ Streaming combined results (Server-Sent Events)
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_met_results(deadline, moods, art_styles, subject, fields, emit, limit=3):
+    """
+    Emits each Met fetcher's artworks (up to 9, de-duplicated) as soon as that fetcher finishes.
+
+    The fetchers run on the Met client loop. Returns whether any was cut off by `deadline`.
+    """
+    pending = {
+        asyncio.wrap_future(met_client.submit(fetch_pooled_results(group, keys, flask_shuffled_keywords(keys, keyword_map), limit)))
+        for group, keys, keyword_map in (
+            ("moods", moods, mood_keywords),
+            ("art_styles", art_styles, art_style_keywords),
+            ("subjects", [subject], subject_keywords),
+        )
+    }
+    seen = set()
+    try:
+        while pending and not deadline.expired:
+            done, pending = await asyncio.wait(pending, timeout=deadline.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception():
+                    logging.error(f"Error fetching Met results: {task.exception()}")
+                    continue
+                for artwork in task.result():
+                    if len(seen) < 9 and artwork_identity(artwork) not in seen:
+                        seen.add(artwork_identity(artwork))
+                        emit("artwork", project_artworks([artwork], fields)[0])
+    finally:
+        for task in pending:  # Also on client disconnect: stops the fetchers on the Met client loop
+            task.cancel()
+
+    if pending:
+        logging.warning(f"⚠️ {len(pending)} Met fetcher(s) exceeded the request budget")
+    return bool(pending)
+
+async def stream_spotify_results(deadline, rec_type, query, moods, emit):
+    """
+    Emits each Spotify result as soon as it is ready: all at once from the mood pools, else as it passes moderation.
+
+    Returns whether the search was cut off by `deadline`.
+    """
+    pooled_results = []
+    if "open to anything" in rec_type.lower():
+        rec_type = random.choice(SPOTIFY_REC_TYPES)
+        pooled_results = spotify_pools.sample(random.sample(list(MOOD_GENRE_MAP), 3), rec_type)
+        all_genres = sum(MOOD_GENRE_MAP.values(), [])
+        query = " OR ".join(random.sample(all_genres, min(len(all_genres), 5)))
+    elif not query and moods:
+        pooled_results = spotify_pools.sample(moods, rec_type)
+
+    for item in pooled_results:
+        emit("spotify", item)
+    if pooled_results:
+        return False
+
+    if not query:
+        genres = [genre for mood in moods for genre in MOOD_GENRE_MAP.get(mood, [])]
+        query = " OR ".join(genres[:5]) or "music"
+    try:
+        await asyncio.wait_for(
+            quart_search_moderated(query, rec_type, on_select=lambda item: emit("spotify", item)),
+            deadline.remaining(),
+        )
+    except asyncio.TimeoutError:
+        logging.warning("⚠️ Spotify leg exceeded the request budget")
+        return True
+    return False
+
+@quart_app.route('/combined-results/stream', methods=['GET'])
+async def quart_combined_results_stream():
+    """
+    Streams combined Met and Spotify results as Server-Sent Events.
+
+    Takes the `/combined-results` form fields as query parameters. Every artwork
+    is sent as an `artwork` event and every moderated Spotify item as a `spotify`
+    event as soon as it is ready, so the first result arrives with the fastest
+    upstream. A final `done` event carries `partial`. The budget comes from the
+    `X-Request-Budget` header or a `budget` parameter (EventSource cannot set headers),
+    and can only tighten the server's budget.
+    """
+    args = quart_request.args
+    fields = parse_fields(args.get('fields'))
+    moods = args.getlist('moods')
+    deadline = Deadline.from_header(quart_request.headers.get('X-Request-Budget') or args.get('budget'))
+    queue = asyncio.Queue()
+
+    def emit(event, data):
+        queue.put_nowait((event, data))
+
+    async def run_leg(name, coro):
+        partial = True
+        try:
+            partial = await coro
+        except Exception as e:
+            logging.error(f"❌ Streaming {name} results failed: {e}")
+        finally:
+            queue.put_nowait((None, partial))
+
+    legs = [
+        asyncio.ensure_future(run_leg("Met", stream_met_results(
+            deadline.child(MET_BUDGET_SHARE), moods, args.getlist('art_styles'), args.get('subject'), fields, emit
+        ))),
+        asyncio.ensure_future(run_leg("Spotify", stream_spotify_results(
+            deadline.child(SPOTIFY_BUDGET_SHARE), args.get('rec_type', 'playlist'), args.get('query', '').strip(), moods, emit
+        ))),
+    ]
+
+    async def events():
+        finished, partial = 0, False
+        try:
+            while finished < len(legs):
+                event, data = await queue.get()
+                if event is None:  # One leg is done
+                    finished += 1
+                    partial = partial or data
+                    continue
+                yield sse_event(event, data)
+            yield sse_event("done", {"partial": partial})
+        finally:
+            for task in legs:  # The client went away early
+                task.cancel()
+
+    return events(), 200, {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+        "Access-Control-Allow-Origin": STREAM_ALLOWED_ORIGIN,
+    }
+
+@quart_app.route('/moderation-status')
+async def quart_moderation_status():
+    """Report how moderation checks are being batched and how often stored verdicts are reused."""
+    return quart_jsonify({
+        "openai_text": OPENAI_TEXT_BATCHER.metrics(),
+        "vision_safesearch": VISION_SAFE_SEARCH.batcher.metrics(),
+        "verdict_cache": MODERATION_VERDICTS.metrics(),
+        "image_identity": IMAGE_IDENTITY.metrics(),
+    })
+
+@quart_app.route('/token-status')
+async def quart_token_status():
+    """Report Spotify token manager metrics."""
+    return quart_jsonify(spotify_tokens.metrics())
+
+@quart_app.route('/spotify-cache-status')
+async def quart_spotify_cache_status():
+    """Report Spotify search cache hit ratios and size."""
+    return quart_jsonify(spotify_search_cache.metrics())
+
+@quart_app.route('/rate-limit-status')
+async def quart_rate_limit_status():
+    """Report the Spotify rate limiter's queue depth, wait times and pause state."""
+    return quart_jsonify(spotify_limiter.metrics())
+
 @quart_app.route('/about')
 async def quart_about():
     return await quart_render_template('about.html')
@@ -764,6 +1002,7 @@ def combined_results():
     try:
         # Get form data
         form_data = flask_request.form
+        fields = parse_fields(flask_request.args.get('fields') or form_data.get('fields'))
         
         # Debug logging - print all form data to see exactly what's coming in
         logging.info("DEBUG: Form data received:")
@@ -775,17 +1014,11 @@ def combined_results():
         art_styles = form_data.getlist('art_styles') 
         subject = form_data.get('subject')
         
-        # Get Met results using synchronous functions
-        mood_results = flask_fetch_results_based_on_moods(moods, limit=3)
-        art_style_results = flask_fetch_results_based_on_art_styles(art_styles, limit=3)
-        subject_results = flask_fetch_results_based_on_subject(subject, limit=3)
-        
-        # Combine and deduplicate Met results
-        met_results = flask_remove_duplicates(mood_results + art_style_results + subject_results)
-        met_results = met_results[:9]  # Limit to 9 results
-        
-        # Handle any needed random Met images (code to fill up to 9 results)
-        # ...
+        # Start the Met fetchers on the Met client loop; the Spotify leg below runs alongside them
+        deadline = Deadline.from_header(flask_request.headers.get('X-Request-Budget'))
+        met_future = met_client.submit(
+            fetch_met_results_within(deadline.child(MET_BUDGET_SHARE), moods, art_styles, subject)
+        )
         
         # Process Spotify data with MUCH more robust handling
         rec_type = form_data.get('rec_type', 'playlist')
@@ -826,6 +1059,15 @@ def combined_results():
         else:
             logging.info(f"DEBUG: Using specific rec_type: '{rec_type}'")
         
+        # Mood-only (and "open to anything") requests sample the pre-moderated pools first
+        spotify_results = []
+        if is_open_to_anything:
+            spotify_results = spotify_pools.sample(random.sample(list(MOOD_GENRE_MAP), 3), rec_type)
+        elif not query and moods:
+            spotify_results = spotify_pools.sample(moods, rec_type)
+        if spotify_results:
+            logging.info(f"DEBUG: Served {len(spotify_results)} Spotify results from the mood pools")
+        
         # Create search query from moods if no direct query
         if not query and moods:
             selected_genres = []
@@ -844,94 +1086,79 @@ def combined_results():
             logging.info(f"DEBUG: Using fallback query: '{query}'")
         
         # Make synchronous request to Spotify with better error handling
-        spotify_results = []
-        try:
-            # Get Spotify token
-            spotify_token_url = "https://accounts.spotify.com/api/token"
-            token_response = requests.post(
-                spotify_token_url,
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": SPOTIFY_CLIENT_ID,
-                    "client_secret": SPOTIFY_CLIENT_SECRET,
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
-            
-            if token_response.status_code != 200:
-                logging.error(f"DEBUG: Spotify token error: {token_response.text}")
-                raise Exception(f"Spotify token error: {token_response.status_code}")
-                
-            token_data = token_response.json()
-            access_token = token_data.get("access_token")
-            
-            if not access_token:
-                logging.error("DEBUG: No access token received from Spotify")
-                raise Exception("No access token received from Spotify")
-            
-            # Make search request to Spotify API
-            search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={rec_type}&limit=20"
-            logging.info(f"DEBUG: Spotify search URL: {search_url}")
+        spotify_partial = False
+        spotify_deadline = deadline.child(SPOTIFY_BUDGET_SHARE)
+        if not spotify_results:
+            try:
+                # Get Spotify token (cached and shared with the Quart routes)
+                access_token = spotify_tokens.get_token(timeout=spotify_deadline.timeout())
             
-            search_response = requests.get(
-                search_url,
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
+                if not access_token:
+                    logging.error("DEBUG: No access token received from Spotify")
+                    raise Exception("No access token received from Spotify")
             
-            if search_response.status_code != 200:
-                logging.error(f"DEBUG: Spotify search error: {search_response.text}")
-                raise Exception(f"Spotify search error: {search_response.status_code}")
+                # Make search request to Spotify API
+                search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={rec_type}&limit=20"
+                logging.info(f"DEBUG: Spotify search URL: {search_url}")
             
-            search_data = search_response.json()
-            response_items_key = f"{rec_type}s"
+                search_data = flask_fetch_spotify_search(search_url, timeout=spotify_deadline.timeout())
+                response_items_key = f"{rec_type}s"
             
-            # Check if we have the expected data structure
-            if response_items_key not in search_data:
-                logging.error(f"DEBUG: Missing expected key '{response_items_key}' in Spotify response")
-                logging.error(f"DEBUG: Spotify response keys: {list(search_data.keys())}")
-                raise Exception(f"Missing expected key '{response_items_key}' in Spotify response")
+                # Check if we have the expected data structure
+                if response_items_key not in search_data:
+                    logging.error(f"DEBUG: Missing expected key '{response_items_key}' in Spotify response")
+                    logging.error(f"DEBUG: Spotify response keys: {list(search_data.keys())}")
+                    raise Exception(f"Missing expected key '{response_items_key}' in Spotify response")
             
-            items = search_data.get(response_items_key, {}).get("items", [])
-            logging.info(f"DEBUG: Retrieved {len(items)} items from Spotify")
+                items = search_data.get(response_items_key, {}).get("items", [])
+                logging.info(f"DEBUG: Retrieved {len(items)} items from Spotify")
             
-            if items:
-                spotify_results = quart_format_results(items, rec_type)
-                logging.info(f"DEBUG: Formatted to {len(spotify_results)} results")
-                
-                # Limit to 9 results 
-                spotify_results = spotify_results[:9]
-            else:
-                logging.warning(f"DEBUG: No items returned from Spotify for query '{query}' and type '{rec_type}'")
+                if items:
+                    # Rank first so only the 9 shown results are formatted
+                    spotify_results = quart_format_results(rank_top_k(items, rec_type, 9), rec_type)
+                    logging.info(f"DEBUG: Formatted to {len(spotify_results)} results")
+                else:
+                    logging.warning(f"DEBUG: No items returned from Spotify for query '{query}' and type '{rec_type}'")
                 
-                # Fallback to a different rec_type if no results
-                if is_open_to_anything:
-                    fallback_rec_type = random.choice(["playlist", "album", "artist", "track"])
-                    if fallback_rec_type != rec_type:
-                        logging.info(f"DEBUG: Trying fallback rec_type: '{fallback_rec_type}'")
+                    # Fallback to a different rec_type if no results
+                    if is_open_to_anything:
+                        fallback_rec_type = random.choice(["playlist", "album", "artist", "track"])
+                        if fallback_rec_type != rec_type and not spotify_deadline.expired:
+                            logging.info(f"DEBUG: Trying fallback rec_type: '{fallback_rec_type}'")
                         
-                        search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={fallback_rec_type}&limit=20"
-                        search_response = requests.get(
-                            search_url,
-                            headers={"Authorization": f"Bearer {access_token}"}
-                        )
+                            search_url = f"{SPOTIFY_API_URL}?q={quote_plus(query)}&type={fallback_rec_type}&limit=20"
+                            search_data = flask_fetch_spotify_search(search_url, timeout=spotify_deadline.timeout())
                         
-                        if search_response.status_code == 200:
-                            search_data = search_response.json()
-                            items = search_data.get(f"{fallback_rec_type}s", {}).get("items", [])
+                            if search_data:
+                                items = search_data.get(f"{fallback_rec_type}s", {}).get("items", [])
                             
-                            if items:
-                                spotify_results = quart_format_results(items, fallback_rec_type)
-                                spotify_results = spotify_results[:9]
-                                logging.info(f"DEBUG: Got {len(spotify_results)} results with fallback rec_type")
+                                if items:
+                                    spotify_results = quart_format_results(rank_top_k(items, fallback_rec_type, 9), fallback_rec_type)
+                                    logging.info(f"DEBUG: Got {len(spotify_results)} results with fallback rec_type")
         
-        except Exception as e:
-            logging.error(f"DEBUG: Spotify API error: {str(e)}")
-            spotify_results = []
+            except requests.Timeout:
+                logging.warning("⚠️ Spotify leg exceeded the request budget")
+                spotify_partial = True
+            except Exception as e:
+                logging.error(f"DEBUG: Spotify API error: {str(e)}")
+                spotify_results = []
+        
+        # Collect whatever the Met fetchers finished within the budget
+        try:
+            met_raw_results, met_partial = met_future.result(timeout=deadline.timeout())
+        except concurrent.futures.TimeoutError:
+            met_future.cancel()
+            met_raw_results, met_partial = [], True
+        
+        # Combine and deduplicate Met results
+        met_results = flask_remove_duplicates(met_raw_results)
+        met_results = met_results[:9]  # Limit to 9 results
         
         # Combine results
         combined_results = {
-            'met_results': met_results,
-            'spotify_results': spotify_results
+            'met_results': project_artworks(met_results, fields),
+            'spotify_results': spotify_results,
+            'partial': met_partial or spotify_partial
         }
         
         logging.info(f"DEBUG: Returning {len(met_results)} Met results and {len(spotify_results)} Spotify results")
@@ -989,7 +1216,7 @@ if __name__ == '__main__':
         flask_app.run(port=3000)
 
     def run_quart():
-        uvicorn.run("app:quart_app", host="127.0.0.1", port=3001, log_level="info")
+        uvicorn.run(quart_app, host="127.0.0.1", port=3001, log_level="info")  # Same module as Flask (no re-import)
 
     flask_thread = threading.Thread(target=run_flask)
     quart_thread = threading.Thread(target=run_quart)
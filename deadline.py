@@ -0,0 +1,47 @@
+# deadline.py
+
+import os, math, time
+
+# ✅ Request latency budget
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", 4.0))  # Whole request (clients may only ask for less)
+MIN_TIMEOUT_SECONDS = 0.05  # Smallest timeout handed to a socket call
+
+
+class Deadline:
+    """
+    Absolute point in time by which a request has to answer.
+
+    Legs of a request take a `child()` deadline holding a share of the total
+    budget (never extending past the parent), and socket calls use `timeout()`
+    so nothing can outlive the request.
+    """
+
+    def __init__(self, budget=REQUEST_BUDGET_SECONDS, expires_at=None):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget if expires_at is None else expires_at
+
+    @classmethod
+    def from_header(cls, value, default=REQUEST_BUDGET_SECONDS):
+        """Builds a deadline from an optional `X-Request-Budget` header (seconds); it can only tighten `default`."""
+        try:
+            budget = float(value) if value else default
+        except (TypeError, ValueError):
+            budget = default
+        if math.isnan(budget):
+            budget = default
+        return cls(min(max(budget, MIN_TIMEOUT_SECONDS), default))
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self):
+        """Remaining time as a socket timeout (never zero, which would mean 'no timeout')."""
+        return max(self.remaining(), MIN_TIMEOUT_SECONDS)
+
+    def child(self, share):
+        """A deadline for one leg: `share` of the total budget, but never past this deadline."""
+        return Deadline(self.budget * share, min(self.expires_at, time.monotonic() + self.budget * share))
@@ -0,0 +1,154 @@
+# disk_cache.py
+
+import os, json, time, sqlite3, logging, threading
+
+# ✅ Shared on-disk cache location (one directory for every worker process)
+CACHE_DIR = os.getenv("ARTSONIX_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+PURGE_EVERY_WRITES = int(os.getenv("CACHE_PURGE_EVERY_WRITES", 1000))  # Expired rows are deleted after this many writes
+
+
+class SQLiteTTLCache:
+    """
+    Persistent JSON key/value store with per-entry expiry, backed by SQLite.
+
+    The database runs in WAL mode so any number of gunicorn workers can read
+    while one writes, and entries survive restarts. Connections are opened per
+    thread and re-opened after a fork. Every `purge_every` writes (per
+    process), expired rows are deleted so the file does not grow forever.
+    """
+
+    def __init__(self, path, table="entries", ttl=3600, purge_every=PURGE_EVERY_WRITES):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, default=None):
+        """Returns the cached value for a key, or `default` if missing or expired."""
+        try:
+            row = self._connect().execute(
+                f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (str(key), time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache read failed ({self.table}): {e}")
+            return default
+        return json.loads(row[0]) if row else default
+
+    def get_many(self, keys):
+        """Returns a {key: value} dict for every key that is cached and fresh."""
+        keys = [str(key) for key in keys]
+        if not keys:
+            return {}
+        found = {}
+        try:
+            conn = self._connect()
+            for start in range(0, len(keys), 500):  # Stay under SQLite's bound-parameter limit
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders}) AND expires_at > ?",
+                    (*chunk, time.time()),
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache read failed ({self.table}): {e}")
+        return found
+
+    def get_prefix(self, prefix):
+        """Returns a {key: value} dict for every fresh entry whose key starts with `prefix`."""
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)  # Range scan on the primary key instead of LIKE
+        try:
+            rows = self._connect().execute(
+                f"SELECT key, value FROM {self.table} WHERE key >= ? AND key < ? AND expires_at > ?",
+                (prefix, upper, time.time()),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache read failed ({self.table}): {e}")
+            return {}
+        return {key: json.loads(value) for key, value in rows}
+
+    def _count_writes(self, count):
+        """Purges expired rows once every `purge_every` writes."""
+        if not self.purge_every:
+            return
+        with self._writes_lock:
+            self._writes += count
+            due = self._writes >= self.purge_every
+            if due:
+                self._writes = 0
+        if due:
+            self.purge_expired()
+
+    def set(self, key, value, ttl=None):
+        """Stores a JSON-serializable value, replacing any previous entry."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            self._connect().execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (str(key), json.dumps(value), expires_at),
+            )
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache write failed ({self.table}): {e}")
+            return
+        self._count_writes(1)
+
+    def set_many(self, items, ttl=None):
+        """Stores several (key, value) pairs in one transaction."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        rows = [(str(key), json.dumps(value), expires_at) for key, value in items]
+        if not rows:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache write failed ({self.table}): {e}")
+            return
+        self._count_writes(len(rows))
+
+    def delete(self, key):
+        try:
+            self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (str(key),))
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache delete failed ({self.table}): {e}")
+
+    def purge_expired(self):
+        """Deletes expired entries and returns how many were removed."""
+        try:
+            return self._connect().execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+        except sqlite3.Error as e:
+            logging.error(f"❌ Cache purge failed ({self.table}): {e}")
+            return 0
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
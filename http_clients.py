@@ -0,0 +1,69 @@
+# http_clients.py
+
+import asyncio, logging, aiohttp
+
+# ✅ Connector settings per upstream
+UPSTREAMS = {
+    "spotify": {"limit": 100, "limit_per_host": 50, "timeout": 10},
+    "openai": {"limit": 100, "limit_per_host": 50, "timeout": 15},
+    "images": {"limit": 50, "limit_per_host": 20, "timeout": 10},
+}
+DNS_CACHE_TTL = 300  # Seconds a resolved address is reused
+KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection stays open
+
+
+class HttpClientRegistry:
+    """
+    Application-lifetime aiohttp sessions, one per upstream service.
+
+    `open()` / `close()` are wired to the Quart serving lifecycle. `get()` hands
+    out the long-lived session for the running event loop; a caller on another
+    loop (a script, a test) gets its own session for that loop, alongside the
+    serving loop's one rather than in place of it.
+    """
+
+    def __init__(self, upstreams=UPSTREAMS):
+        self.upstreams = upstreams
+        self._sessions = {}  # (name, loop) -> session
+
+    def _create(self, name):
+        config = self.upstreams[name]
+        connector = aiohttp.TCPConnector(
+            limit=config["limit"],
+            limit_per_host=config["limit_per_host"],
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=config["timeout"]))
+
+    async def open(self):
+        """Creates every upstream session on the running loop (call on startup)."""
+        for name in self.upstreams:
+            self.get(name)
+        logging.info(f"✅ Opened HTTP clients: {', '.join(self.upstreams)}")
+
+    def get(self, name):
+        """Returns the long-lived session for an upstream, creating it for the running loop if needed."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get((name, loop))
+        if session is None or session.closed:
+            session = self._create(name)
+            self._sessions[(name, loop)] = session
+        return session
+
+    async def close(self):
+        """Closes every session, each on the loop that owns it (call on shutdown)."""
+        loop = asyncio.get_running_loop()
+        for (name, session_loop), session in list(self._sessions.items()):
+            del self._sessions[(name, session_loop)]
+            if session.closed:
+                continue
+            if session_loop is loop:
+                await session.close()
+            elif session_loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), session_loop))
+            else:
+                logging.warning(f"⚠️ Dropping {name} HTTP client: its event loop is no longer running")
+
+
+HTTP_CLIENTS = HttpClientRegistry()
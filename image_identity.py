@@ -0,0 +1,86 @@
+# image_identity.py
+
+import os, io, asyncio, hashlib, logging
+from PIL import Image
+from disk_cache import CACHE_DIR, SQLiteTTLCache
+from http_clients import HTTP_CLIENTS
+from single_flight import SingleFlight
+
+# ✅ Identity store settings
+IMAGE_IDENTITY_PATH = os.getenv("IMAGE_IDENTITY_PATH", os.path.join(CACHE_DIR, "moderation.sqlite3"))
+IMAGE_IDENTITY_TTL = int(os.getenv("IMAGE_IDENTITY_TTL", 30 * 24 * 3600))  # 30 days; CDN image URLs don't change content
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", 5 * 1024 * 1024))  # Larger images skip the identity layer
+
+
+def dhash(image, size=8):
+    """
+    64-bit difference hash: one bit per "is this pixel brighter than its right
+    neighbour" on a tiny grayscale copy. Resized or re-encoded copies of a
+    picture land within a few bits of each other.
+    """
+    image.draft("L", (size * 8, size * 8))  # JPEGs decode at a fraction of full size (any coarser and variants drift apart)
+    pixels = image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            bits = (bits << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return bits
+
+
+def fingerprint(data):
+    """Content identity of image bytes: {"sha256": ..., "phash": ...}. Raises if they don't decode."""
+    with Image.open(io.BytesIO(data)) as image:
+        return {"sha256": hashlib.sha256(data).hexdigest(), "phash": dhash(image)}
+
+
+class ImageIdentity:
+    """
+    Maps image URLs to the identity of the picture behind them.
+
+    Each URL is downloaded and hashed once (concurrent lookups share the
+    download); the identity is then remembered in SQLite for every worker.
+    Hashing and the SQLite reads and writes run off the event loop. Anything
+    that can't be fetched or decoded gets None, and callers fall back to
+    URL-only caching.
+    """
+
+    def __init__(self, path=IMAGE_IDENTITY_PATH, ttl=IMAGE_IDENTITY_TTL, max_bytes=IMAGE_MAX_BYTES):
+        self.store = SQLiteTTLCache(path, table="image_identities", ttl=ttl)
+        self.max_bytes = max_bytes
+        self.flights = SingleFlight()
+        self.stats = {"remembered": 0, "fetched": 0, "failed": 0}
+
+    async def _download(self, image_url):
+        async with HTTP_CLIENTS.get("images").get(image_url) as response:
+            response.raise_for_status()
+            data = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                data += chunk
+                if len(data) > self.max_bytes:
+                    raise ValueError(f"larger than {self.max_bytes} bytes")
+            return bytes(data)
+
+    async def _identify(self, image_url):
+        try:
+            data = await self._download(image_url)
+            identity = await asyncio.get_running_loop().run_in_executor(None, fingerprint, data)
+        except Exception as e:
+            logging.warning(f"⚠️ Could not fingerprint {image_url}: {e}")
+            self.stats["failed"] += 1
+            return None
+
+        await asyncio.to_thread(self.store.set, image_url, identity)
+        self.stats["fetched"] += 1
+        return identity
+
+    async def identify(self, image_url):
+        """{"sha256", "phash"} of the image at a URL, or None if it can't be fetched or decoded."""
+        identity = await asyncio.to_thread(self.store.get, image_url)
+        if identity is not None:
+            self.stats["remembered"] += 1
+            return identity
+        return await self.flights.do(image_url, lambda: self._identify(image_url))
+
+    def metrics(self):
+        return dict(self.stats)
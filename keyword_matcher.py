@@ -0,0 +1,170 @@
+# keyword_matcher.py
+
+import re, sys, html, timeit
+from collections import deque
+
+# ✅ Match labels (bit flags, so one scan can report several)
+ALLOW = 1
+BLOCK = 2
+
+# r"(\b?:a|b\b)" in the term lists was meant as r"\b(?:a|b)\b"
+MALFORMED_WORD_GROUP = re.compile(r"^\(\\b\?:(.*?)(?:\\b)?\)$")
+
+
+def is_pattern(term):
+    """Whether a term list entry is a regular expression rather than a literal phrase."""
+    return "\\" in term or "(?:" in term
+
+
+def normalize_pattern(term):
+    """Repairs the `(\\b?:...\\b)` word-group typo in a pattern entry."""
+    match = MALFORMED_WORD_GROUP.match(term)
+    return rf"\b(?:{match.group(1)})\b" if match else term
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over literal phrases, each tagged with a label bit.
+
+    `scan()` walks the text once, whatever the number of phrases, and reports
+    the OR of the labels of every phrase found as a substring.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._labels = [0]
+        self._built = False
+
+    def add(self, phrase, label):
+        state = 0
+        for char in phrase:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._labels.append(0)
+                self._goto[state][char] = following
+            state = following
+        self._labels[state] |= label
+        self._built = False
+
+    def build(self):
+        """Computes failure links (breadth first) and folds suffix-phrase labels into each state."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                self._labels[following] |= self._labels[self._fail[following]]
+        self._built = True
+        return self
+
+    def scan(self, text, stop=0):
+        """Returns the labels of every phrase in `text`, returning early once a label in `stop` is seen."""
+        if not self._built:
+            self.build()
+        goto, fail, labels = self._goto, self._fail, self._labels
+        state, found = 0, 0
+        for char in text:
+            while True:
+                following = goto[state].get(char)
+                if following is not None:
+                    state = following
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if labels[state]:
+                found |= labels[state]
+                if found & stop:
+                    return found
+        return found
+
+    def __len__(self):
+        return len(self._goto)
+
+
+class KeywordMatcher:
+    """
+    Classifies a text against allow and block term lists in a single pass.
+
+    Literal terms are matched case-insensitively as substrings (like the `in`
+    checks they replace) by one `KeywordAutomaton`. Regex entries, such as
+    r"(\\b?:play|playing\\b)", are compiled into one alternation per list
+    and run only when the literals did not already decide the text.
+    Allow terms win over block terms.
+    """
+
+    def __init__(self, allow_terms, block_terms):
+        self.automaton = KeywordAutomaton()
+        patterns = {ALLOW: [], BLOCK: []}
+        for label, terms in ((ALLOW, allow_terms), (BLOCK, block_terms)):
+            for term in terms:
+                if is_pattern(term):
+                    patterns[label].append(normalize_pattern(term))
+                elif term:
+                    self.automaton.add(term.lower(), label)
+        self.automaton.build()
+        self.patterns = {label: re.compile("|".join(entries), re.IGNORECASE) for label, entries in patterns.items() if entries}
+
+    def classify(self, text):
+        """True if an allow term matches, False if only a block term does, None if neither."""
+        if not text:
+            return True
+        text = html.unescape(text).strip().lower()
+        found = self.automaton.scan(text, stop=ALLOW)
+        if not found & ALLOW and ALLOW in self.patterns and self.patterns[ALLOW].search(text):
+            found |= ALLOW
+        if found & ALLOW:
+            return True
+        if not found & BLOCK and BLOCK in self.patterns and self.patterns[BLOCK].search(text):
+            found |= BLOCK
+        return False if found & BLOCK else None
+
+
+def linear_classify(text, allow_terms, block_terms):
+    """The scan `keyword_filter` used to do: one substring search per term (pattern entries taken literally)."""
+    if not text:
+        return True
+    text = html.unescape(text).strip().lower()
+    if any(term.lower() in text for term in allow_terms):
+        return True
+    if any(term.lower() in text for term in block_terms):
+        return False
+    return None
+
+
+BENCHMARK_TEXTS = [
+    "Midnight Drive",
+    "Xqzv lmnk frp wvtz",
+    "ザ・ベスト・オブ・夜",
+    "Songs to Fall Asleep To &amp; Wake Up Slowly",
+    "A calm tranquil evening for long walks in the rain and quiet coffee shops",
+]
+
+
+def benchmark(allow_terms, block_terms, texts=BENCHMARK_TEXTS, number=2000):
+    """Prints per-text timings (microseconds per call) of the linear scan and the compiled matcher (texts must not hit a pattern entry)."""
+    matcher = KeywordMatcher(allow_terms, block_terms)
+    print(f"{len(allow_terms) + len(block_terms)} terms, {len(matcher.automaton)} automaton states")
+    for text in texts:
+        assert matcher.classify(text) == linear_classify(text, allow_terms, block_terms)
+        linear = timeit.timeit(lambda: linear_classify(text, allow_terms, block_terms), number=number) / number * 1e6
+        compiled = timeit.timeit(lambda: matcher.classify(text), number=number) / number * 1e6
+        print(f"{linear:8.1f}µs -> {compiled:6.1f}µs ({linear / compiled:4.1f}x)  {text[:40]!r}")
+
+
+if __name__ == "__main__":
+    # python keyword_matcher.py bench
+    if sys.argv[1:] != ["bench"]:
+        sys.exit("usage: python keyword_matcher.py bench")
+    from nsfw_terms import WHITELIST_TERMS, WHITELIST_ARTISTS, BLOCKLIST_TERMS
+    benchmark([*WHITELIST_TERMS, *WHITELIST_ARTISTS], BLOCKLIST_TERMS)
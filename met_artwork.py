@@ -0,0 +1,76 @@
+# met_artwork.py
+
+# ✅ Fields an artwork record can carry (everything else from the raw Met payload is dropped)
+ARTWORK_FIELDS = (
+    "objectID", "title", "artistDisplayName", "objectDate", "objectName", "objectURL",
+    "primaryImage", "primaryImageSmall", "isPublicDomain", "medium", "department",
+    "culture", "objectBeginDate", "objectEndDate",
+)
+
+# ✅ Fields results.html actually renders (default projection for JSON responses)
+DEFAULT_FIELDS = (
+    "objectID", "title", "artistDisplayName", "objectDate", "objectName", "objectURL",
+    "primaryImage", "primaryImageSmall",
+)
+
+
+class ArtworkRecord:
+    """
+    Compact, slotted artwork record holding only `ARTWORK_FIELDS`.
+
+    Supports the read-only dict operations the fetch helpers use (`get`, `in`,
+    `[]`), so it can stand in for a raw Met object payload.
+    """
+
+    __slots__ = ARTWORK_FIELDS
+
+    def __init__(self, **fields):
+        for field in ARTWORK_FIELDS:
+            setattr(self, field, fields.get(field))
+
+    @classmethod
+    def from_object(cls, obj):
+        """Builds a record from a raw Met payload (records are returned unchanged)."""
+        if isinstance(obj, cls):
+            return obj
+        record = cls.__new__(cls)
+        for field in ARTWORK_FIELDS:
+            setattr(record, field, obj.get(field))
+        return record
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in ARTWORK_FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        if field not in ARTWORK_FIELDS or getattr(self, field) is None:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __contains__(self, field):
+        return field in ARTWORK_FIELDS and getattr(self, field) is not None
+
+    def __eq__(self, other):
+        if not isinstance(other, ArtworkRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in ARTWORK_FIELDS)
+
+    __hash__ = None
+
+    def to_dict(self, fields=DEFAULT_FIELDS):
+        return {field: getattr(self, field) for field in fields}
+
+
+def parse_fields(value):
+    """Turns a `fields=` parameter ("title,objectURL" or a list) into a tuple of known fields."""
+    if not value:
+        return DEFAULT_FIELDS
+    if isinstance(value, str):
+        value = value.split(",")
+    fields = tuple(field.strip() for field in value if field.strip() in ARTWORK_FIELDS)
+    return fields or DEFAULT_FIELDS
+
+
+def project_artworks(artworks, fields=DEFAULT_FIELDS):
+    """Projects raw payloads or records onto `fields` for a JSON response."""
+    return [ArtworkRecord.from_object(artwork).to_dict(fields) for artwork in artworks]
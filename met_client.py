@@ -0,0 +1,358 @@
+# met_client.py
+
+import os, time, asyncio, logging, threading, aiohttp
+from array import array
+from collections import OrderedDict
+from disk_cache import CACHE_DIR, SQLiteTTLCache
+from met_negative_cache import UnusableObjectFilter
+from single_flight import SingleFlight, should_refresh_early
+
+BASE_URL = "https://collectionapi.metmuseum.org/public/collection/v1"
+
+# ✅ Connection pool settings
+MET_POOL_SIZE = int(os.getenv("MET_POOL_SIZE", 20))  # Max open connections to the Met API
+MET_KEEPALIVE_TIMEOUT = 30  # Seconds an idle connection stays open
+MET_REQUEST_TIMEOUT = float(os.getenv("MET_REQUEST_TIMEOUT", 10))
+MET_CANDIDATES_PER_KEYWORD = 5  # Object IDs tried per search keyword
+
+# ✅ Persistent object store shared by every worker (survives restarts)
+MET_OBJECT_TTL = int(os.getenv("MET_OBJECT_TTL", 7 * 24 * 3600))  # 7 days
+MET_OBJECT_STORE = SQLiteTTLCache(
+    os.getenv("MET_OBJECT_STORE_PATH", os.path.join(CACHE_DIR, "met_objects.sqlite3")),
+    table="met_objects",
+    ttl=MET_OBJECT_TTL,
+)
+
+# ✅ Shared bitset of object IDs known to be unusable (checked before any detail fetch)
+MET_UNUSABLE_FILTER = UnusableObjectFilter()
+
+# ✅ Search-result cache settings
+MET_SEARCH_FRESH_TTL = int(os.getenv("MET_SEARCH_FRESH_TTL", 24 * 3600))  # Served without refresh
+MET_SEARCH_STALE_TTL = int(os.getenv("MET_SEARCH_STALE_TTL", 7 * 24 * 3600))  # Served while refreshing
+MET_SEARCH_CACHE_BYTES = int(os.getenv("MET_SEARCH_CACHE_BYTES", 32 * 1024 * 1024))
+
+
+class MetSearchCache:
+    """
+    Keyword -> objectIDs cache storing each ID list as a compact `array('I')`.
+
+    Entries older than `fresh_ttl` are still served (and flagged stale so the
+    caller can refresh them in the background) until `stale_ttl`; XFetch flags
+    the odd fresh entry early as it approaches `fresh_ttl`. The cache is
+    bounded by the total bytes of its ID arrays and evicts least recently used
+    keywords first.
+    """
+
+    def __init__(self, max_bytes=MET_SEARCH_CACHE_BYTES, fresh_ttl=MET_SEARCH_FRESH_TTL, stale_ttl=MET_SEARCH_STALE_TTL):
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.size_bytes = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "early_refreshes": 0, "misses": 0, "evictions": 0}
+        self._entries = OrderedDict()  # keyword -> (array('I'), fetched_at, load_seconds)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(keyword):
+        return " ".join(str(keyword).lower().split())
+
+    def get(self, keyword):
+        """Returns (object_ids, needs_refresh), or None when the keyword is missing or too old."""
+        key = self.normalize(keyword)
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.time() - entry[1] if entry else None
+            if entry is None or age > self.stale_ttl:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            if age > self.fresh_ttl:
+                self.stats["stale_hits"] += 1
+                return entry[0], True
+            self.stats["hits"] += 1
+            if should_refresh_early(age, self.fresh_ttl, entry[2]):
+                self.stats["early_refreshes"] += 1
+                return entry[0], True
+            return entry[0], False
+
+    def set(self, keyword, object_ids, load_seconds=None):
+        """Stores an ID list compactly and evicts old keywords past the byte budget."""
+        key = self.normalize(keyword)
+        ids = array("I", object_ids)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self.size_bytes -= previous[0].buffer_info()[1] * previous[0].itemsize
+            self._entries[key] = (ids, time.time(), load_seconds)
+            self.size_bytes += ids.buffer_info()[1] * ids.itemsize
+            while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (evicted, _, _) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.buffer_info()[1] * evicted.itemsize
+                self.stats["evictions"] += 1
+        return ids
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def is_valid_artwork(obj):
+    """An artwork is usable when it is public domain and has a small image."""
+    return bool(obj) and bool(obj.get("isPublicDomain")) and "primaryImageSmall" in obj
+
+
+def artwork_identity(obj):
+    """Identity used to dedupe artworks (title, artist, object date)."""
+    return (obj.get("title"), obj.get("artistDisplayName"), obj.get("objectDate"))
+
+
+class MetClient:
+    """
+    Async Met Museum client sharing one pooled, keep-alive aiohttp session.
+
+    The session lives on a dedicated background event loop so the synchronous
+    Flask routes can reuse the same connection pool through `run()`.
+    """
+
+    def __init__(self, base_url=BASE_URL, pool_size=MET_POOL_SIZE, timeout=MET_REQUEST_TIMEOUT,
+                 store=MET_OBJECT_STORE, search_cache=None, search_index=None, unusable=MET_UNUSABLE_FILTER):
+        self.base_url = base_url
+        self.store = store
+        self.unusable = unusable
+        self.search_index = search_index  # Optional offline MetCollectionIndex (see met_index.py)
+        self.search_cache = MetSearchCache() if search_cache is None else search_cache
+        self._refreshing = set()  # Keywords with a background refresh in flight
+        self._background = set()  # Strong references to fire-and-forget tasks
+        self.flights = SingleFlight()  # Coalesces identical in-flight searches and object fetches
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    # ✅ Background loop management
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._session = None  # A session cannot outlive the loop it was created on
+                self._refreshing.clear()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="met-client", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def submit(self, coro):
+        """Schedules a coroutine on the client loop and returns its concurrent future without waiting."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the client loop and blocks until it finishes."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                keepalive_timeout=MET_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    # ✅ API calls
+    async def search(self, keyword):
+        """
+        Returns the object IDs matching a keyword (empty on error).
+
+        When an offline index is configured it answers locally. Otherwise cached
+        results are served immediately; stale ones trigger a background refresh
+        instead of blocking the caller.
+        """
+        if self.search_index is not None:
+            return self.search_index.search(keyword)
+
+        cached = self.search_cache.get(keyword)
+        if cached is not None:
+            object_ids, is_stale = cached
+            if is_stale:
+                self._schedule_search_refresh(keyword)
+            return object_ids
+
+        object_ids = await self._load_search(keyword)
+        return [] if object_ids is None else object_ids
+
+    async def _load_search(self, keyword):
+        """Searches remotely and caches the result; identical concurrent searches share one request."""
+        async def load():
+            started = time.monotonic()
+            object_ids = await self._search_remote(keyword)
+            if object_ids is None:
+                return None
+            return self.search_cache.set(keyword, object_ids, time.monotonic() - started)
+
+        return await self.flights.do(("search", self.search_cache.normalize(keyword)), load)
+
+    async def _search_remote(self, keyword):
+        session = await self._get_session()
+        try:
+            async with session.get(f"{self.base_url}/search", params={"q": keyword}) as response:
+                response.raise_for_status()
+                data = await response.json()
+                return data.get("objectIDs") or []
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ Met search failed for '{keyword}': {e}")
+            return None
+
+    def _schedule_search_refresh(self, keyword):
+        key = self.search_cache.normalize(keyword)
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._load_search(keyword)
+            finally:
+                self._refreshing.discard(key)
+
+        self._spawn(refresh())
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def warm_searches(self, keywords):
+        """Fills the search cache for every keyword in the background (non-blocking)."""
+        async def warm():
+            await asyncio.gather(*(self.search(keyword) for keyword in set(keywords)))
+
+        asyncio.run_coroutine_threadsafe(warm(), self._ensure_loop())
+
+    async def fetch_object(self, object_id, use_store=True):
+        """Returns the object payload for an ID (object store first), or None on error."""
+        if use_store and self.store is not None:
+            cached = self.store.get(object_id)
+            if cached is not None:
+                return cached
+
+        return await self.flights.do(("object", int(object_id)), lambda: self._fetch_object_remote(object_id))
+
+    async def _fetch_object_remote(self, object_id):
+        session = await self._get_session()
+        try:
+            async with session.get(f"{self.base_url}/objects/{object_id}") as response:
+                if response.status == 404:
+                    self._record_usable(object_id, False)
+                    return None
+                response.raise_for_status()
+                obj = await response.json()
+                if self.store is not None and isinstance(obj, dict):
+                    self.store.set(object_id, obj)
+                self._record_usable(object_id, is_valid_artwork(obj))
+                return obj
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"❌ Met object {object_id} failed: {e}")
+            return None
+
+    def _worth_fetching(self, object_id):
+        return self.unusable is None or not self.unusable.should_skip(object_id)
+
+    def _record_usable(self, object_id, usable):
+        if self.unusable is not None:
+            self.unusable.record(object_id, usable)
+
+    async def fetch_first_artworks(self, object_ids, limit, seen=None):
+        """
+        Fetches objects concurrently and returns the first `limit` valid artworks to arrive.
+
+        IDs in the unusable-object filter are skipped, and outstanding fetches are
+        cancelled as soon as enough artworks were found.
+        """
+        seen = set() if seen is None else seen
+        results = []
+
+        # ✅ Serve whatever the object store already holds without touching the network
+        cached = self.store.get_many(object_ids) if self.store is not None else {}
+        for obj_id in object_ids:
+            obj = cached.get(str(obj_id))
+            if is_valid_artwork(obj) and artwork_identity(obj) not in seen:
+                results.append(obj)
+                seen.add(artwork_identity(obj))
+                if len(results) >= limit:
+                    return results
+
+        missing_ids = [
+            obj_id for obj_id in object_ids
+            if str(obj_id) not in cached and self._worth_fetching(obj_id)
+        ]
+        tasks = [asyncio.ensure_future(self.fetch_object(obj_id, use_store=False)) for obj_id in missing_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                obj = await next_done
+                if is_valid_artwork(obj) and artwork_identity(obj) not in seen:
+                    results.append(obj)
+                    seen.add(artwork_identity(obj))
+                    if len(results) >= limit:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results
+
+    async def fetch_artworks_for_keywords(self, keywords, limit, per_keyword=MET_CANDIDATES_PER_KEYWORD, seen=None):
+        """
+        Searches all keywords concurrently and fans out object fetches as each search lands.
+
+        Returns as soon as `limit` valid, unique artworks arrived; slower searches and
+        object fetches are cancelled.
+        """
+        seen = set() if seen is None else seen
+        results = []
+        if not keywords or limit <= 0:
+            return results
+
+        search_tasks = {asyncio.ensure_future(self.search(keyword)) for keyword in keywords}
+        object_tasks = set()
+        requested_ids = set()
+        pending = set(search_tasks)
+
+        try:
+            while pending and len(results) < limit:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in search_tasks:
+                        for obj_id in task.result()[:per_keyword]:
+                            if obj_id not in requested_ids and self._worth_fetching(obj_id):
+                                requested_ids.add(obj_id)
+                                object_task = asyncio.ensure_future(self.fetch_object(obj_id))
+                                object_tasks.add(object_task)
+                                pending.add(object_task)
+                        continue
+
+                    obj = task.result()
+                    if len(results) < limit and is_valid_artwork(obj) and artwork_identity(obj) not in seen:
+                        results.append(obj)
+                        seen.add(artwork_identity(obj))
+        finally:
+            for task in search_tasks | object_tasks:
+                task.cancel()
+        return results
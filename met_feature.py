@@ -1,24 +1,50 @@
 import requests
 import random
 import json
+from met_client import MET_OBJECT_STORE
+from met_index import load_index, parse_time_period
+from met_random import MET_RANDOM_IDS_PATH, download_candidate_ids, load_random_ids, write_id_file
+
+# persisted array of object IDs for random draws (downloaded once, then memory-mapped)
+MET_RANDOM_IDS = load_random_ids()
+
+# offline search index (set MET_INDEX_DIR after running `python met_index.py build MetObjects.csv`)
+MET_INDEX = load_index()
+MET_DATES = MET_INDEX.dates if MET_INDEX is not None else None
+
+# fetches a single object, checking the shared on-disk object store before the network
+def fetch_object(object_id):
+    artwork = MET_OBJECT_STORE.get(object_id)
+    if artwork is not None:
+        return artwork
+
+    object_url = f"https://collectionapi.metmuseum.org/public/collection/v1/objects/{object_id}"
+    object_response = requests.get(object_url)
+
+    if object_response.status_code == 200:
+        artwork = object_response.json()
+        MET_OBJECT_STORE.set(object_id, artwork)
+        return artwork
+
+    return None
 
 def get_random_artwork():
     # (putting this as a fallback in case no matches are found)
-    objects_url = "https://collectionapi.metmuseum.org/public/collection/v1/objects"
-    response = requests.get(objects_url)
-    
-    if response.status_code == 200:
-        objects_data = response.json()
-        total_objects = objects_data['total']
-        object_ids = objects_data['objectIDs']
-        
-        random_id = random.choice(object_ids)
-        object_url = f"https://collectionapi.metmuseum.org/public/collection/v1/objects/{random_id}"
-        object_response = requests.get(object_url)
-        
-        if object_response.status_code == 200:
-            artwork = object_response.json()
-            return artwork
+    # draws from the persisted, memory-mapped ID array instead of downloading the full listing
+    global MET_RANDOM_IDS
+    if MET_RANDOM_IDS is None:
+        try:
+            write_id_file(MET_RANDOM_IDS_PATH, download_candidate_ids())
+        except requests.RequestException:
+            return None
+        MET_RANDOM_IDS = load_random_ids(MET_RANDOM_IDS_PATH)
+        if MET_RANDOM_IDS is None:
+            return None
+
+    random_id = MET_RANDOM_IDS.draw()
+    artwork = fetch_object(random_id)
+    if artwork:
+        return artwork
     
     return None
 
@@ -35,28 +61,50 @@ def get_matching_artwork(user_preferences):
     
     q = " ".join(search_terms)
     
-    # making search request
-    response = requests.get(search_url, params={'q': q})
+    # making search request (locally when the offline index is available)
+    if MET_INDEX is not None:
+        object_ids = MET_INDEX.search(q)
+        results = {'total': len(object_ids), 'objectIDs': object_ids}
+    else:
+        response = requests.get(search_url, params={'q': q})
+        results = response.json() if response.status_code == 200 else None
     
-    if response.status_code == 200:
-        results = response.json()
+    year_range = parse_time_period(user_preferences.get('time_period'))
+
+    if results:
         if results['total'] > 0:
-            matching_id = random.choice(results['objectIDs'])
-            object_url = f"https://collectionapi.metmuseum.org/public/collection/v1/objects/{matching_id}"
-            object_response = requests.get(object_url)
-            
-            if object_response.status_code == 200:
-                artwork = object_response.json()
-                if user_preferences.get('time_period'):
-                    if matches_time_period(artwork, user_preferences['time_period']):
-                        return artwork
-    
-    # fallback 
+            object_ids = results['objectIDs']
+            # narrowing candidates to the preferred period before fetching any details
+            if year_range and MET_DATES is not None:
+                object_ids = MET_DATES.filter_ids(object_ids, *year_range)
+
+            if len(object_ids) > 0:
+                matching_id = random.choice(object_ids)
+                artwork = fetch_object(matching_id)
+                
+                if artwork:
+                    if user_preferences.get('time_period'):
+                        if matches_time_period(artwork, user_preferences['time_period']):
+                            return artwork
+    
+    # fallback (a random artwork from the preferred period when the date index is available)
+    if year_range and MET_DATES is not None:
+        period_ids = MET_DATES.ids_in_range(*year_range)
+        if len(period_ids) > 0:
+            artwork = fetch_object(random.choice(period_ids))
+            if artwork:
+                return artwork
     return get_random_artwork()
 
 # checks if an artwork's date matches the user's preferred time period
+# (named periods like 'modern'/'ancient' or any year range such as '1850-1900')
 def matches_time_period(artwork, preferred_period):
-    date = artwork.get('objectDate', '').lower()
+    year_range = parse_time_period(preferred_period)
+    begin, end = artwork.get('objectBeginDate'), artwork.get('objectEndDate')
+    if year_range and isinstance(begin, int) and isinstance(end, int) and (begin or end):
+        return begin <= year_range[1] and end >= year_range[0]
+
+    date = (artwork.get('objectDate') or '').lower()
     if preferred_period == 'modern' and any(x in date for x in ['20th', '21st', '1900', '2000']):
         return True
     elif preferred_period == 'ancient' and any(x in date for x in ['bc', 'bce', 'ancient']):
@@ -107,13 +155,19 @@ def get_user_input():
         print("\nWhat time period interests you?")
         print("1. Modern")
         print("2. Ancient")
+        print("3. Custom year range (e.g. 1850-1900 or 500 BC-100 AD)")
         time_choice = input("\nEnter the number of your choice: ")
         if time_choice in ['1', '2']:
             time_map = {'1': 'modern', '2': 'ancient'}
             time_period = time_map[time_choice]
             break
+        elif time_choice == '3':
+            time_period = input("\nEnter the year range: ")
+            if parse_time_period(time_period):
+                break
+            print("\nInvalid range! Please use a format like 1850-1900.")
         else:
-            print("\nInvalid choice! Please enter 1 or 2.")
+            print("\nInvalid choice! Please enter 1, 2, or 3.")
     
     # getting culture preference
     while True:
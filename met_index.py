@@ -0,0 +1,403 @@
+# met_index.py
+
+import os, re, csv, json, mmap, shutil, logging, argparse, tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# ✅ Fields searched by the offline index (Met API field names)
+INDEXED_FIELDS = ["title", "tags", "artistDisplayName", "department", "culture", "medium"]
+
+# ✅ Met open-access CSV column -> Met API field name
+CSV_COLUMNS = {
+    "Object ID": "objectID",
+    "Is Public Domain": "isPublicDomain",
+    "Title": "title",
+    "Tags": "tags",
+    "Artist Display Name": "artistDisplayName",
+    "Department": "department",
+    "Culture": "culture",
+    "Medium": "medium",
+    "Object Begin Date": "objectBeginDate",
+    "Object End Date": "objectEndDate",
+}
+
+# ✅ Named time periods -> (first year, last year); negative years are BC
+TIME_PERIODS = {
+    "ancient": (-10000, 499),
+    "medieval": (500, 1399),
+    "renaissance": (1400, 1599),
+    "early modern": (1600, 1799),
+    "19th century": (1800, 1899),
+    "modern": (1900, 2100),
+}
+YEAR_PATTERN = r"(\d+)\s*(bce|bc|ce|ad)?"
+YEAR_RANGE_PATTERN = re.compile(rf"^\s*(-?){YEAR_PATTERN}\s*(?:-|–|to|:)\s*(-?){YEAR_PATTERN}\s*$", re.IGNORECASE)
+MISSING_DATE = -(2 ** 31)  # Sentinel in the dense begin/end-date lookups
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# ✅ Index files (all uint32 arrays are little-endian, native `array('I')` layout)
+TERMS_FILE = "terms.bin"  # Sorted UTF-8 terms, concatenated
+TERM_OFFSETS_FILE = "term_offsets.bin"  # n + 1 byte offsets into terms.bin
+POSTING_OFFSETS_FILE = "posting_offsets.bin"  # n + 1 item offsets into postings.bin
+POSTINGS_FILE = "postings.bin"  # Sorted object IDs per term, concatenated
+META_FILE = "meta.json"
+DATE_BEGINS_FILE = "date_begins.bin"  # int32 begin years, sorted ascending
+DATE_ENDS_FILE = "date_ends.bin"  # int32 end years aligned with date_begins.bin
+DATE_IDS_FILE = "date_ids.bin"  # uint32 object IDs aligned with date_begins.bin
+BEGIN_BY_ID_FILE = "begin_by_id.bin"  # int32 begin year indexed by object ID (MISSING_DATE if unknown)
+END_BY_ID_FILE = "end_by_id.bin"  # int32 end year indexed by object ID (MISSING_DATE if unknown)
+DATE_FILES = (DATE_BEGINS_FILE, DATE_ENDS_FILE, DATE_IDS_FILE, BEGIN_BY_ID_FILE, END_BY_ID_FILE)
+
+
+def parse_year(value):
+    try:
+        return int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_time_period(period):
+    """
+    Turns a time-period preference into an inclusive (first year, last year) range.
+
+    Accepts a named period ("modern", "ancient", ...), a "1850-1900" / "500 BC to 100 AD"
+    style string, or a (start, end) pair. Returns None if the period is not understood.
+    """
+    if isinstance(period, (tuple, list)) and len(period) == 2:
+        start, end = parse_year(period[0]), parse_year(period[1])
+        return (min(start, end), max(start, end)) if start is not None and end is not None else None
+    if not period:
+        return None
+    text = str(period).strip().lower()
+    if text in TIME_PERIODS:
+        return TIME_PERIODS[text]
+
+    match = YEAR_RANGE_PATTERN.match(text)
+    if not match:
+        return None
+    years = []
+    for sign, digits, era in (match.group(1, 2, 3), match.group(4, 5, 6)):
+        year = int(digits)
+        years.append(-year if sign or (era or "").lower() in ("bc", "bce") else year)
+    return min(years), max(years)
+
+
+def tokenize(text):
+    """Lowercases text and splits it into word tokens."""
+    return TOKEN_PATTERN.findall(str(text).lower()) if text else []
+
+
+# ✅ Source readers (yield Met API shaped dicts)
+def read_csv_records(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            record = {field: row.get(column, "") for column, field in CSV_COLUMNS.items()}
+            record["isPublicDomain"] = str(record["isPublicDomain"]).strip().lower() == "true"
+            record["tags"] = [tag for tag in (record["tags"] or "").split("|") if tag]
+            yield record
+
+
+def read_json_records(path):
+    """Reads a JSON array or JSON-lines dump of Met API object payloads."""
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_records(path):
+    return read_csv_records(path) if path.lower().endswith(".csv") else read_json_records(path)
+
+
+def record_text(record):
+    """Concatenates the indexed fields of a record into one searchable string."""
+    parts = []
+    for field in INDEXED_FIELDS:
+        value = record.get(field)
+        if field == "tags" and isinstance(value, list):
+            parts.extend(tag.get("term", "") if isinstance(tag, dict) else str(tag) for tag in value)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+# ✅ Ingestion
+def build_index(source_path, out_dir, public_domain_only=False):
+    """Builds the inverted index for a CSV/JSON dump into `out_dir` and returns the object count."""
+    postings = defaultdict(set)
+    dates = {}  # object ID -> (begin year, end year)
+    object_count = 0
+
+    for record in read_records(source_path):
+        try:
+            object_id = int(record.get("objectID"))
+        except (TypeError, ValueError):
+            continue
+        if public_domain_only and not record.get("isPublicDomain"):
+            continue
+        object_count += 1
+        for token in set(tokenize(record_text(record))):
+            postings[token].add(object_id)
+        begin_year = parse_year(record.get("objectBeginDate"))
+        end_year = parse_year(record.get("objectEndDate"))
+        if begin_year is not None or end_year is not None:
+            years = [year for year in (begin_year, end_year) if year is not None]
+            dates[object_id] = (min(years), max(years))
+
+    terms = sorted(postings, key=lambda term: term.encode("utf-8"))
+    terms_blob = bytearray()
+    term_offsets = array("I", [0])
+    posting_offsets = array("I", [0])
+    all_postings = array("I")
+    for term in terms:
+        terms_blob += term.encode("utf-8")
+        term_offsets.append(len(terms_blob))
+        all_postings.extend(sorted(postings[term]))
+        posting_offsets.append(len(all_postings))
+
+    dated = sorted(dates.items(), key=lambda item: item[1])
+    date_begins = array("i", (begin for _, (begin, _) in dated))
+    date_ends = array("i", (end for _, (_, end) in dated))
+    date_ids = array("I", (object_id for object_id, _ in dated))
+    begin_by_id = array("i", [MISSING_DATE]) * (max(dates, default=-1) + 1)
+    end_by_id = array("i", begin_by_id)
+    for object_id, (begin, end) in dates.items():
+        begin_by_id[object_id] = begin
+        end_by_id[object_id] = end
+
+    # Write into a temporary directory first so readers never see a half-built index
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".met_index_", dir=parent)
+    with open(os.path.join(tmp_dir, TERMS_FILE), "wb") as f:
+        f.write(terms_blob)
+    for name, values in (
+        (TERM_OFFSETS_FILE, term_offsets),
+        (POSTING_OFFSETS_FILE, posting_offsets),
+        (POSTINGS_FILE, all_postings),
+        (DATE_BEGINS_FILE, date_begins),
+        (DATE_ENDS_FILE, date_ends),
+        (DATE_IDS_FILE, date_ids),
+        (BEGIN_BY_ID_FILE, begin_by_id),
+        (END_BY_ID_FILE, end_by_id),
+    ):
+        with open(os.path.join(tmp_dir, name), "wb") as f:
+            values.tofile(f)
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump({
+            "objects": object_count,
+            "terms": len(terms),
+            "dated_objects": len(dated),
+            "max_date_span": max((end - begin for _, (begin, end) in dated), default=0),
+            "source": os.path.basename(source_path),
+        }, f)
+
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    logging.info(f"✅ Indexed {object_count} Met objects ({len(terms)} terms) into {out_dir}")
+    return object_count
+
+
+# ✅ Date-range backend
+class DateRangeIndex:
+    """
+    Numeric index over `objectBeginDate` / `objectEndDate` for time-period matching before any detail fetch.
+
+    An object matches a year range when its dates overlap it (begin <= last
+    year and end >= first year), the same test as `matches_time_period`.
+    Object IDs are stored sorted by begin year: objects begun inside the range
+    are one contiguous slice, and only those begun up to `max_span` years
+    earlier need their end year checked. Dense begin/end lookups by object ID
+    filter search results in O(1) per ID.
+    """
+
+    def __init__(self, begins, ends, ids, begin_by_id, end_by_id, max_span=None):
+        self.begins = begins
+        self.ends = ends
+        self.ids = ids
+        self.begin_by_id = begin_by_id
+        self.end_by_id = end_by_id
+        self.max_span = max((end - begin for begin, end in zip(begins, ends)), default=0) if max_span is None else max_span
+
+    def __len__(self):
+        return len(self.ids)
+
+    def ids_in_range(self, start, end):
+        """Returns the IDs of objects whose dates overlap `start`..`end` (inclusive), by begin year."""
+        first_inside = bisect_left(self.begins, start)
+        matches = array("I")
+        for i in range(bisect_left(self.begins, start - self.max_span), first_inside):
+            if self.ends[i] >= start:  # Begun before the range but still running into it
+                matches.append(self.ids[i])
+        matches.extend(self.ids[first_inside:bisect_right(self.begins, end)])
+        return matches
+
+    def _year(self, years, object_id):
+        if 0 <= object_id < len(years):
+            year = years[object_id]
+            return None if year == MISSING_DATE else year
+        return None
+
+    def begin_year(self, object_id):
+        return self._year(self.begin_by_id, object_id)
+
+    def end_year(self, object_id):
+        return self._year(self.end_by_id, object_id)
+
+    def filter_ids(self, object_ids, start, end):
+        """Keeps the IDs from `object_ids` whose dates overlap the range, preserving order."""
+        matches = array("I")
+        for object_id in object_ids:
+            begin = self.begin_year(object_id)
+            if begin is not None and begin <= end and self.end_year(object_id) >= start:
+                matches.append(object_id)
+        return matches
+
+
+# ✅ Search backend
+class MetCollectionIndex:
+    """
+    Memory-mapped inverted index over the Met collection.
+
+    Every file is mapped read-only, so all worker processes share one copy
+    through the OS page cache. `search()` mirrors the `/search?q=` endpoint and
+    returns the object IDs containing every token of the query.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self._files = []
+        self._maps = []
+        self.terms = self._map(TERMS_FILE)
+        self.term_offsets = self._map(TERM_OFFSETS_FILE).cast("I")
+        self.posting_offsets = self._map(POSTING_OFFSETS_FILE).cast("I")
+        self.postings = self._map(POSTINGS_FILE).cast("I")
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.dates = None
+        if all(os.path.exists(os.path.join(index_dir, name)) for name in DATE_FILES):  # Older indexes: rebuild for dates
+            self.dates = DateRangeIndex(
+                self._map(DATE_BEGINS_FILE).cast("i"),
+                self._map(DATE_ENDS_FILE).cast("i"),
+                self._map(DATE_IDS_FILE).cast("I"),
+                self._map(BEGIN_BY_ID_FILE).cast("i"),
+                self._map(END_BY_ID_FILE).cast("i"),
+                self.meta.get("max_date_span"),
+            )
+
+    def _map(self, name):
+        f = open(os.path.join(self.index_dir, name), "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
+
+    def __len__(self):
+        return len(self.term_offsets) - 1
+
+    def _term(self, i):
+        return bytes(self.terms[self.term_offsets[i]:self.term_offsets[i + 1]])
+
+    def _find_term(self, term):
+        """Binary search over the sorted term list; returns the term number or None."""
+        target = term.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < len(self) and self._term(lo) == target else None
+
+    def postings_for(self, term):
+        """Returns the sorted object IDs (zero-copy view) for a single token."""
+        i = self._find_term(term)
+        if i is None:
+            return self.postings[0:0]
+        return self.postings[self.posting_offsets[i]:self.posting_offsets[i + 1]]
+
+    def search(self, query):
+        """Returns the object IDs matching every token of `query` as a compact `array('I')`."""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return array("I")
+        lists = sorted((self.postings_for(token) for token in tokens), key=len)
+        if len(lists) == 1:
+            matches = array("I")
+            matches.frombytes(lists[0].cast("B"))  # Single memcpy out of the mapped file
+            return matches
+
+        # Intersect from the shortest list, probing the longer ones with binary search
+        matches = array("I")
+        for object_id in lists[0]:
+            for other in lists[1:]:
+                i = bisect_left(other, object_id)
+                if i == len(other) or other[i] != object_id:
+                    break
+            else:
+                matches.append(object_id)
+        return matches
+
+    def close(self):
+        views = [self.terms, self.term_offsets, self.posting_offsets, self.postings]
+        if self.dates is not None:
+            views += [self.dates.begins, self.dates.ends, self.dates.ids, self.dates.begin_by_id, self.dates.end_by_id]
+        for view in views:
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        for f in self._files:
+            f.close()
+
+
+def load_index(index_dir=None):
+    """Opens the offline index from `index_dir` (or MET_INDEX_DIR); returns None if unavailable."""
+    index_dir = index_dir or os.getenv("MET_INDEX_DIR")
+    if not index_dir or not os.path.exists(os.path.join(index_dir, META_FILE)):
+        return None
+    try:
+        return MetCollectionIndex(index_dir)
+    except Exception as e:
+        logging.error(f"❌ Could not open Met index at {index_dir}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline Met collection index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Ingest the Met open-access CSV or a JSON dump")
+    build.add_argument("source", help="MetObjects.csv, a JSON array or a JSON-lines dump of object payloads")
+    build.add_argument("--out", default=os.getenv("MET_INDEX_DIR", "met_index"), help="Index directory")
+    build.add_argument("--public-domain-only", action="store_true", help="Skip objects that are not public domain")
+
+    search = subparsers.add_parser("search", help="Query an existing index")
+    search.add_argument("query")
+    search.add_argument("--index", default=os.getenv("MET_INDEX_DIR", "met_index"), help="Index directory")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "build":
+        build_index(args.source, args.out, public_domain_only=args.public_domain_only)
+    else:
+        index = MetCollectionIndex(args.index)
+        object_ids = index.search(args.query)
+        print(f"{len(object_ids)} objects: {list(object_ids[:20])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# met_negative_cache.py
+
+import os, mmap, random, threading
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: only threads in this worker are serialized
+    fcntl = None
+from disk_cache import CACHE_DIR
+
+# ✅ Negative cache settings
+MET_UNUSABLE_PATH = os.getenv("MET_UNUSABLE_PATH", os.path.join(CACHE_DIR, "met_unusable.bits"))
+MET_UNUSABLE_MAX_ID = int(os.getenv("MET_UNUSABLE_MAX_ID", 2_000_000))  # Met object IDs are well below this
+MET_UNUSABLE_AUDIT_RATE = float(os.getenv("MET_UNUSABLE_AUDIT_RATE", 0.02))  # Share of hits fetched anyway
+
+
+class UnusableObjectFilter:
+    """
+    Persistent bitset of Met object IDs known to be unusable (not public domain or no image).
+
+    One bit per object ID lives in a memory-mapped file, so every worker sees
+    the same bits and they survive restarts (256 KB covers two million IDs).
+    A small share of hits is still fetched as an audit; an audited object that
+    turned out usable counts as a false positive and its bit is cleared.
+    Updates hold an exclusive `flock` on the file, so workers flipping bits in
+    the same byte never overwrite each other's read-modify-write.
+    """
+
+    def __init__(self, path=MET_UNUSABLE_PATH, max_id=MET_UNUSABLE_MAX_ID, audit_rate=MET_UNUSABLE_AUDIT_RATE):
+        self.path = path
+        self.max_id = max_id
+        self.audit_rate = audit_rate
+        self.stats = {"checks": 0, "hits": 0, "audits": 0, "false_positives": 0, "marked": 0}
+        self._lock = threading.Lock()
+
+        size = (max_id + 7) // 8
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._bits = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)  # MAP_SHARED across processes
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd  # Kept open for flock
+
+    def _position(self, object_id):
+        object_id = int(object_id)
+        if 0 <= object_id < self.max_id:
+            return object_id >> 3, 1 << (object_id & 7)
+        return None
+
+    def __contains__(self, object_id):
+        position = self._position(object_id)
+        return position is not None and bool(self._bits[position[0]] & position[1])
+
+    def should_skip(self, object_id):
+        """True when the object is known to be unusable and is not picked for an audit fetch."""
+        with self._lock:
+            self.stats["checks"] += 1
+            if object_id not in self:
+                return False
+            if random.random() < self.audit_rate:
+                self.stats["audits"] += 1
+                return False
+            self.stats["hits"] += 1
+            return True
+
+    def record(self, object_id, usable):
+        """Records the outcome of a fetch, marking unusable IDs and clearing false positives."""
+        position = self._position(object_id)
+        if position is None:
+            return
+        byte, mask = position
+        if bool(self._bits[byte] & mask) != usable:
+            return  # Already recorded; no lock needed
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                marked = bool(self._bits[byte] & mask)
+                if usable and marked:
+                    self._bits[byte] &= ~mask & 0xFF
+                    self.stats["false_positives"] += 1
+                elif not usable and not marked:
+                    self._bits[byte] |= mask
+                    self.stats["marked"] += 1
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def report(self):
+        """Counters plus derived numbers: round trips saved and observed false-positive rate."""
+        report = dict(self.stats)
+        report["round_trips_saved"] = self.stats["hits"]
+        report["false_positive_rate"] = (
+            self.stats["false_positives"] / self.stats["audits"] if self.stats["audits"] else 0.0
+        )
+        return report
+
+    def flush(self):
+        self._bits.flush()
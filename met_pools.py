@@ -0,0 +1,137 @@
+# met_pools.py
+
+import os, random, asyncio, logging, threading
+from met_client import artwork_identity
+from met_artwork import ArtworkRecord
+
+# ✅ Pool sizing
+MET_POOL_CAPACITY = int(os.getenv("MET_POOL_CAPACITY", 24))  # Validated artworks kept per key
+MET_POOL_LOW_WATER = int(os.getenv("MET_POOL_LOW_WATER", 9))  # Refill once a pool drops below this
+MET_POOL_CONCURRENCY = int(os.getenv("MET_POOL_CONCURRENCY", 4))  # Pools refilled at the same time
+MET_POOL_IDS_PER_ROUND = 15  # Random object IDs tried per refill round
+
+
+class CandidatePool:
+    """Thread-safe pool of already-validated artworks for one mood, art style or subject."""
+
+    def __init__(self, group, key, keywords, capacity=MET_POOL_CAPACITY, low_water=MET_POOL_LOW_WATER):
+        self.group = group
+        self.key = key
+        self.keywords = list(keywords)
+        self.capacity = capacity
+        self.low_water = low_water
+        self.refilling = False
+        self._items = []
+        self._lock = threading.Lock()
+
+    def take(self, count, seen):
+        """Removes and returns up to `count` random artworks whose identity is not in `seen`."""
+        taken = []
+        with self._lock:
+            random.shuffle(self._items)
+            kept = []
+            for artwork in self._items:
+                identity = artwork_identity(artwork)
+                if len(taken) < count and identity not in seen:
+                    taken.append(artwork)
+                    seen.add(identity)
+                else:
+                    kept.append(artwork)
+            self._items = kept
+        return taken
+
+    def add(self, artworks):
+        """Stores artworks as slim `ArtworkRecord`s, skipping duplicates and overflow."""
+        artworks = [ArtworkRecord.from_object(artwork) for artwork in artworks]
+        with self._lock:
+            identities = {artwork_identity(artwork) for artwork in self._items}
+            for artwork in artworks:
+                if len(self._items) >= self.capacity:
+                    break
+                if artwork_identity(artwork) not in identities:
+                    self._items.append(artwork)
+                    identities.add(artwork_identity(artwork))
+
+    def identities(self):
+        with self._lock:
+            return {artwork_identity(artwork) for artwork in self._items}
+
+    def needs_refill(self):
+        return len(self) < self.low_water
+
+    def __len__(self):
+        return len(self._items)
+
+
+class MetCandidatePools:
+    """
+    Background harvester keeping a pool of validated artworks per keyword-map key.
+
+    Pools are filled on the Met client's event loop; `take()` never waits on the
+    network and schedules an asynchronous refill whenever a pool falls below its
+    low-water mark.
+    """
+
+    def __init__(self, client, keyword_maps, capacity=MET_POOL_CAPACITY, low_water=MET_POOL_LOW_WATER):
+        self.client = client
+        self.pools = {
+            (group, key): CandidatePool(group, key, keywords, capacity, low_water)
+            for group, keyword_map in keyword_maps.items()
+            for key, keywords in keyword_map.items()
+        }
+        self._semaphore = asyncio.Semaphore(MET_POOL_CONCURRENCY)  # Binds to the client loop, the only one it's awaited on
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Schedules an initial fill of every pool (non-blocking)."""
+        for pool in self.pools.values():
+            self.request_refill(pool)
+
+    def take(self, group, key, count, seen):
+        """Returns up to `count` pooled artworks for a key, refilling in the background if needed."""
+        pool = self.pools.get((group, key))
+        if pool is None or count <= 0:
+            return []
+        taken = pool.take(count, seen)
+        if pool.needs_refill():
+            self.request_refill(pool)
+        return taken
+
+    def request_refill(self, pool):
+        with self._lock:  # take() runs on many request threads at once
+            if pool.refilling:
+                return
+            pool.refilling = True
+        asyncio.run_coroutine_threadsafe(self._refill(pool), self.client._ensure_loop())
+
+    async def _refill(self, pool):
+        try:
+            async with self._semaphore:
+                attempts = 0
+                while len(pool) < pool.capacity and attempts < len(pool.keywords) * 2:
+                    attempts += 1
+                    keyword = random.choice(pool.keywords)
+                    object_ids = await self.client.search(keyword)
+                    if not object_ids:
+                        continue
+                    candidates = random.sample(object_ids, min(len(object_ids), MET_POOL_IDS_PER_ROUND))
+                    artworks = await self.client.fetch_first_artworks(
+                        candidates, pool.capacity - len(pool), seen=pool.identities()
+                    )
+                    pool.add(artworks)
+        except Exception as e:
+            logging.error(f"❌ Refilling Met pool {pool.group}/{pool.key} failed: {e}")
+        finally:
+            pool.refilling = False
+
+    def fill_levels(self):
+        """Reports {group: {key: {size, capacity, low_water, refilling}}} for every pool."""
+        levels = {}
+        for (group, key), pool in self.pools.items():
+            levels.setdefault(group, {})[key] = {
+                "size": len(pool),
+                "capacity": pool.capacity,
+                "low_water": pool.low_water,
+                "refilling": pool.refilling,
+            }
+        return levels
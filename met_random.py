@@ -0,0 +1,154 @@
+# met_random.py
+
+import os, mmap, random, asyncio, logging, argparse, threading, tempfile, requests
+from array import array
+from disk_cache import CACHE_DIR
+from met_client import BASE_URL
+from met_pools import CandidatePool
+
+# ✅ Random-draw settings
+MET_RANDOM_IDS_PATH = os.getenv("MET_RANDOM_IDS_PATH", os.path.join(CACHE_DIR, "met_random_ids.bin"))
+MET_RESERVOIR_CAPACITY = int(os.getenv("MET_RESERVOIR_CAPACITY", 36))  # Ready-to-serve random artworks
+MET_RESERVOIR_LOW_WATER = int(os.getenv("MET_RESERVOIR_LOW_WATER", 18))
+MET_RESERVOIR_IDS_PER_ROUND = 20
+
+
+def write_id_file(path, object_ids):
+    """Atomically writes object IDs as a flat uint32 array."""
+    ids = array("I", sorted(set(object_ids)))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".met_ids_", dir=os.path.dirname(os.path.abspath(path)))
+    with os.fdopen(fd, "wb") as f:
+        ids.tofile(f)
+    os.replace(tmp_path, path)
+    logging.info(f"✅ Saved {len(ids)} Met object IDs to {path}")
+    return len(ids)
+
+
+def download_candidate_ids(base_url=BASE_URL):
+    """Downloads the IDs of objects that have images (falls back to the full /objects listing)."""
+    response = requests.get(f"{base_url}/search", params={"hasImages": "true", "q": "*"}, timeout=60)
+    if response.status_code == 200 and response.json().get("objectIDs"):
+        return response.json()["objectIDs"]
+    response = requests.get(f"{base_url}/objects", timeout=120)
+    response.raise_for_status()
+    return response.json().get("objectIDs") or []
+
+
+class RandomIdArray:
+    """Memory-mapped uint32 array of candidate object IDs with O(1) random draws."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.ids = memoryview(self._map).cast("I")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def draw(self):
+        return self.ids[random.randrange(len(self.ids))]
+
+    def sample(self, count):
+        """Draws `count` random IDs (with replacement; duplicates are harmless for the caller)."""
+        return [self.ids[random.randrange(len(self.ids))] for _ in range(count)]
+
+
+def load_random_ids(path=MET_RANDOM_IDS_PATH):
+    """Opens the persisted random-ID array; returns None if it has not been built yet."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    try:
+        return RandomIdArray(path)
+    except Exception as e:
+        logging.error(f"❌ Could not open random ID file {path}: {e}")
+        return None
+
+
+class RandomArtworkReservoir:
+    """
+    Reservoir of pre-validated random artworks, topped up in the background.
+
+    `take()` only pops from memory; when the reservoir drops below its
+    low-water mark, a refill draws random IDs from the mapped ID array and
+    validates them on the Met client's loop. If no ID file exists yet, the
+    first refill downloads the ID list once and persists it for every worker.
+    """
+
+    def __init__(self, client, path=MET_RANDOM_IDS_PATH, capacity=MET_RESERVOIR_CAPACITY, low_water=MET_RESERVOIR_LOW_WATER):
+        self.client = client
+        self.path = path
+        self.ids = load_random_ids(path)
+        self.pool = CandidatePool("random", "random", [], capacity, low_water)
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.request_refill()
+
+    def take(self, count, seen):
+        """Returns up to `count` ready random artworks not in `seen` (never waits on the network)."""
+        taken = self.pool.take(count, seen)
+        if self.pool.needs_refill():
+            self.request_refill()
+        return taken
+
+    def request_refill(self):
+        with self._lock:
+            if self.pool.refilling:
+                return
+            self.pool.refilling = True
+        asyncio.run_coroutine_threadsafe(self._refill(), self.client._ensure_loop())
+
+    async def _refill(self):
+        try:
+            if self.ids is None:
+                object_ids = await asyncio.to_thread(download_candidate_ids, self.client.base_url)
+                await asyncio.to_thread(write_id_file, self.path, object_ids)
+                self.ids = load_random_ids(self.path)
+            if not self.ids:
+                return
+
+            attempts = 0
+            while len(self.pool) < self.pool.capacity and attempts < 10:
+                attempts += 1
+                artworks = await self.client.fetch_first_artworks(
+                    self.ids.sample(MET_RESERVOIR_IDS_PER_ROUND),
+                    self.pool.capacity - len(self.pool),
+                    seen=self.pool.identities(),
+                )
+                self.pool.add(artworks)
+        except Exception as e:
+            logging.error(f"❌ Refilling random artwork reservoir failed: {e}")
+        finally:
+            self.pool.refilling = False
+
+    def fill_level(self):
+        return {
+            "size": len(self.pool),
+            "capacity": self.pool.capacity,
+            "low_water": self.pool.low_water,
+            "refilling": self.pool.refilling,
+            "candidate_ids": len(self.ids) if self.ids else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the persisted Met random-ID array.")
+    parser.add_argument("--out", default=MET_RANDOM_IDS_PATH, help="Output file (uint32 array)")
+    parser.add_argument("--from-index", help="Use every object ID in an offline index built with met_index.py")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.from_index:
+        from met_index import MetCollectionIndex
+        index = MetCollectionIndex(args.from_index)
+        object_ids = set(index.postings)
+        index.close()
+    else:
+        object_ids = download_candidate_ids()
+    write_id_file(args.out, object_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# micro_batch.py
+
+import asyncio, logging
+
+
+class _Batch:
+    __slots__ = ("items", "futures", "timer")
+
+    def __init__(self):
+        self.items = []
+        self.futures = []
+        self.timer = None
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls into batched upstream requests.
+
+    Each caller awaits `submit(item)`. Items queue up per event loop and are
+    passed to the coroutine `flush(items)` (which returns one result per item)
+    once `max_size` items are waiting or `max_delay` seconds after the first
+    one, whichever comes first. Identical items in one batch are sent once. A
+    failed flush raises its exception in every caller of that batch.
+    """
+
+    def __init__(self, flush, max_size, max_delay):
+        self.flush = flush
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.stats = {"items": 0, "batches": 0, "largest_batch": 0}
+        self._pending = {}  # loop -> _Batch
+        self._running = set()  # Strong references to in-flight flush tasks
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(loop)
+        if batch is None:
+            batch = self._pending[loop] = _Batch()
+            batch.timer = loop.call_later(self.max_delay, self._send, loop, batch)
+
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        self.stats["items"] += 1
+        if len(set(batch.items)) >= self.max_size:
+            self._send(loop, batch)
+        return await future
+
+    def _send(self, loop, batch):
+        if self._pending.get(loop) is not batch:
+            return  # Already sent
+        del self._pending[loop]
+        batch.timer.cancel()
+        task = loop.create_task(self._run(batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        unique = list(dict.fromkeys(batch.items))
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(unique))
+        try:
+            results = await self.flush(unique)
+            if len(results) != len(unique):
+                raise ValueError(f"Batch flush returned {len(results)} results for {len(unique)} items")
+        except Exception as e:
+            logging.error(f"❌ Batch of {len(unique)} failed: {e}")
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_item = dict(zip(unique, results))
+        for item, future in zip(batch.items, batch.futures):
+            if not future.done():  # The caller may have been cancelled
+                future.set_result(by_item[item])
+
+    def metrics(self):
+        return {**self.stats, "waiting": sum(len(batch.items) for batch in self._pending.values())}
@@ -0,0 +1,119 @@
+# moderation_cache.py
+
+import os, json, html, hashlib
+from disk_cache import CACHE_DIR, SQLiteTTLCache
+
+# ✅ Verdict store settings
+MODERATION_CACHE_PATH = os.getenv("MODERATION_CACHE_PATH", os.path.join(CACHE_DIR, "moderation.sqlite3"))
+MODERATION_CACHE_TTL = int(os.getenv("MODERATION_CACHE_TTL", 7 * 24 * 3600))  # 7 days
+MODERATION_POLICY_TAG = os.getenv("MODERATION_POLICY_TAG", "1")  # Bump to drop every stored verdict by hand
+
+# ✅ Perceptual matching: a 64-bit image hash is indexed as 4 exact 16-bit bands, so any
+# stored hash within 3 differing bits shares at least one band with the query
+PHASH_BANDS = 4
+PHASH_MAX_DISTANCE = min(int(os.getenv("PHASH_MAX_DISTANCE", 3)), PHASH_BANDS - 1)
+
+
+def normalize_text(text):
+    """Canonical form of a moderated text: unescaped, lower-cased, whitespace-collapsed."""
+    return " ".join(html.unescape(text or "").lower().split())
+
+
+def policy_version(*settings, tag=MODERATION_POLICY_TAG):
+    """Short hash of everything a verdict depends on (thresholds, term lists, ...), plus a manual tag."""
+    encoded = json.dumps([tag, *settings], sort_keys=True, default=sorted, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:12]
+
+
+def phash_bands(phash, bands=PHASH_BANDS):
+    """Splits a 64-bit perceptual hash into equal slices, most significant first."""
+    width = 64 // bands
+    return [(phash >> (width * (bands - 1 - band))) & ((1 << width) - 1) for band in range(bands)]
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class ModerationVerdictCache:
+    """
+    Durable moderation verdicts shared by every worker, backed by SQLite.
+
+    Text verdicts are keyed by the hash of the normalized text, and image
+    verdicts by the image URL. Image content verdicts are also keyed by the
+    bytes' SHA-256 and by a perceptual hash, so the same picture under another
+    URL (a CDN size variant) reuses them. Every key carries the policy
+    version, so changing a threshold or a term list invalidates old verdicts
+    without a migration. Old-version rows are never read again; they are
+    deleted by the store's periodic purge once their TTL runs out.
+    """
+
+    def __init__(self, version, path=MODERATION_CACHE_PATH, ttl=MODERATION_CACHE_TTL, max_distance=PHASH_MAX_DISTANCE):
+        self.version = version
+        self.max_distance = max_distance
+        self.store = SQLiteTTLCache(path, table="verdicts", ttl=ttl)
+        self.stats = {
+            "text_hits": 0, "text_misses": 0, "image_hits": 0, "image_misses": 0,
+            "content_hits": 0, "perceptual_hits": 0, "content_misses": 0,
+        }
+
+    def text_key(self, text):
+        return f"{self.version}:text:{hashlib.sha256(normalize_text(text).encode()).hexdigest()}"
+
+    def image_key(self, image_url):
+        return f"{self.version}:image:{image_url}"
+
+    def content_key(self, sha256):
+        return f"{self.version}:content:{sha256}"
+
+    def perceptual_keys(self, phash):
+        return [f"{self.version}:phash:{band}:{value:04x}:{phash:016x}" for band, value in enumerate(phash_bands(phash))]
+
+    def _get(self, kind, key):
+        verdict = self.store.get(key)
+        self.stats[f"{kind}_hits" if verdict is not None else f"{kind}_misses"] += 1
+        return verdict
+
+    def get_text(self, text):
+        """Stored verdict (True = safe) for a text, or None."""
+        return self._get("text", self.text_key(text))
+
+    def set_texts(self, verdicts):
+        """Stores (text, safe) pairs from one moderation batch."""
+        self.store.set_many((self.text_key(text), verdict) for text, verdict in verdicts)
+
+    def get_image(self, image_url):
+        """Stored result (the image URL, or the censored placeholder) for an image, or None."""
+        return self._get("image", self.image_key(image_url))
+
+    def set_image(self, image_url, result):
+        self.store.set(self.image_key(image_url), result)
+
+    def _nearest(self, phash):
+        """Verdict of the closest stored perceptual hash within `max_distance` bits (unsafe wins ties), or None."""
+        matches = []
+        for band, value in enumerate(phash_bands(phash)):
+            for key, verdict in self.store.get_prefix(f"{self.version}:phash:{band}:{value:04x}:").items():
+                distance = hamming_distance(phash, int(key.rsplit(":", 1)[1], 16))
+                if distance <= self.max_distance:
+                    matches.append((distance, verdict))
+        return min(matches)[1] if matches else None
+
+    def get_image_content(self, identity):
+        """Stored verdict (True = safe) for these exact bytes or a visually identical image, or None."""
+        verdict = self.store.get(self.content_key(identity["sha256"]))
+        if verdict is not None:
+            self.stats["content_hits"] += 1
+            return verdict
+
+        verdict = self._nearest(identity["phash"])
+        self.stats["perceptual_hits" if verdict is not None else "content_misses"] += 1
+        return verdict
+
+    def set_image_content(self, identity, safe):
+        """Stores a verdict under an image's content hash and every band of its perceptual hash."""
+        keys = [self.content_key(identity["sha256"]), *self.perceptual_keys(identity["phash"])]
+        self.store.set_many((key, safe) for key in keys)
+
+    def metrics(self):
+        return {**self.stats, "version": self.version}
@@ -6,13 +6,19 @@ import random
 import openai
 import time
 import asyncio
-import aiohttp
-import html
 from dotenv import load_dotenv
 from collections import deque
 from cachetools import TTLCache
 from google.cloud import vision
 import urllib.parse
+from http_clients import HTTP_CLIENTS
+from keyword_matcher import KeywordMatcher
+from micro_batch import MicroBatcher
+from vision_safesearch import VisionSafeSearch, HIGH_RISK_LEVELS, UNKNOWN_RISK_LEVELS
+from moderation_cache import ModerationVerdictCache, policy_version
+from image_identity import ImageIdentity
+from single_flight import SingleFlight
+from nsfw_terms import WHITELIST_TERMS, WHITELIST_ARTISTS, BLOCKLIST_TERMS
 
 # Load environment variables
 load_dotenv()
@@ -35,14 +41,23 @@ CACHE_EXPIRY = 6 * 3600  # 6 hours
 CENSORED_IMAGE_URL = "/static/images/censored-image.png"
 SAFE_BROWSING_API_URL = f"{OBLIVIOUS_HTTP_RELAY}/v4/threatMatches:find?key={GOOGLE_SAFE_BROWSING_API_KEY}"
 OPENAI_MODERATION_API_URL = "https://api.openai.com/v1/moderations"
+OPENAI_BATCH_MAX_SIZE = int(os.getenv("OPENAI_BATCH_MAX_SIZE", 32))  # Texts per moderation request
+OPENAI_BATCH_WINDOW = float(os.getenv("OPENAI_BATCH_WINDOW", 0.02))  # Seconds a batch waits for more texts
+OPENAI_MODERATION_MODEL = "omni-moderation-latest"
+OPENAI_TEXT_THRESHOLDS = {
+    "sexual": 0.001,  
+    "sexual/minors": 0.0001,  
+    "harassment/threatening": 0.001,
+}
+OPENAI_IMAGE_THRESHOLDS = {
+    "sexual/minors": 0.001,  # Extremely strict for minors
+    "sexual": 0.001,  # Extremely strict for adults
+}
 
-# ✅ Caching
+# ✅ Caching (in-process, in front of the durable verdict store below)
 NSFW_IMAGE_CACHE = TTLCache(maxsize=1000, ttl=1800)  # 30 minutes
 NSFW_TEXT_CACHE = TTLCache(maxsize=5000, ttl=1800)  # 30 minutes
 
-# ✅ Shared HTTP Session
-SESSION = None
-
 # ✅ Replacement Image for NSFW content
 CENSORED_IMAGE_URL = "/static/images/censored-image.png"
 
@@ -59,45 +74,9 @@ LIKELIHOOD_MAPPING = {
     vision.Likelihood.VERY_LIKELY: "VERY_LIKELY",
 }
 
-# ✅ Whitelisted Phrases (Allowed Content)
-WHITELIST_TERMS = [
-    "best", "anime", "edit", "dark", "phonk", "bass drop", "remix", r"(\b?:best songs\b)", "remixes", "shoujo", "shonen", "seinen", "josei", "hardstyle", "hardcore", "dubstep", "trap", "trance", "EDM", "electronic", "electro", "house", "techno", "rave", "rave music", "rave playlist", "Christmas", "Christmas music", "Christmas playlist", "Christmas songs", "Christmas carols", "Christmas vibes", "Christmas lofi", "Christmas chill", "Christmas rage", "Christmas rap", "Christmas hip hop", "Christmas EDM", "Christmas dubstep", "Christmas trap", "Christmas techno", "Christmas house", "Christmas electronic",
-    "weekly updates", "top anime song", "OST", "opening", "gym", "workout", "study", "chill", "relax", "lofi", "vibes", "vibe", "nostalgiacore", "nostalgia", "nostalgic", "nostalgic music", "nostalgic playlist", "nostalgic songs", "nostalgic song", "nostalgic vibes", "nostalgic vibe", "nostalgic lofi", "nostalgic chill", "nostalgic rage", "nostalgic rap", "nostalgic hip hop", "nostalgic EDM", "nostalgic dubstep", "nostalgic trap", "nostalgic techno", "nostalgic house", "nostalgic electronic", "nostalgic playlist", "nostalgic music playlist", "nostalgic songs playlist", "nostalgic song playlist", "nostalgic vibes playlist", "nostalgic vibe playlist", "nostalgic lofi playlist", "nostalgic chill playlist", "nostalgic rage playlist", "nostalgic rap playlist", "nostalgic hip hop playlist", "nostalgic EDM playlist", "nostalgic dubstep playlist",
-    "ending", "BGM", "OP", "ED", "JJk", "One Piece", "MHA", "soundtrack", "soundtracks", "music", "songs", "song", "playlist", "playlists", "whimsigothic", "Neoclassical/Symphonic  Metal", "Powerful Epic Instrumental Music- Epic Scores,  Soundtracks, Classical, Electronica, Study Music", "Classic Punk 70's & 80's", "classic punk 70's & 80's", "Classic Rock 70's & 80's", "Classic Metal 70's & 80's", "Classic Emo 90's & 2000's", "Classic Emo Rock 90's & 2000's",
-    "Demon Slayer", "SNK", "Naruto", "Chainsaw Man", "Yoasobi", "gym", "gym anime", "gym rage", "gym workout", "gym music", "gym playlist", "phonk", "phonk playlist", "Epic Motivational Powerful Music", "Epic", "Orchestra", "Orchestral", "Epic Music", "Epic Playlist", "Epic Songs", "Epic Song", "Epic Vibes", "Epic Vibe", "classics", "punk rock classics", "rock classics", "metal classics", "emo classics", "emo rock classics", "emo music classics", "emo playlist classics", "emo songs classics", "emo song classics", "emo vibes classics", "emo vibe classics", "emo lofi classics", "emo chill classics", "emo rage classics", "emo rap classics", "emo hip hop classics", "emo EDM classics", "emo dubstep classics", "emo trap classics", "emo techno classics", "emo house classics", "emo electronic classics", "emo playlist classics",
-    "DBZ", "HXH", "Jojo", "Tokyo Ghoul", "Attack on Titan", "rage", "rage music", "rage playlist", "anime rage", "anime rage music", "anime rage playlist", "Cybergrind", "grindcore", "cybergrind playlist", "grindcore playlist", "cybergrind music", "grindcore music", 
-    "My Hero Academia", "main character", "boss battle", "Walter White", "chill", "sleep", "hoe (tool)", "rap (music genre)", r"(\b?:play|playing\b)", r"(\b(?:y2k)\b)", "y2k", "y2k music", "birthday", "birthday music", "birthday playlist", "progressive rock", "classic rock", "rock", "hard rock", "album rock", "glam rock", "punk rock", "new wave", "post-punk", "alternative rock", "indie rock", "emo", "emo rock", "emo music", "emo playlist", "emo songs", "emo song", "emo vibes", "emo vibe", "emo lofi", "emo chill", "emo rage", "emo rap", "emo hip hop", "emo EDM", "emo dubstep", "emo trap", "emo techno", "emo house", "emo electronic", "emo playlist", "emo music playlist", "emo songs playlist", "emo song playlist", "emo vibes playlist", "emo vibe playlist", "emo lofi playlist", "emo chill playlist", "emo rage playlist", "emo rap playlist", "emo hip hop playlist", "emo EDM playlist", "emo dubstep playlist", "emo trap playlist", "emo techno playlist", "emo house playlist", "emo electronic playlist",
-]
-
-WHITELIST_ARTISTS = {
-    "Drake", "Eminem", "Kanye West", "Beyoncé", "Aimer", "Yoasobi", "Ariana Grande", "Fleetwood Mac", 
-    "Taylor Swift", "The Weeknd", "Bruno Mars", "Billie Eilish", "Doja Cat",
-    "Kenshi Yonezu", "Lisa", "Radwimps", "King Gnu", "Vaundy", "Eagles", "Queen", "The Beatles", "Led Zeppelin", "Pink Floyd", "The Rolling Stones", "The Who", "The Doors", "Jimi Hendrix", "Bob Dylan", "David Bowie", "Elton John", "Prince", "Michael Jackson", "Madonna", "Whitney Houston", "Mariah Carey", "Janet Jackson", "Stevie Wonder", "Bob Marley", "James Brown", "Aretha Franklin", "Ray Charles", "Sam Cooke", "Otis Redding", "Marvin Gaye", "Al Green", "Smokey Robinson", "Stevie Wonder", "Earth, Wind & Fire", "The Temptations", "The Supremes", "The Four Tops", "The Jackson 5", "The Isley Brothers", "The O'Jays", "The Commodores", "The Bee Gees", "The Eagles", "The Doobie Brothers", "The Allman Brothers Band", "The Grateful Dead", "The Band", "The Byrds", "The Velvet Underground", "The Doors", "The Who", "The Rolling Stones", "The Beatles",
-    "The Beach Boys", "The Supremes", "The Ronettes", "The Shirelles", "The Crystals", "The Chiffons", "The Marvelettes", "The Shangri-Las", "The Angels", "The Cookies", "The Shirelles", "The Chantels", "The Shangri-Las", 
-}
-
-# ✅ Expanded NSFW List (English + Japanese + Romanji)
-BLOCKLIST_TERMS = [
-    "nude", "adult", "18+", "hentai", "porn",  "boobies", "naked", "lewd", "🥵🍑🍒", "🥵", "🍑", "🍒", "🍆", "🖕", "slut",
-    "sex", "boob",  "エロ", "裏ビデオ", "無修正", "エッチ", "アダルト", "変態", "H動画", "ロリコン", "ブルセラ", "乱交", 
-    "shota", "doujinshi", "oppai", "ero", "ecchi", "h-manga", "h-doujin", "fuck", "tittie", "tits", "titties", "tits", "ass", "tities", 
-    "nsfw", "nude", "pussy", "hoes", "thot", "horny", "sexting", "nudes", "nipple", "smoking", "honkers", "honkas", "milf", "mf", "motherfucker"
-    "suggestive", "provocative", "sultry", "risque", "erotic", "fetish", "kink", "thong", "lingerie", "ganyu", "cock", "dick", "vagina", "mofo", "bitch", "bitches",
-    "busty", "cleavage", "camel toe", "nipples", "genital", "crotch", "bulge", "butt", "pawg", "twerk", "incelcore", "Incelcore", "INCELCORE", 
-]
-
-# ✅ **Multi-Word Trap List (Detects Bad Phrases)**
-BAD_PHRASES = [
-    "nude rap", "sexy twerk", "thirst trap", "nude dance", "nude model", "rapping children", "Big mama honkas",
-    "twerk", "twerk session", "twerking", "nude rap freestyle", "just sit on my face", "suck on toes", "licking toes", "licking feet",
-]
-
 async def get_session():
-    """Ensure we reuse a single aiohttp session for efficiency."""
-    global SESSION
-    if SESSION is None:
-        SESSION = aiohttp.ClientSession()
-    return SESSION
+    """Returns the application-lifetime OpenAI session (shared connection pool)."""
+    return HTTP_CLIENTS.get("openai")
 
 # ✅ Exponential Backoff for API Calls
 async def retry_api_call(call_func, retries=3):
@@ -112,137 +91,130 @@ async def retry_api_call(call_func, retries=3):
             delay *= random.uniform(1.5, 2.5)  
     return False  
 
+# ✅ Durable verdicts shared by every worker; the version changes with any threshold or term list
+MODERATION_VERDICTS = ModerationVerdictCache(policy_version(
+    OPENAI_MODERATION_MODEL, OPENAI_TEXT_THRESHOLDS, OPENAI_IMAGE_THRESHOLDS, HIGH_RISK_LEVELS, UNKNOWN_RISK_LEVELS,
+    WHITELIST_TERMS, WHITELIST_ARTISTS, BLOCKLIST_TERMS,
+))
+
 # ✅ **🔹 Keyword-Based NSFW Filtering (Lightweight)**
+# Whitelisted terms and artists win over the blocklist; every list is compiled once into one automaton
+KEYWORD_MATCHER = KeywordMatcher([*WHITELIST_TERMS, *WHITELIST_ARTISTS], BLOCKLIST_TERMS)
+
 async def keyword_filter(text: str) -> bool:
-    """First-pass keyword filtering using exact match blocklist, allowing whitelisted content."""
-    if not text:
-        return True  # Empty text is safe
+    """First-pass keyword filtering in one pass over the text, allowing whitelisted content."""
+    verdict = KEYWORD_MATCHER.classify(text)
 
-    text = html.unescape(text).strip().lower()
-    
-    # Allow Whitelisted Terms
-    if any(term.lower() in text for term in WHITELIST_TERMS):
+    if verdict is True and text:
         logging.info(f"✅ Whitelisted Term Allowed: {text}")
-        return True
-
-    # ✅ Allow Whitelisted Artists (Bypass Filtering)
-    if any(artist.lower() in text for artist in WHITELIST_ARTISTS):
-        logging.info(f"✅ Whitelisted Artist Allowed: {text}")
-        return True
-
-    # ✅ Strict Blocklist Check (Exact Matches Only)
-    if any(term in text for term in BLOCKLIST_TERMS):
+    elif verdict is False:
         logging.warning(f"❌ Blocked by Keyword Filter: {text}")
-        return False  
 
-    return None  # Not sure → Needs API check
+    return verdict  # None: not sure → Needs API check
 
 # ✅ **🔹 OpenAI NSFW Check (Final Pass)**
-async def openai_nsfw_filter(text: str) -> bool:
-    """Uses OpenAI Moderation API as the final NSFW text check."""
+async def openai_moderate_texts(texts):
+    """Moderates a batch of texts in one OpenAI Moderation request; returns one safe/unsafe verdict per text."""
     payload = {
-        "model": "omni-moderation-latest",
-        "input": [{"type": "text", "text": text}],
-        "thresholds": {
-            "sexual": 0.001,  
-            "sexual/minors": 0.0001,  
-            "harassment/threatening": 0.001,
-        }
+        "model": OPENAI_MODERATION_MODEL,
+        "input": list(texts),
+        "thresholds": OPENAI_TEXT_THRESHOLDS,
     }
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                OPENAI_MODERATION_API_URL, json=payload,
-                headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"},
-            ) as response:
-                data = await response.json()
-                flagged = any(result.get("flagged", False) for result in data.get("results", []))
-                
-                if flagged:
+    session = await get_session()
+    try:
+        async with session.post(
+            OPENAI_MODERATION_API_URL, json=payload,
+            headers={"Authorization": f"Bearer {OPENAI_API_KEY}", "Content-Type": "application/json"},
+        ) as response:
+            data = await response.json()
+            results = data.get("results", [])
+            if len(results) != len(texts):
+                raise ValueError(f"Expected {len(texts)} moderation results, got {len(results)}")
+
+            verdicts = []
+            for text, result in zip(texts, results):
+                if result.get("flagged", False):
                     logging.warning(f"❌ Blocked by OpenAI: {text}")
                 else:
                     logging.info(f"✅ Passed OpenAI: {text}")
+                verdicts.append(not result.get("flagged", False))
 
-                return not flagged
-        except Exception as e:
-            logging.error(f"❌ OpenAI API Error: {e}")
-            return True  # Assume safe if API fails
+            # ✅ Remember real verdicts (never the assume-safe fallback below)
+            await asyncio.to_thread(MODERATION_VERDICTS.set_texts, list(zip(texts, verdicts)))
+            for text, verdict in zip(texts, verdicts):
+                NSFW_TEXT_CACHE[MODERATION_VERDICTS.text_key(text)] = verdict
+            return verdicts
+    except Exception as e:
+        logging.error(f"❌ OpenAI API Error: {e}")
+        return [True] * len(texts)  # Assume safe if API fails
+
+# Concurrent text checks (every item's name and description) share batched requests
+OPENAI_TEXT_BATCHER = MicroBatcher(openai_moderate_texts, OPENAI_BATCH_MAX_SIZE, OPENAI_BATCH_WINDOW)
+
+async def openai_nsfw_filter(text: str) -> bool:
+    """Uses OpenAI Moderation API as the final NSFW text check (batched with concurrent checks)."""
+    return await OPENAI_TEXT_BATCHER.submit(text)
 
 # ✅ **🔹 Multi-Pass NSFW Text Filter**
 async def is_safe_content(text: str) -> bool:
-    """Applies keyword filtering first, then OpenAI NSFW check if needed."""
+    """Applies keyword filtering first, then a remembered verdict, then OpenAI NSFW check if needed."""
     keyword_check = await keyword_filter(text)
 
-    if keyword_check is None:  # ✅ Not sure → Ask OpenAI
+    if keyword_check is None:  # ✅ Not sure → Ask the verdict caches, then OpenAI
+        key = MODERATION_VERDICTS.text_key(text)
+        if key in NSFW_TEXT_CACHE:
+            return NSFW_TEXT_CACHE[key]
+
+        verdict = await asyncio.to_thread(MODERATION_VERDICTS.get_text, text)
+        if verdict is not None:
+            NSFW_TEXT_CACHE[key] = verdict
+            return verdict
         return await openai_nsfw_filter(text)
     
     return keyword_check  # ✅ If keyword filter is sure, use its result
 
 # ✅ **🔹 Google Cloud Vision NSFW Check**
+# Concurrent image checks share batch_annotate_images calls on the Vision thread pool
+VISION_SAFE_SEARCH = VisionSafeSearch(GOOGLE_CLOUD_VISION_CLIENT)
+
 async def google_cloud_nsfw_check(image_url: str) -> bool:
-    """Runs Google Cloud Vision NSFW detection with stricter thresholds."""
-    try:
-        image = vision.Image()
-        image.source.image_uri = image_url
-        response = GOOGLE_CLOUD_VISION_CLIENT.safe_search_detection(image=image)
-        annotations = response.safe_search_annotation
-
-        # ✅ Define Stricter Risk Levels
-        high_risk_levels = {"LIKELY", "VERY_LIKELY"}
-        unknown_risk_levels = {"UNKNOWN"}
-
-        if (
-            annotations.adult.name in high_risk_levels or
-            annotations.violence.name in unknown_risk_levels or
-            annotations.racy.name in unknown_risk_levels
-        ):
-            return False  # ❌ Flag as unsafe
-
-        return True  # ✅ Safe image
-    except Exception as e:
-        logging.error(f"❌ Google Cloud Vision API Error: {e}")
-        return False  # Assume unsafe if Vision API fails
+    """Runs Google Cloud Vision NSFW detection with stricter thresholds (batched, off the event loop; None if unchecked)."""
+    return await VISION_SAFE_SEARCH.check(image_url)
 
 # ✅ **🔹 OpenAI NSFW Image Check**
 async def openai_nsfw_image_check(image_url: str) -> bool:
-    """Runs OpenAI NSFW Image Moderation with a focus on sexual & violent content."""
+    """Runs OpenAI NSFW Image Moderation with a focus on sexual & violent content (None if the API failed)."""
     payload = {
-        "model": "omni-moderation-latest",
+        "model": OPENAI_MODERATION_MODEL,
         "input": [{"type": "image_url", "image_url": {"url": image_url}}],
-        "thresholds": {
-            "sexual/minors": 0.001,  # Extremely strict for minors
-            "sexual": 0.001,  # Extremely strict for adults
-        }
+        "thresholds": OPENAI_IMAGE_THRESHOLDS,
     }
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                OPENAI_MODERATION_API_URL, json=payload, headers={"Authorization": f"Bearer {OPENAI_API_KEY}"}
-            ) as response:
-                data = await response.json()
-                return not any(result.get("flagged", False) for result in data.get("results", []))
-        except Exception as e:
-            logging.error(f"❌ OpenAI Image Moderation Error: {e}")
-            return False  # Assume unsafe if OpenAI API fails
+    session = await get_session()
+    try:
+        async with session.post(
+            OPENAI_MODERATION_API_URL, json=payload, headers={"Authorization": f"Bearer {OPENAI_API_KEY}"}
+        ) as response:
+            data = await response.json()
+            return not any(result.get("flagged", False) for result in data.get("results", []))
+    except Exception as e:
+        logging.error(f"❌ OpenAI Image Moderation Error: {e}")
+        return None  # Unknown: treated as unsafe, but not remembered
 
-async def is_safe_image(image_url: str) -> str:
-    """Google acts as the primary filter; if Google flags, block. Otherwise, check OpenAI."""
-    if not image_url:
-        return "/static/images/censored-image.png"
-
-    if image_url in NSFW_IMAGE_CACHE:
-        return NSFW_IMAGE_CACHE[image_url]
+# ✅ Image identity: the same picture under several URLs (CDN size variants) is moderated once
+IMAGE_IDENTITY = ImageIdentity()
+IMAGE_CONTENT_CHECKS = SingleFlight()  # One moderation run per image content at a time
 
+async def moderate_image(image_url: str):
+    """Google acts as the primary filter; if Google flags, block. Otherwise, check OpenAI. None if a check failed."""
     # ✅ Check Google Vision first
     google_safe = await google_cloud_nsfw_check(image_url)
 
     # ❌ If Google flags → Block immediately
     if not google_safe:
         logging.warning(f"⚠️ NSFW Image Blocked by Google: {image_url}")
-        NSFW_IMAGE_CACHE[image_url] = "/static/images/censored-image.png"
-        return "/static/images/censored-image.png"
+        return google_safe
 
     # ✅ Google allows → Check OpenAI
     openai_safe = await openai_nsfw_image_check(image_url)
@@ -250,9 +222,43 @@ async def is_safe_image(image_url: str) -> str:
     # ❌ If OpenAI flags → Block
     if not openai_safe:
         logging.warning(f"⚠️ NSFW Image Blocked by OpenAI: {image_url}")
-        NSFW_IMAGE_CACHE[image_url] = "/static/images/censored-image.png"
+
+    return openai_safe
+
+async def moderate_image_content(image_url: str, identity):
+    """Moderates an image and stores the verdict under its content identity."""
+    safe = await moderate_image(image_url)
+    if safe is not None:
+        await asyncio.to_thread(MODERATION_VERDICTS.set_image_content, identity, safe)
+    return safe
+
+async def is_safe_image(image_url: str) -> str:
+    """Returns the image URL if it passes moderation, otherwise the censored placeholder."""
+    if not image_url:
         return "/static/images/censored-image.png"
 
-    # ✅ Both allow → Allow
-    NSFW_IMAGE_CACHE[image_url] = image_url
-    return image_url
+    if image_url in NSFW_IMAGE_CACHE:
+        return NSFW_IMAGE_CACHE[image_url]
+
+    remembered = await asyncio.to_thread(MODERATION_VERDICTS.get_image, image_url)
+    if remembered is not None:
+        NSFW_IMAGE_CACHE[image_url] = remembered
+        return remembered
+
+    # ✅ New URL → Reuse the verdict of the same (or a visually identical) picture if there is one
+    identity = await IMAGE_IDENTITY.identify(image_url)
+    if identity is None:
+        safe = await moderate_image(image_url)
+    else:
+        safe = await asyncio.to_thread(MODERATION_VERDICTS.get_image_content, identity)
+        if safe is None:
+            safe = await IMAGE_CONTENT_CHECKS.do(identity["sha256"], lambda: moderate_image_content(image_url, identity))
+
+    return await remember_image(image_url, image_url if safe else "/static/images/censored-image.png", durable=safe is not None)
+
+async def remember_image(image_url, result, durable=True):
+    """Caches an image result in-process, and durably unless it came from a failed check."""
+    NSFW_IMAGE_CACHE[image_url] = result
+    if durable:
+        await asyncio.to_thread(MODERATION_VERDICTS.set_image, image_url, result)
+    return result
@@ -0,0 +1,34 @@
+# nsfw_terms.py
+
+# ✅ Whitelisted Phrases (Allowed Content)
+WHITELIST_TERMS = [
+    "best", "anime", "edit", "dark", "phonk", "bass drop", "remix", r"(\b?:best songs\b)", "remixes", "shoujo", "shonen", "seinen", "josei", "hardstyle", "hardcore", "dubstep", "trap", "trance", "EDM", "electronic", "electro", "house", "techno", "rave", "rave music", "rave playlist", "Christmas", "Christmas music", "Christmas playlist", "Christmas songs", "Christmas carols", "Christmas vibes", "Christmas lofi", "Christmas chill", "Christmas rage", "Christmas rap", "Christmas hip hop", "Christmas EDM", "Christmas dubstep", "Christmas trap", "Christmas techno", "Christmas house", "Christmas electronic",
+    "weekly updates", "top anime song", "OST", "opening", "gym", "workout", "study", "chill", "relax", "lofi", "vibes", "vibe", "nostalgiacore", "nostalgia", "nostalgic", "nostalgic music", "nostalgic playlist", "nostalgic songs", "nostalgic song", "nostalgic vibes", "nostalgic vibe", "nostalgic lofi", "nostalgic chill", "nostalgic rage", "nostalgic rap", "nostalgic hip hop", "nostalgic EDM", "nostalgic dubstep", "nostalgic trap", "nostalgic techno", "nostalgic house", "nostalgic electronic", "nostalgic playlist", "nostalgic music playlist", "nostalgic songs playlist", "nostalgic song playlist", "nostalgic vibes playlist", "nostalgic vibe playlist", "nostalgic lofi playlist", "nostalgic chill playlist", "nostalgic rage playlist", "nostalgic rap playlist", "nostalgic hip hop playlist", "nostalgic EDM playlist", "nostalgic dubstep playlist",
+    "ending", "BGM", "OP", "ED", "JJk", "One Piece", "MHA", "soundtrack", "soundtracks", "music", "songs", "song", "playlist", "playlists", "whimsigothic", "Neoclassical/Symphonic  Metal", "Powerful Epic Instrumental Music- Epic Scores,  Soundtracks, Classical, Electronica, Study Music", "Classic Punk 70's & 80's", "classic punk 70's & 80's", "Classic Rock 70's & 80's", "Classic Metal 70's & 80's", "Classic Emo 90's & 2000's", "Classic Emo Rock 90's & 2000's",
+    "Demon Slayer", "SNK", "Naruto", "Chainsaw Man", "Yoasobi", "gym", "gym anime", "gym rage", "gym workout", "gym music", "gym playlist", "phonk", "phonk playlist", "Epic Motivational Powerful Music", "Epic", "Orchestra", "Orchestral", "Epic Music", "Epic Playlist", "Epic Songs", "Epic Song", "Epic Vibes", "Epic Vibe", "classics", "punk rock classics", "rock classics", "metal classics", "emo classics", "emo rock classics", "emo music classics", "emo playlist classics", "emo songs classics", "emo song classics", "emo vibes classics", "emo vibe classics", "emo lofi classics", "emo chill classics", "emo rage classics", "emo rap classics", "emo hip hop classics", "emo EDM classics", "emo dubstep classics", "emo trap classics", "emo techno classics", "emo house classics", "emo electronic classics", "emo playlist classics",
+    "DBZ", "HXH", "Jojo", "Tokyo Ghoul", "Attack on Titan", "rage", "rage music", "rage playlist", "anime rage", "anime rage music", "anime rage playlist", "Cybergrind", "grindcore", "cybergrind playlist", "grindcore playlist", "cybergrind music", "grindcore music", 
+    "My Hero Academia", "main character", "boss battle", "Walter White", "chill", "sleep", "hoe (tool)", "rap (music genre)", r"(\b?:play|playing\b)", r"(\b(?:y2k)\b)", "y2k", "y2k music", "birthday", "birthday music", "birthday playlist", "progressive rock", "classic rock", "rock", "hard rock", "album rock", "glam rock", "punk rock", "new wave", "post-punk", "alternative rock", "indie rock", "emo", "emo rock", "emo music", "emo playlist", "emo songs", "emo song", "emo vibes", "emo vibe", "emo lofi", "emo chill", "emo rage", "emo rap", "emo hip hop", "emo EDM", "emo dubstep", "emo trap", "emo techno", "emo house", "emo electronic", "emo playlist", "emo music playlist", "emo songs playlist", "emo song playlist", "emo vibes playlist", "emo vibe playlist", "emo lofi playlist", "emo chill playlist", "emo rage playlist", "emo rap playlist", "emo hip hop playlist", "emo EDM playlist", "emo dubstep playlist", "emo trap playlist", "emo techno playlist", "emo house playlist", "emo electronic playlist",
+]
+
+WHITELIST_ARTISTS = {
+    "Drake", "Eminem", "Kanye West", "Beyoncé", "Aimer", "Yoasobi", "Ariana Grande", "Fleetwood Mac", 
+    "Taylor Swift", "The Weeknd", "Bruno Mars", "Billie Eilish", "Doja Cat",
+    "Kenshi Yonezu", "Lisa", "Radwimps", "King Gnu", "Vaundy", "Eagles", "Queen", "The Beatles", "Led Zeppelin", "Pink Floyd", "The Rolling Stones", "The Who", "The Doors", "Jimi Hendrix", "Bob Dylan", "David Bowie", "Elton John", "Prince", "Michael Jackson", "Madonna", "Whitney Houston", "Mariah Carey", "Janet Jackson", "Stevie Wonder", "Bob Marley", "James Brown", "Aretha Franklin", "Ray Charles", "Sam Cooke", "Otis Redding", "Marvin Gaye", "Al Green", "Smokey Robinson", "Stevie Wonder", "Earth, Wind & Fire", "The Temptations", "The Supremes", "The Four Tops", "The Jackson 5", "The Isley Brothers", "The O'Jays", "The Commodores", "The Bee Gees", "The Eagles", "The Doobie Brothers", "The Allman Brothers Band", "The Grateful Dead", "The Band", "The Byrds", "The Velvet Underground", "The Doors", "The Who", "The Rolling Stones", "The Beatles",
+    "The Beach Boys", "The Supremes", "The Ronettes", "The Shirelles", "The Crystals", "The Chiffons", "The Marvelettes", "The Shangri-Las", "The Angels", "The Cookies", "The Shirelles", "The Chantels", "The Shangri-Las", 
+}
+
+# ✅ Expanded NSFW List (English + Japanese + Romanji)
+BLOCKLIST_TERMS = [
+    "nude", "adult", "18+", "hentai", "porn",  "boobies", "naked", "lewd", "🥵🍑🍒", "🥵", "🍑", "🍒", "🍆", "🖕", "slut",
+    "sex", "boob",  "エロ", "裏ビデオ", "無修正", "エッチ", "アダルト", "変態", "H動画", "ロリコン", "ブルセラ", "乱交", 
+    "shota", "doujinshi", "oppai", "ero", "ecchi", "h-manga", "h-doujin", "fuck", "tittie", "tits", "titties", "tits", "ass", "tities", 
+    "nsfw", "nude", "pussy", "hoes", "thot", "horny", "sexting", "nudes", "nipple", "smoking", "honkers", "honkas", "milf", "mf", "motherfucker"
+    "suggestive", "provocative", "sultry", "risque", "erotic", "fetish", "kink", "thong", "lingerie", "ganyu", "cock", "dick", "vagina", "mofo", "bitch", "bitches",
+    "busty", "cleavage", "camel toe", "nipples", "genital", "crotch", "bulge", "butt", "pawg", "twerk", "incelcore", "Incelcore", "INCELCORE", 
+]
+
+# ✅ **Multi-Word Trap List (Detects Bad Phrases)**
+BAD_PHRASES = [
+    "nude rap", "sexy twerk", "thirst trap", "nude dance", "nude model", "rapping children", "Big mama honkas",
+    "twerk", "twerk session", "twerking", "nude rap freestyle", "just sit on my face", "suck on toes", "licking toes", "licking feet",
+]
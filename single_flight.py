@@ -0,0 +1,106 @@
+# single_flight.py
+
+import os, math, random, asyncio, threading
+from concurrent.futures import Future
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# ✅ Probabilistic early refresh (XFetch); higher beta refreshes earlier
+XFETCH_BETA = float(os.getenv("XFETCH_BETA", 1.0))
+
+
+def normalize_url(url):
+    """Canonical form of a request URL: sorted query parameters, lower-cased and whitespace-collapsed values."""
+    parts = urlsplit(url)
+    query = sorted((key, " ".join(value.lower().split())) for key, value in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def should_refresh_early(age, ttl, delta, beta=XFETCH_BETA):
+    """
+    XFetch: decides whether a still-fresh entry should be recomputed now.
+
+    `delta` is how long the last recompute took. The chance grows as the entry
+    nears `ttl`, so one caller usually refreshes it shortly before it expires
+    instead of every caller missing at once.
+    """
+    if not delta or age >= ttl:
+        return age >= ttl
+    return age - delta * beta * math.log(1.0 - random.random()) >= ttl
+
+
+class _Call:
+    __slots__ = ("loop", "task", "waiters")
+
+    def __init__(self, loop, task):
+        self.loop = loop
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls so duplicate callers share one upstream request.
+
+    `do()` is for coroutines: the first caller for a key starts the call as a task
+    and later callers on the same event loop await that task. A caller being
+    cancelled does not cancel the shared call unless it was the last one waiting.
+    `do_sync()` does the same for threads.
+    """
+
+    def __init__(self):
+        self.stats = {"calls": 0, "coalesced": 0}
+        self._calls = {}
+        self._sync_calls = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key, factory):
+        """Awaits `factory()` for `key`, joining an identical call already in flight."""
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        if call is None or call.loop is not loop or call.task.done():
+            call = _Call(loop, loop.create_task(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():  # Nobody else wants the result
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def do_sync(self, key, fn):
+        """Thread variant of `do()`: runs `fn()` once per key while other threads wait for its result."""
+        with self._lock:
+            future = self._sync_calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._sync_calls[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._sync_calls[key]
+        return future.result()
+
+    def __len__(self):
+        return len(self._calls) + len(self._sync_calls)
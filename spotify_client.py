@@ -0,0 +1,615 @@
+# spotify_client.py
+
+import os, json, math, mmap, time, heapq, random, struct, asyncio, logging, threading, itertools, contextvars, requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from disk_cache import CACHE_DIR
+from single_flight import SingleFlight, normalize_url, should_refresh_early
+
+SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+# ✅ Token refresh settings
+SPOTIFY_TOKEN_REFRESH_MARGIN = int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", 300))  # Refresh this early (seconds)
+SPOTIFY_TOKEN_TIMEOUT = 5  # Seconds allowed for one token request
+
+# ✅ Search pagination settings
+SPOTIFY_PAGE_SIZE = 50  # Largest `limit` the search endpoint accepts
+SPOTIFY_MAX_OFFSET = 1000  # Search never pages past this offset
+SPOTIFY_SEARCH_MAX_RESULTS = int(os.getenv("SPOTIFY_SEARCH_MAX_RESULTS", SPOTIFY_PAGE_SIZE))  # Items per query (one page; raise to paginate deeper)
+SPOTIFY_PAGE_CONCURRENCY = int(os.getenv("SPOTIFY_PAGE_CONCURRENCY", 4))  # Pages in flight per query
+
+# ✅ Ranking settings
+SPOTIFY_RANK_RANDOMNESS = float(os.getenv("SPOTIFY_RANK_RANDOMNESS", 0.4))  # 0 = pure popularity, 1 = pure shuffle
+SPOTIFY_RANK_CANDIDATES = int(os.getenv("SPOTIFY_RANK_CANDIDATES", 30))  # Candidates kept for lazy moderation
+SPOTIFY_FOLLOWERS_SCALE = 7  # log10 of a follower count treated as maximally popular
+
+# ✅ Lazy moderation settings
+SPOTIFY_RESULTS_SHOWN = 9  # Results rendered per page
+SPOTIFY_MODERATION_MAX_WAVE = int(os.getenv("SPOTIFY_MODERATION_MAX_WAVE", 12))  # Items moderated concurrently per wave
+
+# ✅ Search response cache settings
+SPOTIFY_CACHE_FRESH_TTL = int(os.getenv("SPOTIFY_CACHE_FRESH_TTL", 120))  # Served as-is (seconds)
+SPOTIFY_CACHE_STALE_TTL = int(os.getenv("SPOTIFY_CACHE_STALE_TTL", 900))  # Served while refreshing (seconds)
+SPOTIFY_CACHE_MAX_ENTRIES = int(os.getenv("SPOTIFY_CACHE_MAX_ENTRIES", 2000))
+SPOTIFY_CACHE_MAX_BYTES = int(os.getenv("SPOTIFY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# ✅ Rate limiter settings
+SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", 10))  # Requests per second (per worker)
+SPOTIFY_RATE_BURST = int(os.getenv("SPOTIFY_RATE_BURST", 20))  # Bucket size
+SPOTIFY_PAUSE_PATH = os.getenv("SPOTIFY_PAUSE_PATH", os.path.join(CACHE_DIR, "spotify_pause.bin"))
+SPOTIFY_DEFAULT_RETRY_AFTER = 2  # Seconds paused when a 429 carries no Retry-After
+PRIORITY_INTERACTIVE = 0  # User-facing requests
+PRIORITY_BACKGROUND = 10  # Cache refreshes and pool warming
+SPOTIFY_PRIORITY = contextvars.ContextVar("spotify_priority", default=PRIORITY_INTERACTIVE)
+
+
+class SpotifyTokenManager:
+    """
+    Client-credentials token shared by the Flask (sync) and Quart (async) code paths.
+
+    Only one refresh is ever in flight: it runs on a single background thread and
+    every caller (thread or coroutine) waits on the same future, so cold requests
+    cannot stampede the token endpoint. Async callers await it without blocking
+    the event loop. Tokens are refreshed proactively once they are within
+    `refresh_margin` seconds of `expires_at`, while the current one keeps serving.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_margin=SPOTIFY_TOKEN_REFRESH_MARGIN, token_url=SPOTIFY_TOKEN_URL):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url
+        self.access_token = None
+        self.expires_at = 0
+        self.stats = {"hits": 0, "waits": 0, "refreshes": 0, "proactive_refreshes": 0, "failures": 0}
+        self.last_refresh_seconds = None
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spotify-token")
+        self._http = requests.Session()  # Keeps the token endpoint connection alive between refreshes
+
+    def _refresh(self):
+        started = time.monotonic()
+        try:
+            response = self._http.post(
+                self.token_url,
+                data={"grant_type": "client_credentials", "client_id": self.client_id, "client_secret": self.client_secret},
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                timeout=SPOTIFY_TOKEN_TIMEOUT,
+            )
+            response.raise_for_status()
+            token_data = response.json()
+            self.access_token = token_data["access_token"]
+            self.expires_at = time.time() + token_data.get("expires_in", 3600)
+            self.stats["refreshes"] += 1
+            return self.access_token
+        except Exception as e:
+            self.stats["failures"] += 1
+            logging.error(f"❌ Token error: {e}")
+            return None
+        finally:
+            self.last_refresh_seconds = time.monotonic() - started
+
+    def _start_refresh(self):
+        """Returns the in-flight refresh future, starting one if none is running."""
+        with self._lock:
+            if self._inflight is None or self._inflight.done():
+                self._inflight = self._executor.submit(self._refresh)
+            return self._inflight
+
+    def _cached_token(self):
+        """Returns a usable cached token (kicking off a proactive refresh if it is about to expire)."""
+        remaining = self.expires_at - time.time()
+        if not self.access_token or remaining <= 0:
+            return None
+        if remaining < self.refresh_margin and (self._inflight is None or self._inflight.done()):
+            self.stats["proactive_refreshes"] += 1
+            self._start_refresh()
+        self.stats["hits"] += 1
+        return self.access_token
+
+    def get_token(self, timeout=SPOTIFY_TOKEN_TIMEOUT * 2):
+        """Returns a valid access token (or None), blocking only while a refresh is needed."""
+        token = self._cached_token()
+        if token:
+            return token
+        self.stats["waits"] += 1
+        try:
+            return self._start_refresh().result(timeout)
+        except Exception as e:
+            logging.error(f"❌ Token wait failed: {e}")
+            return None
+
+    async def get_token_async(self):
+        """Async variant of `get_token()`; waits on the shared refresh without blocking the loop."""
+        token = self._cached_token()
+        if token:
+            return token
+        self.stats["waits"] += 1
+        return await asyncio.wrap_future(self._start_refresh())
+
+    def invalidate(self, token):
+        """Drops `token` after Spotify rejected it (no-op if it was already replaced)."""
+        if token and token == self.access_token:
+            self.expires_at = 0
+
+    def metrics(self):
+        return {
+            **self.stats,
+            "expires_in": max(0, int(self.expires_at - time.time())),
+            "refresh_in_flight": self._inflight is not None and not self._inflight.done(),
+            "last_refresh_seconds": self.last_refresh_seconds,
+        }
+
+
+class SpotifyRateLimiter:
+    """
+    Token-bucket scheduler every Spotify API call passes through.
+
+    Callers that cannot take a token immediately queue by priority (then
+    arrival), and one dispatcher thread releases them as tokens accrue, so
+    sync Flask threads and Quart coroutines share the same budget. A 429 pauses
+    the whole bucket until `Retry-After`; the pause deadline lives in a small
+    memory-mapped file, so every worker sharing `pause_path` backs off together.
+    The priority of a call defaults to `SPOTIFY_PRIORITY` (a context variable
+    background jobs set to `PRIORITY_BACKGROUND`).
+    """
+
+    def __init__(self, rate=SPOTIFY_RATE_LIMIT, burst=SPOTIFY_RATE_BURST, pause_path=SPOTIFY_PAUSE_PATH):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.stats = {"acquired": 0, "queued": 0, "throttled": 0, "timeouts": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+        self._updated = time.monotonic()
+        self._heap = []  # (priority, sequence, waiter)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._dispatcher = None
+        self._local_pause = 0.0
+
+        self._pause = None
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(pause_path)), exist_ok=True)
+            with open(pause_path, "a+b") as handle:
+                if os.path.getsize(pause_path) < 8:
+                    handle.write(b"\0" * 8)
+                    handle.flush()
+                self._pause = mmap.mmap(handle.fileno(), 8)
+        except OSError as e:
+            logging.warning(f"⚠️ Spotify pause file unavailable, pausing per worker only: {e}")
+
+    def paused_until(self):
+        """Epoch time until which every Spotify call has to wait."""
+        shared = struct.unpack_from("d", self._pause)[0] if self._pause is not None else 0.0
+        return max(shared, self._local_pause)
+
+    def pause(self, seconds):
+        """Stops all calls (in every worker) for `seconds` after a 429."""
+        until = time.time() + seconds
+        with self._condition:
+            if until > self.paused_until():
+                self._local_pause = until
+                if self._pause is not None:
+                    struct.pack_into("d", self._pause, 0, until)
+            self.tokens = 0.0
+            self.stats["throttled"] += 1
+            self._condition.notify_all()
+        logging.warning(f"⚠️ Spotify rate limited, pausing all requests for {seconds} sec")
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _delay(self):
+        """Seconds until a token may be handed out (0 when one is available now)."""
+        pause = self.paused_until() - time.time()
+        if pause > 0:
+            return pause
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def _try_take(self):
+        if self._heap or self._delay() > 0:
+            return False
+        self.tokens -= 1
+        self.stats["acquired"] += 1
+        return True
+
+    def _enqueue(self, priority, waiter):
+        heapq.heappush(self._heap, (SPOTIFY_PRIORITY.get() if priority is None else priority, next(self._sequence), waiter))
+        self.stats["queued"] += 1
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name="spotify-limiter", daemon=True)
+            self._dispatcher.start()
+        self._condition.notify_all()
+
+    def _dispatch(self):
+        with self._condition:
+            while True:
+                while self._heap and self._heap[0][2]["cancelled"]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._delay()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                _, _, waiter = heapq.heappop(self._heap)
+                self.tokens -= 1
+                self._record_wait(waiter["queued_at"])
+                try:
+                    waiter["release"]()
+                except RuntimeError:  # The waiter's event loop is gone
+                    pass
+
+    def _record_wait(self, queued_at):
+        waited = time.monotonic() - queued_at
+        self.stats["acquired"] += 1
+        self.stats["total_wait_seconds"] += waited
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], waited)
+
+    def acquire(self, priority=None, timeout=None):
+        """Blocks until a call may be made; returns False if `timeout` ran out first."""
+        with self._condition:
+            if self._try_take():
+                return True
+            released = threading.Event()
+            waiter = {"queued_at": time.monotonic(), "cancelled": False, "release": released.set}
+            self._enqueue(priority, waiter)
+        if released.wait(timeout):
+            return True
+        with self._condition:
+            if released.is_set():
+                return True
+            waiter["cancelled"] = True
+            self.stats["timeouts"] += 1
+        return False
+
+    async def acquire_async(self, priority=None):
+        """Waits (without blocking the event loop) until a call may be made."""
+        with self._condition:
+            if self._try_take():
+                return
+            loop = asyncio.get_running_loop()
+            released = loop.create_future()
+
+            def release():
+                loop.call_soon_threadsafe(lambda: released.done() or released.set_result(True))
+
+            waiter = {"queued_at": time.monotonic(), "cancelled": False, "release": release}
+            self._enqueue(priority, waiter)
+        try:
+            await released
+        except asyncio.CancelledError:
+            waiter["cancelled"] = True
+            raise
+
+    def metrics(self):
+        with self._condition:
+            waiting = [entry for entry in self._heap if not entry[2]["cancelled"]]
+            now = time.monotonic()
+            return {
+                **self.stats,
+                "queue_depth": len(waiting),
+                "queue_depth_by_priority": {str(p): sum(1 for entry in waiting if entry[0] == p) for p in {entry[0] for entry in waiting}},
+                "oldest_wait_seconds": max((now - entry[2]["queued_at"] for entry in waiting), default=0.0),
+                "avg_wait_seconds": self.stats["total_wait_seconds"] / self.stats["queued"] if self.stats["queued"] else 0.0,
+                "paused_for_seconds": max(0.0, self.paused_until() - time.time()),
+                "tokens": round(self.tokens, 2),
+            }
+
+
+class SpotifySearchCache:
+    """
+    Search URL -> response payload cache with stale-while-revalidate.
+
+    URLs are normalized, and identical misses in flight at the same time share
+    one upstream call. Entries younger than `fresh_ttl` are served directly,
+    except that XFetch may pick one caller to refresh an entry early as it
+    nears expiry. Older entries are served until `stale_ttl` while a single
+    background refresh replaces them. The cache is bounded by entry count and
+    by the encoded size of its payloads, evicting least recently used URLs
+    first. Payloads are shared, so callers must treat them as read-only.
+    """
+
+    def __init__(self, fresh_ttl=SPOTIFY_CACHE_FRESH_TTL, stale_ttl=SPOTIFY_CACHE_STALE_TTL,
+                 max_entries=SPOTIFY_CACHE_MAX_ENTRIES, max_bytes=SPOTIFY_CACHE_MAX_BYTES):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.stats = {"hits": 0, "stale_hits": 0, "early_refreshes": 0, "misses": 0, "evictions": 0,
+                      "refreshes": 0, "refresh_failures": 0}
+        self.flights = SingleFlight()
+        self._entries = OrderedDict()  # normalized url -> (payload, fetched_at, size, load_seconds)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._tasks = set()  # Strong references to background refresh tasks
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="spotify-cache")
+
+    def get(self, url):
+        """Returns (payload, needs_refresh), or None when the URL is missing or too old."""
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.time() - entry[1] if entry else None
+            if entry is None or age > self.stale_ttl:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            if age > self.fresh_ttl:
+                self.stats["stale_hits"] += 1
+                return entry[0], True
+            self.stats["hits"] += 1
+            if should_refresh_early(age, self.fresh_ttl, entry[3]):
+                self.stats["early_refreshes"] += 1
+                return entry[0], True
+            return entry[0], False
+
+    def set(self, url, payload, load_seconds=None):
+        key = normalize_url(url)
+        size = len(json.dumps(payload, separators=(",", ":")))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self.size_bytes -= previous[2]
+            self._entries[key] = (payload, time.time(), size, load_seconds)
+            self.size_bytes += size
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted[2]
+                self.stats["evictions"] += 1
+
+    def _claim_refresh(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _store(self, url, payload, started):
+        if isinstance(payload, dict):
+            self.set(url, payload, time.monotonic() - started)
+        return payload
+
+    def _store_refresh(self, url, payload, started):
+        if isinstance(payload, dict):
+            self.stats["refreshes"] += 1
+        else:
+            self.stats["refresh_failures"] += 1
+        self._store(url, payload, started)
+
+    def fetch(self, url, loader):
+        """Sync read-through: `loader()` runs on a miss, or on a worker thread to refresh a stale entry."""
+        cached = self.get(url)
+        if cached:
+            payload, stale = cached
+            if stale and self._claim_refresh(url):
+                self._executor.submit(self._refresh, url, loader)
+            return payload
+        started = time.monotonic()
+        return self.flights.do_sync(normalize_url(url), lambda: self._store(url, loader(), started))
+
+    def _refresh(self, url, loader):
+        SPOTIFY_PRIORITY.set(PRIORITY_BACKGROUND)
+        started = time.monotonic()
+        try:
+            self._store_refresh(url, loader(), started)
+        except Exception as e:
+            self.stats["refresh_failures"] += 1
+            logging.warning(f"⚠️ Spotify cache refresh failed for {url}: {e}")
+        finally:
+            self._refreshing.discard(normalize_url(url))
+
+    async def fetch_async(self, url, loader):
+        """Async read-through: awaits `loader()` on a miss, refreshes stale entries in a background task."""
+        cached = self.get(url)
+        if cached:
+            payload, stale = cached
+            if stale and self._claim_refresh(url):
+                task = asyncio.get_running_loop().create_task(self._refresh_async(url, loader))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return payload
+
+        async def load():
+            started = time.monotonic()
+            return self._store(url, await loader(), started)
+
+        return await self.flights.do(normalize_url(url), load)
+
+    async def _refresh_async(self, url, loader):
+        SPOTIFY_PRIORITY.set(PRIORITY_BACKGROUND)  # Task-local: queues behind interactive calls
+        started = time.monotonic()
+        try:
+            self._store_refresh(url, await loader(), started)
+        except Exception as e:
+            self.stats["refresh_failures"] += 1
+            logging.warning(f"⚠️ Spotify cache refresh failed for {url}: {e}")
+        finally:
+            self._refreshing.discard(normalize_url(url))
+
+    def metrics(self):
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            **{f"flights_{name}": value for name, value in self.flights.stats.items()},
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "hit_ratio": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else None,
+            "fresh_hit_ratio": self.stats["hits"] / lookups if lookups else None,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+async def paginate_search(fetch_page, item_key, max_results=SPOTIFY_SEARCH_MAX_RESULTS,
+                          page_size=SPOTIFY_PAGE_SIZE, concurrency=SPOTIFY_PAGE_CONCURRENCY, on_page=None):
+    """
+    Collects up to `max_results` search items with offset pages fetched in parallel.
+
+    `fetch_page(offset, limit)` returns a Spotify search payload (or None). The
+    first page is fetched alone to learn `total`; the remaining offsets are then
+    requested concurrently (at most `concurrency` at a time). `on_page(offset, items)`
+    is called as each page lands, and the items are returned in offset order.
+    Returns None if the first page could not be fetched.
+    """
+    first = await fetch_page(0, page_size)
+    if not isinstance(first, dict):
+        return None
+
+    def page_items(data):
+        block = data.get(item_key) if isinstance(data, dict) else None
+        items = block.get("items") if isinstance(block, dict) else None
+        return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+    pages = {0: page_items(first)}
+    if on_page:
+        on_page(0, pages[0])
+
+    total = (first.get(item_key) or {}).get("total") or 0
+    last_offset = min(total, max_results, SPOTIFY_MAX_OFFSET)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def fetch(offset):
+        async with semaphore:
+            return offset, await fetch_page(offset, page_size)
+
+    if len(pages[0]) >= page_size:
+        page_tasks = [asyncio.ensure_future(fetch(offset)) for offset in range(page_size, last_offset, page_size)]
+        try:
+            for next_page in asyncio.as_completed(page_tasks):
+                offset, data = await next_page
+                pages[offset] = page_items(data)
+                if on_page:
+                    on_page(offset, pages[offset])
+        finally:
+            for task in page_tasks:  # The caller was cancelled (e.g. a deadline): stop the pages still in flight
+                task.cancel()
+
+    return [item for offset in sorted(pages) for item in pages[offset]][:max_results]
+
+
+def spotify_popularity(item):
+    """Popularity in [0, 1]: Spotify's 0-100 score, or log-scaled followers (playlists)."""
+    popularity = item.get("popularity")
+    if isinstance(popularity, (int, float)):
+        return min(max(popularity / 100, 0.0), 1.0)
+    followers = item.get("followers")
+    total = followers.get("total") if isinstance(followers, dict) else None
+    if isinstance(total, (int, float)) and total > 0:
+        return min(math.log10(1 + total) / SPOTIFY_FOLLOWERS_SCALE, 1.0)
+    return 0.0
+
+
+def spotify_diversity_key(item, item_type):
+    """Items sharing this key compete for one slot: the lead artist for albums and tracks, the owner for playlists."""
+    if item_type in ("album", "track"):
+        artists = item.get("artists")
+        if isinstance(artists, list) and artists and isinstance(artists[0], dict):
+            return ("artist", artists[0].get("id") or artists[0].get("name"))
+    elif item_type == "playlist":
+        owner = item.get("owner")
+        if isinstance(owner, dict) and owner.get("id"):
+            return ("owner", owner["id"])
+    return ("item", item.get("id") or item.get("name"))
+
+
+class TopKRanker:
+    """
+    Streaming top-K over Spotify search items, fed page by page as results arrive.
+
+    Each item scores `(1 - randomness) * popularity + randomness * random()`, so
+    results favour popular items without always being the same ones. A min-heap
+    keeps only the best `k` raw items, and at most one item per diversity key
+    (see `spotify_diversity_key`) survives. Nothing is formatted here, so callers
+    only ever format the winners.
+    """
+
+    def __init__(self, k, item_type, randomness=SPOTIFY_RANK_RANDOMNESS, rng=random):
+        self.k = k
+        self.item_type = item_type
+        self.randomness = randomness
+        self.rng = rng
+        self.seen = 0
+        self._heap = []  # (score, seq, key, item)
+        self._by_key = {}
+        self._seq = itertools.count()
+
+    def push(self, item):
+        if not isinstance(item, dict) or not item.get("name") or self.k <= 0:
+            return
+        self.seen += 1
+        score = (1 - self.randomness) * spotify_popularity(item) + self.randomness * self.rng.random()
+        key = spotify_diversity_key(item, self.item_type)
+
+        current = self._by_key.get(key)
+        if current is not None:
+            if current[0] >= score:
+                return
+            self._heap.remove(current)  # Same key, better score: the new item takes the slot
+            heapq.heapify(self._heap)
+        elif len(self._heap) >= self.k:
+            if self._heap[0][0] >= score:
+                return
+            del self._by_key[heapq.heappop(self._heap)[2]]
+
+        entry = (score, next(self._seq), key, item)
+        heapq.heappush(self._heap, entry)
+        self._by_key[key] = entry
+
+    def push_page(self, offset, items):
+        """`paginate_search` on_page callback."""
+        for item in items:
+            self.push(item)
+
+    def results(self):
+        """The ranked items, best first."""
+        return [entry[3] for entry in sorted(self._heap, reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+def rank_top_k(items, item_type, k, randomness=SPOTIFY_RANK_RANDOMNESS):
+    """One-shot `TopKRanker` over an already fetched list of items."""
+    ranker = TopKRanker(k, item_type, randomness)
+    ranker.push_page(0, items)
+    return ranker.results()
+
+
+async def select_moderated(candidates, moderate, count=SPOTIFY_RESULTS_SHOWN, max_wave=SPOTIFY_MODERATION_MAX_WAVE,
+                           on_select=None):
+    """
+    Moderates candidates in order, in concurrent waves, until `count` of them pass.
+
+    `moderate(item)` is a coroutine returning the formatted result, or None if the
+    item is blocked. The first wave covers exactly `count` items; later waves only
+    top up the shortfall, scaled by the block rate seen so far (at most `max_wave`
+    items per wave). Candidates past the last wave are never moderated.
+    `on_select(result)` is called as soon as each accepted result passes.
+    """
+    selected, position, attempted = [], 0, 0
+
+    async def check(item):
+        result = await moderate(item)
+        if not result or len(selected) >= count:  # Overdrawn top-up waves can pass more than needed
+            return
+        selected.append(result)
+        if on_select:
+            on_select(result)
+
+    while len(selected) < count and position < len(candidates):
+        shortfall = count - len(selected)
+        if attempted:
+            shortfall = math.ceil(shortfall * attempted / max(1, len(selected)))
+        wave = candidates[position:position + max(1, min(shortfall, max_wave))]
+        position += len(wave)
+        attempted += len(wave)
+        await asyncio.gather(*(check(item) for item in wave))
+    return selected
@@ -0,0 +1,149 @@
+# spotify_pools.py
+
+import os, time, random, asyncio, logging, threading
+from spotify_client import SPOTIFY_PRIORITY, PRIORITY_BACKGROUND
+
+# ✅ Pool sizing
+SPOTIFY_REC_TYPES = ("playlist", "album", "artist", "track")
+SPOTIFY_POOL_CAPACITY = int(os.getenv("SPOTIFY_POOL_CAPACITY", 60))  # Moderated results kept per mood and type
+SPOTIFY_POOL_MIN_SERVE = 9  # A request is served from pools only if they can fill it
+SPOTIFY_POOL_REFRESH_SECONDS = int(os.getenv("SPOTIFY_POOL_REFRESH_SECONDS", 1800))  # Rotate pools this often
+SPOTIFY_POOL_CONCURRENCY = int(os.getenv("SPOTIFY_POOL_CONCURRENCY", 2))  # Pools refilled at the same time
+SPOTIFY_POOLS_ENABLED = os.getenv("SPOTIFY_POOLS_ENABLED", "1") != "0"  # Set to 0 to always search live
+
+
+class ResultPool:
+    """Thread-safe pool of moderated, formatted Spotify results for one mood and rec_type."""
+
+    def __init__(self, mood, rec_type, capacity=SPOTIFY_POOL_CAPACITY):
+        self.mood = mood
+        self.rec_type = rec_type
+        self.capacity = capacity
+        self.refreshed_at = 0.0
+        self.refilling = False
+        self._items = []
+        self._lock = threading.Lock()
+
+    def items(self):
+        with self._lock:
+            return list(self._items)
+
+    def replace(self, items):
+        """Swaps in a fresh batch (an empty batch keeps the current items)."""
+        with self._lock:
+            if items:
+                self._items = list(items)[:self.capacity]
+            self.refreshed_at = time.time()
+
+    def needs_refill(self, max_age=SPOTIFY_POOL_REFRESH_SECONDS):
+        return not self._items or time.time() - self.refreshed_at > max_age
+
+    def __len__(self):
+        return len(self._items)
+
+
+class SpotifyResultPools:
+    """
+    Background worker keeping a pool of moderated results per mood and rec_type.
+
+    `loader(mood, rec_type, count)` is a coroutine returning up to `count`
+    moderated, formatted results. Refills run on the serving event loop (the
+    one `start()` is awaited on, so they share its HTTP clients) at background
+    priority. Nothing is fetched up front: a pool is filled the first time
+    `sample()` finds it empty, and rotated once it is older than
+    `SPOTIFY_POOL_REFRESH_SECONDS`. `sample()` never waits on the network, so
+    both the Flask and Quart routes can serve mood requests straight from memory.
+    """
+
+    def __init__(self, loader, moods, rec_types=SPOTIFY_REC_TYPES, capacity=SPOTIFY_POOL_CAPACITY, enabled=SPOTIFY_POOLS_ENABLED):
+        self.loader = loader
+        self.enabled = enabled
+        self.pools = {(mood, rec_type): ResultPool(mood, rec_type, capacity) for mood in moods for rec_type in rec_types}
+        self.stats = {"served": 0, "misses": 0, "refills": 0, "refill_failures": 0}
+        self._loop = None
+        self._semaphore = None
+        self._tasks = set()  # Refills in flight (only touched on the serving loop)
+        self._lock = threading.Lock()
+
+    async def start(self):
+        """Attaches the pools to the running (serving) loop; call from `before_serving`."""
+        if not self.enabled:
+            return
+        self._semaphore = asyncio.Semaphore(SPOTIFY_POOL_CONCURRENCY)
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self):
+        """Detaches from the serving loop and cancels refills still in flight; call from `after_serving`."""
+        self._loop = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def sample(self, moods, rec_type, count=SPOTIFY_POOL_MIN_SERVE):
+        """
+        Returns `count` random results (unique by URL) across the pools of `moods`.
+
+        Returns an empty list if the pools cannot fill the request yet, so the
+        caller falls back to a live search. Stale or empty pools are refreshed
+        in the background either way.
+        """
+        if not self.enabled:
+            return []
+
+        pools = [self.pools[(mood, rec_type)] for mood in moods if (mood, rec_type) in self.pools]
+        candidates, urls = [], set()
+        for pool in pools:
+            if pool.needs_refill():
+                self.request_refill(pool)
+            for item in pool.items():
+                if item.get("url") not in urls:
+                    urls.add(item.get("url"))
+                    candidates.append(item)
+
+        if len(candidates) < min(count, SPOTIFY_POOL_MIN_SERVE):
+            self.stats["misses"] += 1
+            return []
+        self.stats["served"] += 1
+        return random.sample(candidates, min(count, len(candidates)))
+
+    def request_refill(self, pool):
+        """Schedules a refill on the serving loop (from any thread); a no-op until `start()`."""
+        loop = self._loop
+        with self._lock:
+            if loop is None or loop.is_closed() or pool.refilling:
+                return
+            pool.refilling = True
+        loop.call_soon_threadsafe(self._spawn, pool)
+
+    def _spawn(self, pool):
+        if self._loop is None:  # Stopped before the refill got scheduled
+            pool.refilling = False
+            return
+        task = asyncio.get_running_loop().create_task(self._refill(pool))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, pool):
+        SPOTIFY_PRIORITY.set(PRIORITY_BACKGROUND)  # Interactive Spotify calls go first
+        try:
+            async with self._semaphore:
+                pool.replace(await self.loader(pool.mood, pool.rec_type, pool.capacity))
+                self.stats["refills"] += 1
+        except Exception as e:
+            self.stats["refill_failures"] += 1
+            logging.error(f"❌ Refilling Spotify pool {pool.mood}/{pool.rec_type} failed: {e}")
+        finally:
+            pool.refilling = False
+
+    def fill_levels(self):
+        """Reports {mood: {rec_type: {size, capacity, age_seconds, refilling}}} plus serve stats."""
+        levels = {}
+        for (mood, rec_type), pool in self.pools.items():
+            levels.setdefault(mood, {})[rec_type] = {
+                "size": len(pool),
+                "capacity": pool.capacity,
+                "age_seconds": int(time.time() - pool.refreshed_at) if pool.refreshed_at else None,
+                "refilling": pool.refilling,
+            }
+        return {"enabled": self.enabled, "pools": levels, **self.stats}
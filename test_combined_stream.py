@@ -0,0 +1,75 @@
+import os
+import json
+import asyncio
+import pytest
+from google.auth.exceptions import DefaultCredentialsError
+
+# The legs are stubbed below, so placeholder keys are enough; keep background work off at import
+for name in ("OPENAI_API_KEY", "GOOGLE_SAFE_BROWSING_API_KEY", "OBLIVIOUS_HTTP_RELAY"):
+    os.environ.setdefault(name, "test")
+os.environ.setdefault("MET_BACKGROUND_WORK", "0")
+os.environ.setdefault("SPOTIFY_POOLS_ENABLED", "0")
+
+try:
+    import app
+except DefaultCredentialsError as e:  # The Vision client needs Google application credentials
+    pytest.skip(f"Google credentials are not configured: {e}", allow_module_level=True)
+
+def parse_events(body):
+    """Splits an SSE body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def stream(monkeypatch, met_leg, spotify_leg, query="moods=Calm&rec_type=playlist"):
+    monkeypatch.setattr(app, "stream_met_results", met_leg)
+    monkeypatch.setattr(app, "stream_spotify_results", spotify_leg)
+
+    async def scenario():
+        response = await app.quart_app.test_client().get(f"/combined-results/stream?{query}")
+        return response, await response.get_data(as_text=True)
+
+    response, body = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/event-stream")
+    return parse_events(body)
+
+def test_results_stream_as_each_leg_produces_them(monkeypatch):
+    async def met_leg(deadline, moods, art_styles, subject, fields, emit):
+        assert moods == ["Calm"]
+        emit("artwork", {"objectID": 1})
+        await asyncio.sleep(0.05)
+        emit("artwork", {"objectID": 2})
+        return False
+
+    async def spotify_leg(deadline, rec_type, query, moods, emit):
+        await asyncio.sleep(0.02)
+        emit("spotify", {"name": "Calm Piano", "type": rec_type})
+        return False
+
+    assert stream(monkeypatch, met_leg, spotify_leg) == [
+        ("artwork", {"objectID": 1}),
+        ("spotify", {"name": "Calm Piano", "type": "playlist"}),
+        ("artwork", {"objectID": 2}),
+        ("done", {"partial": False}),
+    ]
+
+def test_done_is_partial_when_a_leg_runs_out_of_budget_or_fails(monkeypatch):
+    async def met_leg(deadline, moods, art_styles, subject, fields, emit):
+        emit("artwork", {"objectID": 1})
+        return True  # A fetcher was cut off by the deadline
+
+    async def spotify_leg(deadline, rec_type, query, moods, emit):
+        return False
+
+    assert stream(monkeypatch, met_leg, spotify_leg)[-1] == ("done", {"partial": True})
+
+    async def failing_spotify_leg(deadline, rec_type, query, moods, emit):
+        raise RuntimeError("Spotify is down")
+
+    async def finished_met_leg(deadline, moods, art_styles, subject, fields, emit):
+        return False
+
+    assert stream(monkeypatch, finished_met_leg, failing_spotify_leg) == [("done", {"partial": True})]
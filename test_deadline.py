@@ -0,0 +1,15 @@
+from deadline import Deadline, MIN_TIMEOUT_SECONDS
+
+def test_client_budget_can_only_tighten_the_default():
+    assert Deadline.from_header("1.5", default=4.0).budget == 1.5
+    assert Deadline.from_header("15", default=4.0).budget == 4.0
+    assert Deadline.from_header("0", default=4.0).budget == MIN_TIMEOUT_SECONDS
+    assert Deadline.from_header(None, default=4.0).budget == 4.0
+    assert Deadline.from_header("soon", default=4.0).budget == 4.0
+    assert Deadline.from_header("nan", default=4.0).budget == 4.0
+
+def test_child_never_outlives_its_parent():
+    parent = Deadline(1.0)
+    child = parent.child(0.5)
+    assert child.budget == 0.5 and child.expires_at <= parent.expires_at
+    assert 0 < child.timeout() <= 0.5
@@ -0,0 +1,43 @@
+import pytest
+from disk_cache import SQLiteTTLCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return SQLiteTTLCache(str(tmp_path / "cache.sqlite3"), table="entries", ttl=60)
+
+def test_set_and_get(cache):
+    cache.set(436535, {"objectID": 436535, "title": "Wheat Field with Cypresses"})
+    assert cache.get(436535)["title"] == "Wheat Field with Cypresses"
+    assert cache.get(1) is None
+
+def test_expired_entries_are_ignored(cache):
+    cache.set("old", {"value": 1}, ttl=-1)
+    assert cache.get("old") is None
+    assert cache.purge_expired() == 1
+
+def test_expired_rows_are_purged_every_n_writes(tmp_path):
+    cache = SQLiteTTLCache(str(tmp_path / "cache.sqlite3"), ttl=60, purge_every=3)
+    cache.set_many([("old-1", 1), ("old-2", 2)], ttl=-1)
+    count_rows = lambda: cache._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    assert count_rows() == 2
+    cache.set("fresh", 3)  # Third write: expired rows go
+    assert count_rows() == 1 and cache.get("fresh") == 3
+
+def test_get_many(cache):
+    cache.set(1, {"objectID": 1})
+    cache.set(2, {"objectID": 2})
+    assert set(cache.get_many([1, 2, 3])) == {"1", "2"}
+
+def test_set_many(cache):
+    cache.set_many([("a", True), ("b", False)])
+    assert cache.get_many(["a", "b", "c"]) == {"a": True, "b": False}
+
+def test_get_prefix(cache):
+    cache.set_many([("v1:a:1", 1), ("v1:a:2", 2), ("v1:b:1", 3), ("v1:a", 4)])
+    cache.set("v1:a:3", 5, ttl=-1)
+    assert cache.get_prefix("v1:a:") == {"v1:a:1": 1, "v1:a:2": 2}
+
+def test_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    SQLiteTTLCache(path, table="met_objects").set(7, {"objectID": 7})
+    assert SQLiteTTLCache(path, table="met_objects").get(7) == {"objectID": 7}
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from http_clients import HttpClientRegistry
+
+
+def test_get_reuses_session_until_closed():
+    async def scenario():
+        registry = HttpClientRegistry()
+        await registry.open()
+        first = registry.get("spotify")
+        assert registry.get("spotify") is first
+        assert registry.get("openai") is not first
+        await registry.close()
+        assert first.closed
+        return registry
+
+    asyncio.run(scenario())
+
+
+def test_new_loop_gets_its_own_session():
+    registry = HttpClientRegistry()
+
+    async def grab():
+        session = registry.get("openai")
+        await registry.close()
+        return session
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
+
+
+def test_sessions_on_two_loops_coexist_and_all_close():
+    registry = HttpClientRegistry()
+    background = asyncio.new_event_loop()
+    thread = threading.Thread(target=background.run_forever, daemon=True)
+    thread.start()
+
+    async def on_background():
+        return registry.get("spotify")
+
+    async def scenario():
+        serving = registry.get("spotify")
+        other = await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(on_background(), background))
+        assert other is not serving
+        assert registry.get("spotify") is serving  # The other loop did not replace it
+        await registry.close()
+        return serving, other
+
+    serving, other = asyncio.run(scenario())
+    assert serving.closed and other.closed
+    background.call_soon_threadsafe(background.stop)
+    thread.join()
+    background.close()
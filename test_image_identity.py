@@ -0,0 +1,74 @@
+import io
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image, ImageDraw
+from http_clients import HTTP_CLIENTS
+from image_identity import ImageIdentity, fingerprint
+from moderation_cache import PHASH_MAX_DISTANCE, hamming_distance
+
+def cover_art(size, flipped=False):
+    """A simple album cover rendered at `size` px, the way a CDN serves 640/300/64 px variants."""
+    image = Image.new("RGB", (640, 640), (30, 40, 90))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse((120, 120, 520, 520), fill=(240, 200, 60))
+    draw.rectangle((0, 480, 640, 640), fill=(200, 30, 60))
+    if flipped:
+        image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT).rotate(90)
+    buffer = io.BytesIO()
+    image.resize((size, size), Image.Resampling.LANCZOS).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def test_size_variants_share_a_perceptual_hash():
+    large, medium, small = (fingerprint(cover_art(size)) for size in (640, 300, 64))
+    other = fingerprint(cover_art(640, flipped=True))
+
+    assert len({large["sha256"], medium["sha256"], small["sha256"]}) == 3
+    assert hamming_distance(large["phash"], medium["phash"]) <= PHASH_MAX_DISTANCE
+    assert hamming_distance(large["phash"], small["phash"]) <= PHASH_MAX_DISTANCE
+    assert hamming_distance(large["phash"], other["phash"]) > PHASH_MAX_DISTANCE
+
+@pytest.fixture
+def image_server():
+    """Serves /cover.jpg and a /broken.jpg that isn't an image; counts requests per path."""
+    hits = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] = hits.get(self.path, 0) + 1
+            body = cover_art(300) if self.path == "/cover.jpg" else b"not an image"
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+def test_each_url_is_fetched_once(image_server, tmp_path):
+    base, hits = image_server
+    identity = ImageIdentity(path=str(tmp_path / "moderation.sqlite3"))
+
+    async def scenario():
+        first = await asyncio.gather(*(identity.identify(f"{base}/cover.jpg") for _ in range(5)))
+        again = await identity.identify(f"{base}/cover.jpg")
+        broken = await identity.identify(f"{base}/broken.jpg")
+        await HTTP_CLIENTS.close()
+        return first, again, broken
+
+    first, again, broken = asyncio.run(scenario())
+    assert all(result == again for result in first) and again["sha256"]
+    assert broken is None
+    assert hits == {"/cover.jpg": 1, "/broken.jpg": 1}
+
+    # Another worker reads the remembered identity without downloading
+    other_worker = ImageIdentity(path=str(tmp_path / "moderation.sqlite3"))
+    assert asyncio.run(other_worker.identify(f"{base}/cover.jpg")) == again
+    assert hits["/cover.jpg"] == 1
@@ -0,0 +1,39 @@
+import random
+from keyword_matcher import KeywordAutomaton, KeywordMatcher, linear_classify, normalize_pattern, ALLOW, BLOCK
+from nsfw_terms import WHITELIST_TERMS, WHITELIST_ARTISTS, BLOCKLIST_TERMS
+
+ALLOW_TERMS = [*WHITELIST_TERMS, *WHITELIST_ARTISTS]
+
+def test_automaton_reports_overlapping_and_suffix_phrases():
+    automaton = KeywordAutomaton()
+    automaton.add("he", ALLOW)
+    automaton.add("she", BLOCK)
+    automaton.add("hers", BLOCK)
+    automaton.build()
+    assert automaton.scan("ushers") == ALLOW | BLOCK
+    assert automaton.scan("ahxhe") == ALLOW
+    assert automaton.scan("xyz") == 0
+
+def test_matcher_agrees_with_linear_scan_on_the_real_term_lists():
+    matcher = KeywordMatcher(ALLOW_TERMS, BLOCKLIST_TERMS)
+    texts = [
+        "", "Midnight Drive", "Xqzv lmnk frp wvtz", "ザ・ベスト・オブ・夜", "nsfw", "lewd", "Taylor Swift",
+        "Tokyo Ghoul &amp; friends", "無修正", "Incelcore", "  HENTAI  ", "Mallsoft",
+    ]
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz '"
+    texts += ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 30))) for _ in range(300)]
+    texts += [rng.choice(BLOCKLIST_TERMS) + " " + "".join(rng.choice("xyzq") for _ in range(5)) for _ in range(50)]
+
+    for text in texts:
+        if "play" in text.lower() or "y2k" in text.lower() or "best songs" in text.lower():
+            continue  # Pattern entries only match properly in the compiled matcher
+        assert matcher.classify(text) == linear_classify(text, ALLOW_TERMS, BLOCKLIST_TERMS), text
+
+def test_pattern_entries_match_as_whole_words():
+    assert normalize_pattern(r"(\b?:play|playing\b)") == r"\b(?:play|playing)\b"
+    matcher = KeywordMatcher([r"(\b?:play|playing\b)", r"(\b(?:y2k)\b)"], ["nude"])
+    assert matcher.classify("now PLAYING nude") is True
+    assert matcher.classify("Y2K nude") is True
+    assert matcher.classify("display nude") is False
+    assert matcher.classify("y2kx") is None
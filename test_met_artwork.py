@@ -0,0 +1,39 @@
+import os
+import re
+import pytest
+from met_artwork import ARTWORK_FIELDS, DEFAULT_FIELDS, ArtworkRecord, parse_fields, project_artworks
+
+RAW = {
+    "objectID": 436535, "title": "Wheat Field with Cypresses", "artistDisplayName": "Vincent van Gogh",
+    "objectDate": "1889", "objectName": "Painting", "objectURL": "https://www.metmuseum.org/art/collection/search/436535",
+    "primaryImage": "https://images.metmuseum.org/full.jpg", "primaryImageSmall": "https://images.metmuseum.org/small.jpg",
+    "isPublicDomain": True, "medium": "Oil on canvas", "objectBeginDate": 1889, "objectEndDate": 1889,
+    "constituents": [{"name": "Vincent van Gogh"}], "tags": [{"term": "Landscapes"}], "additionalImages": ["a.jpg"],
+}
+
+def test_record_keeps_only_artwork_fields():
+    record = ArtworkRecord.from_object(RAW)
+    assert not hasattr(record, "__dict__")  # Slotted: no per-instance dict
+    assert record["title"] == RAW["title"] and record.get("objectBeginDate") == 1889
+    assert "tags" not in record and record.get("tags") is None
+    assert "culture" not in record and record.get("culture", "Unknown") == "Unknown"  # Missing upstream
+    with pytest.raises(KeyError):
+        record["constituents"]
+    assert ArtworkRecord.from_object(record) is record
+    assert record == ArtworkRecord(**RAW)
+
+def test_parse_fields():
+    assert parse_fields(None) == DEFAULT_FIELDS
+    assert parse_fields("title, objectURL") == ("title", "objectURL")
+    assert parse_fields(["title", "tags", ""]) == ("title",)  # Unknown fields are dropped
+    assert parse_fields("tags,constituents") == DEFAULT_FIELDS
+
+def test_projection_matches_what_the_results_page_reads():
+    template = os.path.join(os.path.dirname(__file__), "templates", "results.html")
+    with open(template, encoding="utf-8") as f:
+        rendered = set(re.findall(r"\bartworks?(?:\[\w+\])?\.(\w+)", f.read())) & set(ARTWORK_FIELDS)
+    assert rendered and rendered <= set(DEFAULT_FIELDS)
+
+    projected = project_artworks([RAW, ArtworkRecord.from_object(RAW)])
+    assert projected[0] == projected[1] == {field: RAW[field] for field in DEFAULT_FIELDS}
+    assert project_artworks([RAW], ("objectID", "medium")) == [{"objectID": 436535, "medium": "Oil on canvas"}]
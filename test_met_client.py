@@ -0,0 +1,192 @@
+import json
+import time
+import asyncio
+import threading
+import urllib.parse
+import pytest
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from disk_cache import SQLiteTTLCache
+from met_client import MetClient, MetSearchCache
+from met_negative_cache import UnusableObjectFilter
+
+SEARCHES = {"calm": [1, 2, 3], "sad": [4, 5], "slow": [1, 6, 7]}
+SLOW_OBJECTS = {6, 7}  # Answer after a second
+MISSING_OBJECTS = {5}  # 404
+PRIVATE_OBJECTS = {3}  # Not public domain
+
+
+def met_object(object_id):
+    return {
+        "objectID": object_id,
+        "isPublicDomain": object_id not in PRIVATE_OBJECTS,
+        "primaryImageSmall": f"https://images.example/{object_id}.jpg",
+        "title": f"Artwork {object_id}",
+        "artistDisplayName": "Unknown",
+        "objectDate": "1900",
+    }
+
+
+@pytest.fixture
+def met_server():
+    """A stub Met API: /search answers SEARCHES after 0.1s, /objects/<id> answers met_object."""
+    hits, active = [], {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            hits.append(url.path)
+            if url.path == "/search":
+                with lock:
+                    active["now"] += 1
+                    active["max"] = max(active["max"], active["now"])
+                time.sleep(0.1)
+                with lock:
+                    active["now"] -= 1
+                keyword = urllib.parse.parse_qs(url.query)["q"][0].strip().lower()  # The Met ignores case
+                return self.reply(200, {"objectIDs": SEARCHES.get(keyword)})
+
+            object_id = int(url.path.rsplit("/", 1)[1])
+            if object_id in SLOW_OBJECTS:
+                time.sleep(1)
+            if object_id in MISSING_OBJECTS:
+                return self.reply(404, {"message": "Not a valid object"})
+            self.reply(200, met_object(object_id))
+
+        def reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits, active
+    server.shutdown()
+
+
+def make_client(base, tmp_path):
+    return MetClient(
+        base_url=base,
+        store=SQLiteTTLCache(str(tmp_path / "met_objects.sqlite3"), table="met_objects", ttl=3600),
+        unusable=UnusableObjectFilter(str(tmp_path / "unusable.bits"), max_id=1000, audit_rate=0),
+    )
+
+
+def run(client, coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await client.close()
+
+    return asyncio.run(scenario())
+
+
+def test_keywords_are_searched_concurrently(met_server, tmp_path):
+    base, hits, active = met_server
+    client = make_client(base, tmp_path)
+
+    artworks = run(client, client.fetch_artworks_for_keywords(["calm", "sad"], limit=10))
+
+    assert active["max"] == 2  # Both searches were in flight at once
+    assert sorted(artwork["objectID"] for artwork in artworks) == [1, 2, 4]
+    assert hits.count("/search") == 2
+
+
+def test_leftover_fetches_are_cancelled_once_enough_arrive(met_server, tmp_path):
+    base, hits, _ = met_server
+    client = make_client(base, tmp_path)
+
+    started = time.monotonic()
+    artworks = run(client, client.fetch_artworks_for_keywords(["slow"], limit=1))
+
+    assert [artwork["objectID"] for artwork in artworks] == [1]
+    assert time.monotonic() - started < 0.8  # Did not wait for the slow objects
+
+
+def test_objects_are_reused_from_the_store(met_server, tmp_path):
+    base, hits, _ = met_server
+    client = make_client(base, tmp_path)
+
+    first = run(client, client.fetch_first_artworks([1, 2], limit=2))
+    fetched = len(hits)
+    again = run(client, client.fetch_first_artworks([1, 2], limit=2))
+    assert again == first and len(hits) == fetched
+
+    # Another worker sharing the store file doesn't touch the network either
+    other_worker = make_client(base, tmp_path)
+    assert run(other_worker, other_worker.fetch_object(1)) == met_object(1)
+    assert len(hits) == fetched
+
+
+def test_unusable_objects_are_marked_and_skipped(met_server, tmp_path):
+    base, hits, _ = met_server
+    client = make_client(base, tmp_path)
+
+    artworks = run(client, client.fetch_artworks_for_keywords(["calm", "sad"], limit=10))
+    assert 3 not in [artwork["objectID"] for artwork in artworks]
+    assert 3 in client.unusable and 5 in client.unusable  # Not public domain, and missing
+    assert 1 not in client.unusable
+
+    client.store.delete(3)  # Even without the stored payload, the bit alone avoids the fetch
+    hits.clear()
+    run(client, client.fetch_first_artworks([3, 5], limit=1))
+    assert hits == []
+    assert client.unusable.report()["round_trips_saved"] == 2
+
+
+def backdate(cache, keyword, seconds):
+    """Makes a cached keyword look `seconds` older than it is."""
+    key = cache.normalize(keyword)
+    ids, fetched_at, load_seconds = cache._entries[key]
+    cache._entries[key] = (ids, fetched_at - seconds, load_seconds)
+
+
+def test_search_cache_evicts_least_recently_used_past_its_byte_budget():
+    cache = MetSearchCache(max_bytes=20)  # Five 4-byte IDs
+    cache.set("calm", [1, 2, 3])
+    cache.set("sad", [4, 5])
+    assert cache.get("calm") is not None  # Touch: "sad" is now least recently used
+
+    cache.set("happy", [6])
+    assert cache.get("sad") is None
+    assert list(cache.get("calm")[0]) == [1, 2, 3] and list(cache.get("happy")[0]) == [6]
+    assert cache.size_bytes == 16 and cache.stats["evictions"] == 1
+
+
+def test_stale_searches_are_served_while_refreshing(met_server, tmp_path):
+    base, hits, _ = met_server
+    client = make_client(base, tmp_path)
+    client.search_cache = MetSearchCache(fresh_ttl=60, stale_ttl=3600)
+    client.search_cache.set("calm", [9])
+    backdate(client.search_cache, "calm", 120)
+
+    async def scenario():
+        served = await asyncio.gather(client.search("Calm"), client.search("calm "))
+        assert hits == []  # Answered from the stale entry without waiting
+        await asyncio.gather(*client._background)
+        return served
+
+    assert run(client, scenario()) == [array("I", [9])] * 2
+    assert hits == ["/search"]  # One refresh for both callers
+    assert client.search_cache.get("calm") == (array("I", [1, 2, 3]), False)
+    assert client.search_cache.stats["stale_hits"] == 2
+
+
+def test_searches_past_the_stale_cut_off_wait_for_fresh_results(met_server, tmp_path):
+    base, hits, _ = met_server
+    client = make_client(base, tmp_path)
+    client.search_cache = MetSearchCache(fresh_ttl=60, stale_ttl=3600)
+    client.search_cache.set("calm", [9])
+    backdate(client.search_cache, "calm", 7200)
+
+    assert client.search_cache.get("calm") is None
+    assert list(run(client, client.search("calm"))) == [1, 2, 3]
+    assert hits == ["/search"]
@@ -0,0 +1,90 @@
+import csv
+import json
+import pytest
+from met_index import build_index, load_index, parse_time_period, MetCollectionIndex
+
+OBJECTS = [
+    {"objectID": 436535, "title": "Wheat Field with Cypresses", "artistDisplayName": "Vincent van Gogh",
+     "department": "European Paintings", "medium": "Oil on canvas", "isPublicDomain": True,
+     "tags": [{"term": "Landscapes"}, {"term": "Cypresses"}]},
+    {"objectID": 45434, "title": "The Great Wave off Kanagawa", "artistDisplayName": "Katsushika Hokusai",
+     "department": "Asian Art", "culture": "Japan", "medium": "Woodblock print", "isPublicDomain": True,
+     "tags": [{"term": "Waves"}]},
+    {"objectID": 12, "title": "Untitled Landscape", "department": "Modern Art", "isPublicDomain": False},
+]
+
+@pytest.fixture
+def index(tmp_path):
+    source = tmp_path / "objects.json"
+    source.write_text(json.dumps(OBJECTS))
+    build_index(str(source), str(tmp_path / "index"))
+    index = MetCollectionIndex(str(tmp_path / "index"))
+    yield index
+    index.close()
+
+def test_single_term_search(index):
+    assert list(index.search("landscapes")) == [436535]
+    assert list(index.search("Landscape")) == [12]
+
+def test_multi_term_search_intersects(index):
+    assert list(index.search("oil canvas")) == [436535]
+    assert list(index.search("asian japan wave")) == [45434]
+    assert list(index.search("oil woodblock")) == []
+
+def test_unknown_term(index):
+    assert len(index.search("cubist")) == 0
+
+def test_build_from_csv_public_domain_only(tmp_path):
+    source = tmp_path / "MetObjects.csv"
+    with open(source, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Object ID", "Is Public Domain", "Title", "Tags", "Artist Display Name", "Department", "Culture", "Medium"])
+        writer.writerow([1, "True", "Portrait of a Man", "Men|Portraits", "Rembrandt", "European Paintings", "Dutch", "Oil"])
+        writer.writerow([2, "False", "Portrait of a Woman", "Women|Portraits", "", "Modern Art", "", "Oil"])
+    build_index(str(source), str(tmp_path / "index"), public_domain_only=True)
+    index = load_index(str(tmp_path / "index"))
+    assert list(index.search("portraits")) == [1]
+    assert list(index.search("rembrandt dutch")) == [1]
+    index.close()
+
+def test_load_index_missing_dir(tmp_path):
+    assert load_index(str(tmp_path / "missing")) is None
+
+def test_parse_time_period():
+    assert parse_time_period("modern") == (1900, 2100)
+    assert parse_time_period("1850-1900") == (1850, 1900)
+    assert parse_time_period("500 BC to 100 AD") == (-500, 100)
+    assert parse_time_period((1920, 1900)) == (1900, 1920)
+    assert parse_time_period("sometime") is None
+
+def test_date_range_queries(tmp_path):
+    source = tmp_path / "objects.jsonl"
+    source.write_text("\n".join(json.dumps(obj) for obj in [
+        {"objectID": 1, "title": "Amphora", "objectBeginDate": -530, "objectEndDate": -520},
+        {"objectID": 2, "title": "Water Lilies", "objectBeginDate": 1914, "objectEndDate": 1926},
+        {"objectID": 3, "title": "Wheat Field", "objectBeginDate": 1889, "objectEndDate": 1889},
+        {"objectID": 4, "title": "Undated Fragment"},
+    ]))
+    build_index(str(source), str(tmp_path / "index"))
+    index = MetCollectionIndex(str(tmp_path / "index"))
+    assert list(index.dates.ids_in_range(*parse_time_period("ancient"))) == [1]
+    assert list(index.dates.ids_in_range(1800, 2000)) == [3, 2]
+    assert list(index.dates.filter_ids([4, 3, 2, 1], 1900, 2100)) == [2]
+    assert index.dates.begin_year(4) is None
+    index.close()
+
+def test_date_ranges_match_objects_spanning_into_them(tmp_path):
+    source = tmp_path / "objects.jsonl"
+    source.write_text("\n".join(json.dumps(obj) for obj in [
+        {"objectID": 1, "title": "Tapestry", "objectBeginDate": 1880, "objectEndDate": 1910},
+        {"objectID": 2, "title": "Vase", "objectBeginDate": 1750, "objectEndDate": 1899},
+        {"objectID": 3, "title": "Poster", "objectBeginDate": 1925, "objectEndDate": 1925},
+        {"objectID": 4, "title": "Mask", "objectBeginDate": 2001, "objectEndDate": 2003},
+    ]))
+    build_index(str(source), str(tmp_path / "index"))
+    index = MetCollectionIndex(str(tmp_path / "index"))
+    assert list(index.dates.filter_ids([4, 3, 2, 1], 1900, 1950)) == [3, 1]  # 1880–1910 overlaps 1900–1950
+    assert list(index.dates.ids_in_range(1900, 1950)) == [1, 3]
+    assert list(index.dates.ids_in_range(1890, 1899)) == [2, 1]
+    assert index.dates.end_year(1) == 1910
+    index.close()
@@ -0,0 +1,43 @@
+import multiprocessing
+from met_negative_cache import UnusableObjectFilter
+
+def test_marked_ids_are_skipped(tmp_path):
+    unusable = UnusableObjectFilter(str(tmp_path / "unusable.bits"), max_id=1000, audit_rate=0)
+    assert not unusable.should_skip(42)
+    unusable.record(42, usable=False)
+    assert unusable.should_skip(42)
+    assert unusable.report()["round_trips_saved"] == 1
+
+def test_usable_fetch_clears_false_positive(tmp_path):
+    unusable = UnusableObjectFilter(str(tmp_path / "unusable.bits"), max_id=1000, audit_rate=1)
+    unusable.record(7, usable=False)
+    assert not unusable.should_skip(7)  # Picked for an audit fetch
+    unusable.record(7, usable=True)
+    assert 7 not in unusable
+    assert unusable.report()["false_positive_rate"] == 1.0
+
+def test_bits_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "unusable.bits")
+    UnusableObjectFilter(path, max_id=1000).record(999, usable=False)
+    assert 999 in UnusableObjectFilter(path, max_id=1000)
+
+def test_out_of_range_ids_are_ignored(tmp_path):
+    unusable = UnusableObjectFilter(str(tmp_path / "unusable.bits"), max_id=8)
+    unusable.record(100, usable=False)
+    assert not unusable.should_skip(100)
+
+def mark_every_nth(path, start, step):
+    unusable = UnusableObjectFilter(path, max_id=4096)
+    for object_id in range(start, 4096, step):
+        unusable.record(object_id, usable=False)
+
+def test_workers_marking_the_same_bytes_keep_every_bit(tmp_path):
+    path = str(tmp_path / "unusable.bits")
+    ctx = multiprocessing.get_context("fork")
+    workers = [ctx.Process(target=mark_every_nth, args=(path, start, 4)) for start in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    unusable = UnusableObjectFilter(path, max_id=4096)
+    assert all(object_id in unusable for object_id in range(4096))
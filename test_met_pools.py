@@ -0,0 +1,79 @@
+import time
+import asyncio
+import threading
+from met_client import MetClient
+from met_pools import MetCandidatePools
+
+def artwork(object_id):
+    return {"objectID": object_id, "title": f"Artwork {object_id}", "artistDisplayName": "Unknown",
+            "objectDate": "1900", "isPublicDomain": True, "primaryImageSmall": f"{object_id}.jpg"}
+
+class StubMetClient(MetClient):
+    """Answers searches and object fetches from memory, on the real client loop."""
+
+    def __init__(self, delay=0.0):
+        super().__init__(store=None, unusable=None)
+        self.delay = delay
+        self.searches = []
+        self.next_id = 0
+        self.active = self.max_active = 0
+
+    async def search(self, keyword):
+        self.searches.append(keyword)
+        return list(range(1000))
+
+    async def fetch_first_artworks(self, object_ids, limit, seen=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        artworks = [artwork(self.next_id + n) for n in range(limit)]
+        self.next_id += limit
+        return artworks
+
+def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_start_fills_every_pool_up_to_capacity():
+    client = StubMetClient()
+    pools = MetCandidatePools(client, {"moods": {"Calm": ["calm"], "Sad": ["sad"]}}, capacity=6, low_water=3)
+    pools.start()
+
+    assert wait_until(lambda: all(len(pool) == 6 and not pool.refilling for pool in pools.pools.values()))
+    assert set(client.searches) == {"calm", "sad"}
+    assert pools.fill_levels()["moods"]["Calm"] == {"size": 6, "capacity": 6, "low_water": 3, "refilling": False}
+
+def test_take_returns_unseen_artworks_and_refills_below_low_water():
+    client = StubMetClient()
+    pools = MetCandidatePools(client, {"moods": {"Calm": ["calm"]}}, capacity=6, low_water=3)
+    pool = pools.pools[("moods", "Calm")]
+    pools.start()
+    assert wait_until(lambda: len(pool) == 6 and not pool.refilling)
+
+    seen = set()
+    first = pools.take("moods", "Calm", 2, seen)
+    assert len(first) == 2 and len(seen) == 2
+    assert len(pool) == 4 and not pool.refilling  # Still above the low-water mark
+
+    second = pools.take("moods", "Calm", 2, seen)
+    assert not {artwork["objectID"] for artwork in first} & {artwork["objectID"] for artwork in second}
+    assert wait_until(lambda: len(pool) == 6 and not pool.refilling)  # Dropped to 2 < 3: topped up
+    assert pools.take("moods", "Unknown", 2, seen) == []
+
+def test_concurrent_takes_start_one_refill_per_pool():
+    client = StubMetClient(delay=0.1)
+    pools = MetCandidatePools(client, {"moods": {"Calm": ["calm"]}}, capacity=6, low_water=3)
+    pool = pools.pools[("moods", "Calm")]
+
+    takers = [threading.Thread(target=pools.take, args=("moods", "Calm", 1, set())) for _ in range(8)]
+    for taker in takers:
+        taker.start()
+    for taker in takers:
+        taker.join()
+
+    assert wait_until(lambda: len(pool) == 6 and not pool.refilling)
+    assert client.searches == ["calm"] and client.max_active == 1
@@ -0,0 +1,95 @@
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from met_client import MetClient, artwork_identity
+from met_random import RandomArtworkReservoir, load_random_ids, write_id_file
+
+def artwork(object_id):
+    return {"objectID": object_id, "title": f"Artwork {object_id}", "artistDisplayName": "Unknown",
+            "objectDate": "1900", "isPublicDomain": True, "primaryImageSmall": f"{object_id}.jpg"}
+
+class StubMetClient(MetClient):
+    """Validates every drawn ID from memory, on the real client loop."""
+
+    def __init__(self, base_url="http://127.0.0.1:9"):
+        super().__init__(base_url=base_url, store=None, unusable=None)
+        self.drawn = []
+
+    async def fetch_first_artworks(self, object_ids, limit, seen=None):
+        self.drawn.extend(object_ids)
+        fresh = [artwork(object_id) for object_id in dict.fromkeys(object_ids)]
+        return [obj for obj in fresh if artwork_identity(obj) not in seen][:limit]
+
+def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_id_file_round_trip(tmp_path):
+    path = str(tmp_path / "ids.bin")
+    assert load_random_ids(path) is None  # Not built yet
+
+    assert write_id_file(path, [30, 10, 20, 10]) == 3
+    ids = load_random_ids(path)
+    assert len(ids) == 3 and list(ids.ids) == [10, 20, 30]
+    assert {ids.draw() for _ in range(100)} <= {10, 20, 30}
+    assert len(ids.sample(50)) == 50 and set(ids.sample(50)) <= {10, 20, 30}
+
+    open(path, "wb").close()
+    assert load_random_ids(path) is None  # An empty file counts as not built
+
+def test_reservoir_refills_below_low_water(tmp_path):
+    path = str(tmp_path / "ids.bin")
+    write_id_file(path, range(1, 500))
+    client = StubMetClient()
+    reservoir = RandomArtworkReservoir(client, path=path, capacity=8, low_water=4)
+    reservoir.start()
+    assert wait_until(lambda: len(reservoir.pool) == 8 and not reservoir.pool.refilling)
+    assert set(client.drawn) <= set(range(1, 500))
+
+    seen = set()
+    assert len(reservoir.take(3, seen)) == 3 and len(reservoir.pool) == 5
+    assert not reservoir.pool.refilling  # Still at or above the low-water mark
+    assert len(reservoir.take(3, seen)) == 3
+    assert wait_until(lambda: len(reservoir.pool) == 8 and not reservoir.pool.refilling)
+    assert not seen & reservoir.pool.identities()  # Refilled with artworks not handed out yet
+    assert reservoir.fill_level()["candidate_ids"] == 499
+
+@pytest.fixture
+def listing_server():
+    """A stub Met API whose image search returns IDs 1..100; counts requests."""
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            body = json.dumps({"objectIDs": list(range(1, 101))}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", hits
+    server.shutdown()
+
+def test_first_refill_downloads_and_persists_the_id_list(listing_server, tmp_path):
+    base, hits = listing_server
+    path = str(tmp_path / "ids.bin")
+    reservoir = RandomArtworkReservoir(StubMetClient(base), path=path, capacity=4, low_water=2)
+    reservoir.start()
+    assert wait_until(lambda: len(reservoir.pool) == 4 and not reservoir.pool.refilling)
+    assert len(hits) == 1 and hits[0].startswith("/search?")
+
+    # Another worker maps the persisted file instead of downloading again
+    other_worker = RandomArtworkReservoir(StubMetClient(base), path=path)
+    assert len(other_worker.ids) == 100 and len(hits) == 1
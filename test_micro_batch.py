@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from micro_batch import MicroBatcher
+
+
+def test_concurrent_callers_share_batches_split_by_size():
+    batches, running = [], []
+
+    async def flush(items):
+        batches.append(list(items))
+        running.append(len(batcher._running))  # The in-flight flush is held by the batcher
+        await asyncio.sleep(0.01)
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(flush, max_size=4, max_delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(f"text {n}") for n in range(10)))
+
+    results = asyncio.run(scenario())
+    assert results == [f"TEXT {n}" for n in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]  # The last partial batch goes after the window
+    assert batcher.stats == {"items": 10, "batches": 3, "largest_batch": 4}
+    assert all(running) and not batcher._running
+
+
+def test_window_flushes_partial_batch_and_dedupes_items():
+    batches = []
+
+    async def flush(items):
+        batches.append(list(items))
+        return [len(item) for item in items]
+
+    batcher = MicroBatcher(flush, max_size=32, max_delay=0.02)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("calm"), batcher.submit("calm"), batcher.submit("sad"))
+
+    assert asyncio.run(scenario()) == [4, 4, 3]
+    assert batches == [["calm", "sad"]]
+    assert batcher.metrics()["waiting"] == 0
+
+
+def test_failed_flush_raises_in_every_caller():
+
+    async def flush(items):
+        raise RuntimeError("moderation unavailable")
+
+    batcher = MicroBatcher(flush, max_size=8, max_delay=0.01)
+
+    async def scenario():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
+
+
+def test_cancelled_caller_does_not_break_its_batch():
+
+    async def flush(items):
+        await asyncio.sleep(0.02)
+        return items
+
+    batcher = MicroBatcher(flush, max_size=8, max_delay=0.01)
+
+    async def scenario():
+        first = asyncio.ensure_future(batcher.submit("a"))
+        second = asyncio.ensure_future(batcher.submit("b"))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "b"
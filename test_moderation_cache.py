@@ -0,0 +1,48 @@
+from moderation_cache import ModerationVerdictCache, normalize_text, policy_version, phash_bands
+
+def test_text_verdicts_match_normalized_text(tmp_path):
+    cache = ModerationVerdictCache("v1", path=str(tmp_path / "moderation.sqlite3"))
+    cache.set_texts([("Late Night  Lo-Fi &amp; Rain", True), ("Something Else", False)])
+    assert cache.get_text("late night lo-fi & rain") is True
+    assert cache.get_text("something else ") is False
+    assert cache.get_text("never seen") is None
+    assert cache.metrics()["text_hits"] == 2 and cache.metrics()["text_misses"] == 1
+
+def test_verdicts_are_shared_between_workers_and_survive_restarts(tmp_path):
+    path = str(tmp_path / "moderation.sqlite3")
+    ModerationVerdictCache("v1", path=path).set_image("https://i.scdn.co/image/ab67", "https://i.scdn.co/image/ab67")
+    assert ModerationVerdictCache("v1", path=path).get_image("https://i.scdn.co/image/ab67") == "https://i.scdn.co/image/ab67"
+
+def test_policy_change_invalidates_verdicts(tmp_path):
+    path = str(tmp_path / "moderation.sqlite3")
+    before = policy_version({"sexual": 0.001}, ["nude", "lewd"], {"LIKELY"})
+    after = policy_version({"sexual": 0.0005}, ["nude", "lewd"], {"LIKELY"})
+    assert before == policy_version({"sexual": 0.001}, ["nude", "lewd"], {"LIKELY"})
+    assert before != after
+
+    ModerationVerdictCache(before, path=path).set_texts([("calm piano", True)])
+    assert ModerationVerdictCache(after, path=path).get_text("calm piano") is None
+
+def test_normalize_text():
+    assert normalize_text("  Rock &amp;\tRoll ") == "rock & roll"
+    assert normalize_text(None) == ""
+
+def test_image_content_verdicts_are_shared_by_identical_images(tmp_path):
+    cache = ModerationVerdictCache("v1", path=str(tmp_path / "moderation.sqlite3"))
+    cover = {"sha256": "a" * 64, "phash": 0x8F3C_0E1F_F0F0_1234}
+    cache.set_image_content(cover, True)
+
+    assert cache.get_image_content(cover) is True
+    assert cache.get_image_content({"sha256": "b" * 64, "phash": cover["phash"] ^ 0b101}) is True  # 64px variant, 2 bits off
+    assert cache.get_image_content({"sha256": "c" * 64, "phash": cover["phash"] ^ 0xF0F0}) is None  # 8 bits off
+    assert cache.metrics()["content_hits"] == 1 and cache.metrics()["perceptual_hits"] == 1
+
+def test_perceptual_match_prefers_unsafe_on_ties(tmp_path):
+    cache = ModerationVerdictCache("v1", path=str(tmp_path / "moderation.sqlite3"))
+    query = 0x0123_4567_89AB_CDEF
+    cache.set_image_content({"sha256": "a" * 64, "phash": query ^ 0b01}, True)
+    cache.set_image_content({"sha256": "b" * 64, "phash": query ^ 0b10}, False)
+    assert cache.get_image_content({"sha256": "c" * 64, "phash": query}) is False
+
+def test_phash_bands():
+    assert phash_bands(0x0123_4567_89AB_CDEF) == [0x0123, 0x4567, 0x89AB, 0xCDEF]
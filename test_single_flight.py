@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+from single_flight import SingleFlight, normalize_url, should_refresh_early
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"ids": [1, 2, 3]}
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("search:sunset", fetch) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1 and all(result is results[0] for result in results)
+    assert flights.stats == {"calls": 1, "coalesced": 9}
+    assert len(flights) == 0
+
+
+def test_shared_call_survives_until_last_waiter_cancels():
+    flights = SingleFlight()
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        lonely = asyncio.ensure_future(flights.do("other", fetch))
+        await asyncio.sleep(0.01)
+        lonely.cancel()
+        await asyncio.sleep(0.08)
+
+    asyncio.run(scenario())
+    assert finished == [1]  # The abandoned "other" call was cancelled
+
+
+def test_sync_callers_share_one_call():
+    flights = SingleFlight()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return "payload"
+
+    threads = [threading.Thread(target=lambda: results.append(flights.do_sync("key", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == ["payload"] * 8
+
+
+def test_normalize_url_and_xfetch():
+    assert normalize_url("https://API.x/v1/search?type=track&q=Lo-fi%20%20Jazz") == normalize_url("https://api.x/v1/search?q=lo-fi+jazz&type=track")
+    assert not should_refresh_early(age=1, ttl=100, delta=0.1)
+    assert should_refresh_early(age=100, ttl=100, delta=0.1)
+    early = sum(should_refresh_early(age=99.9, ttl=100, delta=0.5) for _ in range(1000))
+    assert 0 < early < 1000
@@ -0,0 +1,240 @@
+import json
+import time
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from spotify_client import (
+    SpotifyTokenManager, SpotifySearchCache, SpotifyRateLimiter, paginate_search, select_moderated, TopKRanker, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE,
+)
+
+@pytest.fixture
+def token_server():
+    """Local stand-in for accounts.spotify.com that counts token requests."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            calls.append(time.time())
+            time.sleep(0.1)
+            body = json.dumps({"access_token": f"token-{len(calls)}", "expires_in": 3600}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/api/token", calls
+    server.shutdown()
+
+def test_concurrent_sync_callers_share_one_refresh(token_server):
+    url, calls = token_server
+    tokens = SpotifyTokenManager("id", "secret", token_url=url)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tokens.get_token())) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["token-1"] * 10
+    assert len(calls) == 1
+
+def test_async_callers_share_refresh_with_sync_path(token_server):
+    url, calls = token_server
+    tokens = SpotifyTokenManager("id", "secret", token_url=url)
+
+    async def many():
+        return await asyncio.gather(*(tokens.get_token_async() for _ in range(10)))
+
+    assert asyncio.run(many()) == ["token-1"] * 10
+    assert tokens.get_token() == "token-1"
+    assert len(calls) == 1
+
+def test_invalidate_forces_refresh(token_server):
+    url, calls = token_server
+    tokens = SpotifyTokenManager("id", "secret", token_url=url)
+    first = tokens.get_token()
+    tokens.invalidate("some-older-token")
+    assert tokens.get_token() == first
+    tokens.invalidate(first)
+    assert tokens.get_token() == "token-2"
+
+def test_proactive_refresh_keeps_serving_current_token(token_server):
+    url, calls = token_server
+    tokens = SpotifyTokenManager("id", "secret", token_url=url, refresh_margin=4000)
+    assert tokens.get_token() == "token-1"
+    assert tokens.get_token() == "token-1"  # Inside the margin: served while refreshing
+    time.sleep(0.3)
+    assert tokens.get_token() == "token-2"
+    assert tokens.metrics()["proactive_refreshes"] >= 1
+
+def test_paginate_search_fetches_remaining_pages_concurrently():
+    in_flight, peak, landed = [0], [0], []
+
+    async def fetch_page(offset, limit):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.05 if offset % 100 else 0.01)  # Out-of-order completion
+        in_flight[0] -= 1
+        items = [{"id": n} for n in range(offset, min(offset + limit, 230))]
+        return {"tracks": {"total": 230, "items": items}}
+
+    async def scenario():
+        started = time.monotonic()
+        items = await paginate_search(fetch_page, "tracks", max_results=230, page_size=50, concurrency=3,
+                                      on_page=lambda offset, page: landed.append(offset))
+        return items, time.monotonic() - started
+
+    items, elapsed = asyncio.run(scenario())
+    assert [item["id"] for item in items] == list(range(230))
+    assert landed[0] == 0 and sorted(landed) == [0, 50, 100, 150, 200]
+    assert peak[0] == 3
+    assert elapsed < 0.2
+
+def test_paginate_search_defaults_to_one_request():
+    offsets = []
+
+    async def fetch_page(offset, limit):
+        offsets.append(offset)
+        return {"tracks": {"total": 900, "items": [{"id": n} for n in range(offset, offset + limit)]}}
+
+    assert len(asyncio.run(paginate_search(fetch_page, "tracks"))) == 50
+    assert offsets == [0]
+
+def test_paginate_search_cancels_pages_in_flight_with_its_caller():
+    cancelled = []
+
+    async def fetch_page(offset, limit):
+        if offset:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(offset)
+                raise
+        return {"tracks": {"total": 200, "items": [{"id": n} for n in range(offset, offset + limit)]}}
+
+    async def scenario():
+        search = asyncio.ensure_future(paginate_search(fetch_page, "tracks", max_results=200, page_size=50))
+        await asyncio.sleep(0.05)
+        search.cancel()
+        await asyncio.gather(search, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert sorted(cancelled) == [50, 100, 150]
+
+def test_paginate_search_returns_none_without_first_page():
+
+    async def fetch_page(offset, limit):
+        return None
+
+    assert asyncio.run(paginate_search(fetch_page, "tracks")) is None
+
+def test_top_k_ranker_keeps_most_popular_items_across_pages():
+    ranker = TopKRanker(3, "artist", randomness=0)
+    ranker.push_page(0, [{"id": f"a{n}", "name": f"A{n}", "popularity": n} for n in range(0, 50)])
+    ranker.push_page(50, [{"id": f"b{n}", "name": f"B{n}", "popularity": n} for n in range(20, 60, 10)])
+    assert [item["id"] for item in ranker.results()] == ["b50", "a49", "a48"]
+    assert ranker.seen == 54 and len(ranker) == 3
+
+def test_top_k_ranker_keeps_one_item_per_lead_artist():
+    ranker = TopKRanker(5, "track", randomness=0)
+    tracks = [
+        {"id": "t1", "name": "One", "popularity": 40, "artists": [{"id": "x"}]},
+        {"id": "t2", "name": "Two", "popularity": 90, "artists": [{"id": "x"}]},
+        {"id": "t3", "name": "Three", "popularity": 60, "artists": [{"id": "y"}]},
+        {"id": "t4", "name": "Four", "popularity": 70, "artists": [{"id": "x"}]},
+    ]
+    ranker.push_page(0, tracks)
+    assert [item["id"] for item in ranker.results()] == ["t2", "t3"]
+
+def test_select_moderated_stops_once_enough_items_pass():
+    waves, in_flight, peak = [], [0], [0]
+
+    async def moderate(item):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        waves.append(item)
+        return None if item % 3 == 0 else {"id": item}  # Every third item is blocked
+
+    streamed = []
+    selected = asyncio.run(select_moderated(list(range(1, 100)), moderate, count=9, max_wave=12, on_select=streamed.append))
+    ids = [result["id"] for result in selected]
+    assert ids[:6] == [1, 2, 4, 5, 7, 8] and set(ids[6:]) < {10, 11, 13, 14}
+    assert streamed == selected
+    assert peak[0] == 9  # The first wave is moderated concurrently
+    assert len(waves) < 20  # Only a short top-up after the first wave
+
+def test_select_moderated_returns_what_passes_when_candidates_run_out():
+
+    async def moderate(item):
+        return {"id": item} if item else None
+
+    selected = asyncio.run(select_moderated([0, 1, 0, 2], moderate, count=9))
+    assert sorted(result["id"] for result in selected) == [1, 2]
+
+def test_search_cache_serves_stale_while_refreshing_once():
+    cache = SpotifySearchCache(fresh_ttl=0.05, stale_ttl=60)
+    loads = []
+
+    async def loader():
+        loads.append(time.time())
+        await asyncio.sleep(0.02)
+        return {"tracks": {"items": [], "total": len(loads)}}
+
+    async def scenario():
+        first = await cache.fetch_async("url", loader)
+        await asyncio.sleep(0.06)
+        stale = await asyncio.gather(*(cache.fetch_async("url", loader) for _ in range(5)))
+        await asyncio.sleep(0.05)
+        return first, stale, cache.get("url")[0]
+
+    first, stale, refreshed = asyncio.run(scenario())
+    assert first["tracks"]["total"] == 1
+    assert all(payload is first for payload in stale)
+    assert refreshed["tracks"]["total"] == 2
+    assert len(loads) == 2
+    assert cache.metrics()["stale_hits"] == 5
+
+def test_search_cache_bounds_entries_and_bytes():
+    cache = SpotifySearchCache(max_entries=3, max_bytes=10_000)
+    for n in range(5):
+        cache.fetch(f"url-{n}", lambda: {"items": ["x" * 100]})
+    assert len(cache) == 3 and cache.get("url-0") is None
+    cache.fetch("big", lambda: {"items": ["x" * 9_000]})
+    assert cache.size_bytes <= 10_000 and cache.get("big")
+
+def test_rate_limiter_releases_interactive_before_background(tmp_path):
+    limiter = SpotifyRateLimiter(rate=50, burst=1, pause_path=str(tmp_path / "pause.bin"))
+    order = []
+
+    async def call(name, priority):
+        await limiter.acquire_async(priority)
+        order.append(name)
+
+    async def scenario():
+        await limiter.acquire_async()  # Drain the bucket so everyone queues
+        await asyncio.gather(*[call(f"bg-{n}", PRIORITY_BACKGROUND) for n in range(3)],
+                             *[call(f"ui-{n}", PRIORITY_INTERACTIVE) for n in range(3)])
+
+    asyncio.run(scenario())
+    assert order == ["ui-0", "ui-1", "ui-2", "bg-0", "bg-1", "bg-2"]
+    assert limiter.metrics()["queue_depth"] == 0
+
+def test_rate_limiter_pause_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "pause.bin")
+    worker_a = SpotifyRateLimiter(rate=1000, burst=10, pause_path=path)
+    worker_b = SpotifyRateLimiter(rate=1000, burst=10, pause_path=path)
+    worker_a.pause(0.3)
+    started = time.monotonic()
+    assert worker_b.acquire(timeout=0.1) is False
+    assert worker_b.acquire(timeout=1) is True
+    assert time.monotonic() - started >= 0.25
+    assert worker_b.metrics()["timeouts"] == 1
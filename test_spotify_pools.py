@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from spotify_pools import SpotifyResultPools
+
+def loader_for(calls, loops, delay=0.0):
+    async def loader(mood, rec_type, count):
+        calls.append((mood, rec_type))
+        loops.append(asyncio.get_running_loop())
+        await asyncio.sleep(delay)
+        return [{"url": f"https://open.spotify.com/{mood}/{rec_type}/{n}"} for n in range(count)]
+    return loader
+
+def test_nothing_is_fetched_until_a_pool_is_sampled_while_serving():
+    calls, loops = [], []
+    pools = SpotifyResultPools(loader_for(calls, loops), ["Calm", "Sad"], ("playlist", "album"), capacity=12, enabled=True)
+    assert pools.sample(["Calm"], "playlist") == []  # Not serving yet: no refill either
+    assert calls == []
+
+    async def serve():
+        await pools.start()
+        # Flask samples from its own thread; the refill still runs on the serving loop
+        sampler = threading.Thread(target=pools.sample, args=(["Calm"], "playlist"))
+        sampler.start()
+        sampler.join()
+        for _ in range(200):
+            if len(pools.pools[("Calm", "playlist")]):
+                break
+            await asyncio.sleep(0.01)
+        served = pools.sample(["Calm"], "playlist")
+        await pools.stop()
+        return asyncio.get_running_loop(), served
+
+    serving_loop, served = asyncio.run(serve())
+    assert calls == [("Calm", "playlist")]
+    assert loops == [serving_loop]
+    assert len(served) == 9
+
+def test_stop_cancels_refills_in_flight():
+    calls, loops = [], []
+    pools = SpotifyResultPools(loader_for(calls, loops, delay=10), ["Calm"], ("playlist",), enabled=True)
+
+    async def serve():
+        await pools.start()
+        pools.sample(["Calm"], "playlist")
+        await asyncio.sleep(0.05)
+        await pools.stop()
+
+    asyncio.run(serve())
+    assert calls == [("Calm", "playlist")]
+    assert not pools.pools[("Calm", "playlist")].refilling
+
+def test_disabled_pools_never_fetch():
+    calls, loops = [], []
+    pools = SpotifyResultPools(loader_for(calls, loops), ["Calm"], ("playlist",), enabled=False)
+
+    async def serve():
+        await pools.start()
+        result = pools.sample(["Calm"], "playlist")
+        await asyncio.sleep(0.02)
+        await pools.stop()
+        return result
+
+    assert asyncio.run(serve()) == []
+    assert calls == [] and pools.fill_levels()["enabled"] is False
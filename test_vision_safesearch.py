@@ -0,0 +1,77 @@
+import json
+import time
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import vision
+from vision_safesearch import VisionSafeSearch
+
+@pytest.fixture
+def vision_server():
+    """Local stand-in for the Vision REST API: images with "nsfw" in the URL are flagged, "broken" ones fail."""
+    batches = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            urls = [request["image"]["source"]["imageUri"] for request in payload["requests"]]
+            batches.append(urls)
+            time.sleep(0.2)
+            responses = []
+            for url in urls:
+                if "broken" in url:
+                    responses.append({"error": {"code": 3, "message": "Bad image data."}})
+                else:
+                    adult = "VERY_LIKELY" if "nsfw" in url else "VERY_UNLIKELY"
+                    responses.append({"safeSearchAnnotation": {"adult": adult, "violence": "UNLIKELY", "racy": "UNLIKELY"}})
+            body = json.dumps({"responses": responses}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = vision.ImageAnnotatorClient(
+        transport="rest",
+        credentials=AnonymousCredentials(),
+        client_options={"api_endpoint": f"http://127.0.0.1:{server.server_port}"},
+    )
+    yield client, batches
+    server.shutdown()
+
+def test_concurrent_checks_share_one_batch_without_blocking_the_loop(vision_server):
+    client, batches = vision_server
+    safe_search = VisionSafeSearch(client, max_size=16, window=0.02)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        heartbeat = asyncio.ensure_future(ticker())
+        urls = ["https://img/a.jpg", "https://img/nsfw.jpg", "https://img/b.jpg", "https://img/broken.jpg"]
+        verdicts = await asyncio.gather(*(safe_search.check(url) for url in urls))
+        heartbeat.cancel()
+        return verdicts
+
+    assert asyncio.run(scenario()) == [True, False, True, None]
+    assert len(batches) == 1 and len(batches[0]) == 4
+    assert len(ticks) >= 10  # The loop kept running during the 0.2s Vision call
+
+def test_batches_are_capped_at_max_size(vision_server):
+    client, batches = vision_server
+    safe_search = VisionSafeSearch(client, max_size=3, window=0.02)
+
+    async def scenario():
+        return await asyncio.gather(*(safe_search.check(f"https://img/{n}.jpg") for n in range(7)))
+
+    assert all(asyncio.run(scenario()))
+    assert sorted(len(batch) for batch in batches) == [1, 3, 3]